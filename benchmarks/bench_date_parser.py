@@ -0,0 +1,52 @@
+"""
+Benchmark da conversão de datas: pd.to_datetime x parser de formato fixo.
+
+Uso:
+    python -m benchmarks.bench_date_parser [n_linhas]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from src.models.saude import FORMATO_DATA, parse_esaude_datetime
+
+
+def create_dates(n_linhas: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Atendimentos em um mês (horários repetidos) e nascimentos em 80 anos
+    (dias repetidos), no formato texto dos CSVs, com ~0,1% de inválidos.
+    """
+    rng = np.random.default_rng(seed)
+    atendimento = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 31 * 86400, n_linhas), unit='s')
+    nascimento = pd.Timestamp('1940-01-01') + pd.to_timedelta(rng.integers(0, 80 * 365, n_linhas), unit='D')
+
+    df = pd.DataFrame({
+        'Data do Atendimento': atendimento.strftime(FORMATO_DATA),
+        'Data de Nascimento': nascimento.strftime('%d/%m/%Y 00:00:00'),
+    })
+    invalidos = rng.random(n_linhas) < 0.001
+    df.loc[invalidos, 'Data do Atendimento'] = '31/02/2024 10:00:00'
+    return df
+
+
+def main(n_linhas: int = 2_000_000):
+    df = create_dates(n_linhas)
+    print(f"📏 {n_linhas:,} linhas")
+
+    for col in df.columns:
+        inicio = time.perf_counter()
+        esperado = pd.to_datetime(df[col], format=FORMATO_DATA, errors='coerce')
+        t_padrao = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        obtido, n_invalidos = parse_esaude_datetime(df[col])
+        t_rapido = time.perf_counter() - inicio
+
+        print(f"   {col}: to_datetime {t_padrao:.3f}s | formato fixo {t_rapido:.3f}s "
+              f"| {t_padrao / t_rapido:.1f}x | inválidos: {n_invalidos:,} "
+              f"| idêntico: {'✅' if obtido.equals(esperado) else '❌'}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,68 @@
+"""
+Benchmark das colunas derivadas: versão original com .apply x versão vetorizada.
+
+Uso:
+    python -m benchmarks.bench_derived_columns [n_linhas]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from scripts.etl_pipeline import HealthETLPipeline
+
+
+def periodo_dia_apply(datas: pd.Series) -> pd.Series:
+    """Implementação original (linha a linha)"""
+    return datas.dt.hour.apply(
+        lambda x: 'Manhã' if 6 <= x < 12 else
+                  'Tarde' if 12 <= x < 18 else
+                  'Noite' if 18 <= x < 24 else 'Madrugada')
+
+
+def faixa_etaria_apply(idades: pd.Series) -> pd.Series:
+    """Implementação original (linha a linha)"""
+    return idades.apply(
+        lambda x: 'Criança' if x <= 12 else
+                  'Adolescente' if x <= 19 else
+                  'Adulto' if x <= 59 else 'Idoso')
+
+
+def create_frame(n_linhas: int, seed: int = 42) -> pd.DataFrame:
+    """Datas de atendimento e idades aleatórias, com ~1% de NaT/NaN"""
+    rng = np.random.default_rng(seed)
+    datas = pd.Series(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 86400, n_linhas), unit='s'))
+    idades = pd.Series((rng.integers(-1, 100, n_linhas)).astype('float64'))
+
+    ausentes = rng.random(n_linhas) < 0.01
+    datas[ausentes] = pd.NaT
+    idades[ausentes] = np.nan
+    return pd.DataFrame({'data': datas, 'idade': idades})
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main(n_linhas: int = 2_000_000):
+    df = create_frame(n_linhas)
+    print(f"📏 {n_linhas:,} linhas")
+
+    casos = [
+        ('periodo_dia', periodo_dia_apply, HealthETLPipeline.periodo_dia, df['data']),
+        ('faixa_etaria', faixa_etaria_apply, HealthETLPipeline.faixa_etaria, df['idade']),
+    ]
+
+    for nome, original, vetorizada, entrada in casos:
+        esperado, t_original = cronometrar(original, entrada)
+        obtido, t_vetorizada = cronometrar(vetorizada, entrada)
+
+        identico = obtido.astype(object).equals(esperado.astype(object))
+        print(f"   {nome}: apply {t_original:.3f}s | vetorizado {t_vetorizada:.3f}s "
+              f"| {t_original / t_vetorizada:.0f}x | idêntico: {'✅' if identico else '❌'}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,95 @@
+"""
+Benchmark da carga da fato em partições paralelas (FactLoader(workers=N)).
+
+Requer um PostgreSQL local com o schema do projeto (fato_atendimento) e
+as variáveis DB_* do .env. As cargas vão para uma cópia da fato no schema
+bench_fato (CREATE TABLE ... LIKE, sem FKs), que é removido ao final.
+
+Uso:
+    python -m benchmarks.bench_parallel_fact_load [n_linhas] [workers ...]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from src.config.database import DatabaseConfig
+from scripts.loaders.fact_loader import FactLoader
+
+SCHEMA = 'bench_fato'
+
+
+def create_frame(n_linhas: int, seed: int = 42):
+    """Frame transformado sintético e mapeamentos código -> ID correspondentes"""
+    rng = np.random.default_rng(seed)
+    unidades = rng.integers(1, 120, n_linhas)
+    procedimentos = rng.integers(1, 2_000, n_linhas)
+    usuarios = np.arange(n_linhas) % max(n_linhas // 3, 1) + 1
+    datas = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 86400, n_linhas), unit='s')
+
+    df = pd.DataFrame({
+        'Código da Unidade': unidades.astype(str),
+        'Código do Procedimento': procedimentos.astype(str),
+        'Código do CID': 'NI',
+        'Código do CBO': '1',
+        'cod_usuario': usuarios.astype(str),
+        'Qtde Prescrita Farmácia Curitibana': rng.integers(0, 5, n_linhas),
+        'Qtde Dispensada Farmácia Curitibana': rng.integers(0, 5, n_linhas),
+        'Qtde de Medicamento Não Padronizado': 0,
+        'idade': rng.integers(0, 100, n_linhas),
+        'diff_prescrito_dispensado': 0,
+        'gerou_internamento': 0,
+        'Data do Atendimento': datas,
+        'morador_curitiba_rm': 'Curitiba',
+        'periodo_dia': 'Manhã',
+        'faixa_etaria': 'Adulto',
+    })
+    df['chave_natural'] = (datas.strftime('%Y%m%d%H%M%S') + '_' + df['Código da Unidade'] + '_' +
+                           df['cod_usuario'] + '_' + np.arange(n_linhas).astype(str))
+
+    dimension_maps = {
+        'unidade': {str(i): i for i in range(1, 120)},
+        'procedimento': {str(i): i for i in range(1, 2_000)},
+        'cid': {'NI': 1},
+        'cbo': {'1': 1},
+        'perfil': {int(i): int(i) for i in np.unique(usuarios)},
+    }
+    return df, dimension_maps
+
+
+def main(n_linhas: int = 500_000, workers=(1, 2, 4, 8)):
+    # Uma conexão para a sessão principal + uma por partição
+    DatabaseConfig.POOL_CONFIG['maxconn'] = max(workers) + 1
+    DatabaseConfig.SESSION_PROFILES['benchmark'] = {
+        **DatabaseConfig.SESSION_PROFILES['bulk'], 'search_path': f'{SCHEMA}, public',
+    }
+
+    df, dimension_maps = create_frame(n_linhas)
+    print(f"📏 {n_linhas:,} linhas")
+
+    with DatabaseConfig.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        cursor.execute(f"CREATE TABLE {SCHEMA}.fato_atendimento (LIKE public.fato_atendimento INCLUDING ALL)")
+
+    try:
+        for n in workers:
+            with DatabaseConfig.get_connection(session='benchmark') as conn:
+                conn.cursor().execute("TRUNCATE fato_atendimento")
+                conn.commit()
+
+                loader = FactLoader(dimension_maps, workers=n, session='benchmark')
+                inicio = time.perf_counter()
+                resultado = loader.load_fato_atendimento(df, conn)
+                segundos = time.perf_counter() - inicio
+
+            print(f"   N={n}: {segundos:.2f}s, {resultado['inseridos'] / segundos:,.0f} linhas/s ({resultado})")
+    finally:
+        with DatabaseConfig.get_connection() as conn:
+            conn.cursor().execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    main(*argumentos[:1], *([tuple(argumentos[1:])] if len(argumentos) > 1 else []))
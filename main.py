@@ -43,7 +43,7 @@ def run_health_pipeline():
         print("🏥 INICIANDO PIPELINE DE SAÚDE")
         print("="*60)
         
-        health_pipeline = HealthETLPipeline()
+        health_pipeline = HealthETLPipeline(use_staging_cache=True)
         health_pipeline.run()
         
         print("✅ Pipeline de saúde concluído com sucesso!")
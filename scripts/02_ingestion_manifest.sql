@@ -0,0 +1,15 @@
+-- MANIFESTO DE INGESTÃO
+-- Um registro por CSV já carregado (o pipeline também cria a tabela se não existir)
+CREATE TABLE IF NOT EXISTS etl_arquivos_ingeridos (
+    arquivo_id SERIAL PRIMARY KEY,
+    nome_arquivo VARCHAR(255) NOT NULL,
+    hash_arquivo CHAR(40) UNIQUE NOT NULL,      -- BLAKE2b (160 bits) do conteúdo
+    tamanho_bytes BIGINT NOT NULL,
+    mtime_ns BIGINT NOT NULL,
+    linhas INTEGER NOT NULL,                    -- linhas lidas do CSV
+    data_atendimento_min TIMESTAMP,
+    data_atendimento_max TIMESTAMP,             -- marca d'água da carga incremental
+    data_ingestao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE etl_arquivos_ingeridos IS 'Manifesto de ingestão: arquivos CSV já carregados na fato_atendimento.';
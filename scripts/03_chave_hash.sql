@@ -0,0 +1,18 @@
+-- CHAVE NATURAL COMPACTA (HealthETLPipeline(hashed_key=True))
+-- chave_hash: hash estável de 64 bits de data_atendimento + cod_unidade + cod_usuario + cod_procedimento.
+-- chave_natural passa a ser preenchida só nas raras colisões de hash (fallback pelos componentes).
+ALTER TABLE fato_atendimento ADD COLUMN IF NOT EXISTS chave_hash BIGINT;
+ALTER TABLE fato_atendimento ALTER COLUMN chave_natural DROP NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_fato_chave_hash ON fato_atendimento(chave_hash);
+
+-- Linhas gravadas antes desta migração ficam com chave_hash nula: o pipeline com hashed_key=True
+-- as preenche no início da carga (FactLoader.backfill_hash_keys, mesmo hash do transform).
+-- Depois disso só as colisões ficam sem hash, e este índice parcial mantém a busca barata.
+CREATE INDEX IF NOT EXISTS idx_fato_sem_hash ON fato_atendimento(atendimento_id) WHERE chave_hash IS NULL;
+
+-- Sem volta automática: linhas gravadas com hashed_key=True têm chave_natural nula, e uma carga
+-- sem hashed_key as duplicaria. O FactLoader recusa essa carga (busca barata por este índice).
+CREATE INDEX IF NOT EXISTS idx_fato_sem_chave_natural ON fato_atendimento(atendimento_id) WHERE chave_natural IS NULL;
+
+COMMENT ON COLUMN fato_atendimento.chave_hash IS 'Hash de 64 bits da chave natural (controle de carga no modo hashed_key). NULL em colisões, que usam chave_natural.';
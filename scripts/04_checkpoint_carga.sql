@@ -0,0 +1,17 @@
+-- CHECKPOINT DA CARGA EM STREAMING
+-- Um registro por CSV com carga em andamento (o pipeline também cria a tabela se não existir).
+-- Gravado na mesma transação de cada lote da fato; apagado quando o arquivo entra no manifesto.
+CREATE TABLE IF NOT EXISTS etl_checkpoint_carga (
+    nome_arquivo VARCHAR(255) NOT NULL,
+    tamanho_bytes BIGINT NOT NULL,
+    mtime_ns BIGINT NOT NULL,
+    run_id CHAR(32) NOT NULL,                   -- execução que gravou o checkpoint
+    chunk INTEGER NOT NULL,                     -- chunk (0-based) da última linha confirmada
+    ultima_linha BIGINT NOT NULL,               -- última linha do CSV (0-based) com carga confirmada
+    data_atendimento_min TIMESTAMP,
+    data_atendimento_max TIMESTAMP,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (nome_arquivo, tamanho_bytes, mtime_ns)
+);
+
+COMMENT ON TABLE etl_checkpoint_carga IS 'Checkpoint da carga em streaming: retomada após falha a partir da última linha confirmada.';
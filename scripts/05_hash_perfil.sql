@@ -0,0 +1,6 @@
+-- DETECÇÃO DE MUDANÇAS EM dim_perfil_paciente
+-- hash_perfil: hash de 64 bits dos 17 atributos do perfil, calculado no pandas (src/models/saude.py: hash_columns).
+-- O upsert só reescreve a linha quando o hash muda; o DimensionLoader também cria a coluna se não existir.
+ALTER TABLE dim_perfil_paciente ADD COLUMN IF NOT EXISTS hash_perfil BIGINT;
+
+COMMENT ON COLUMN dim_perfil_paciente.hash_perfil IS 'Hash dos atributos do perfil (NULL = gravado antes do hash; reenviado na próxima carga).';
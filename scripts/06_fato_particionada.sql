@@ -0,0 +1,99 @@
+-- FATO_ATENDIMENTO PARTICIONADA POR MÊS (HealthETLPipeline(partitioned_fact=True))
+-- Converte a fato em uma tabela particionada por intervalo de data_atendimento (uma partição por mês).
+-- Em tabelas particionadas toda chave única precisa conter a coluna de partição: a chave natural
+-- passa a ser (chave_natural, data_atendimento) - a data já é componente da chave, então a
+-- unicidade é a mesma. Cada carga só consulta o índice da partição do mês.
+-- Novas partições são criadas pelo FactLoader durante a carga.
+
+BEGIN;
+
+ALTER TABLE fato_atendimento RENAME TO fato_atendimento_legado;
+ALTER TABLE fato_atendimento_legado RENAME CONSTRAINT fato_atendimento_pkey TO fato_atendimento_legado_pkey;
+
+CREATE TABLE fato_atendimento (
+    atendimento_id INTEGER NOT NULL DEFAULT nextval('fato_atendimento_atendimento_id_seq'),
+
+    unidade_id INTEGER NOT NULL REFERENCES dim_unidade(unidade_id),
+    procedimento_id INTEGER NOT NULL REFERENCES dim_procedimento(procedimento_id),
+    cid_id INTEGER NOT NULL REFERENCES dim_cid(cid_id),
+    cbo_id INTEGER NOT NULL REFERENCES dim_cbo(cbo_id),
+    perfil_id INTEGER NOT NULL REFERENCES dim_perfil_paciente(perfil_id),
+
+    qtde_prescrita INTEGER,
+    qtde_dispensada INTEGER,
+    qtde_nao_padronizado INTEGER,
+
+    idade_paciente INTEGER,
+    diff_prescrito_dispensado INTEGER,
+    gerou_internamento INTEGER,
+
+    data_atendimento TIMESTAMP NOT NULL,
+    morador_curitiba_rm VARCHAR(20),
+    periodo_dia VARCHAR(10),
+    faixa_etaria VARCHAR(15),
+    estabelecimento_solicitante TEXT,
+    estabelecimento_destino TEXT,
+    solicitacao_exames TEXT,
+    encaminhamento_especialista TEXT,
+
+    chave_natural VARCHAR(255),
+    chave_hash BIGINT,
+    data_carga TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (atendimento_id, data_atendimento),
+    UNIQUE (chave_natural, data_atendimento),
+    UNIQUE (chave_hash, data_atendimento)
+) PARTITION BY RANGE (data_atendimento);
+
+ALTER SEQUENCE fato_atendimento_atendimento_id_seq OWNED BY fato_atendimento.atendimento_id;
+
+-- Índices particionados (criados em cada partição)
+ALTER INDEX idx_fato_data_atendimento RENAME TO idx_fato_legado_data_atendimento;
+ALTER INDEX idx_fato_unidade RENAME TO idx_fato_legado_unidade;
+ALTER INDEX idx_fato_perfil RENAME TO idx_fato_legado_perfil;
+ALTER INDEX IF EXISTS idx_fato_sem_hash RENAME TO idx_fato_legado_sem_hash;
+ALTER INDEX IF EXISTS idx_fato_sem_chave_natural RENAME TO idx_fato_legado_sem_chave_natural;
+CREATE INDEX idx_fato_data_atendimento ON fato_atendimento(data_atendimento);
+CREATE INDEX idx_fato_unidade ON fato_atendimento(unidade_id);
+CREATE INDEX idx_fato_perfil ON fato_atendimento(perfil_id);
+CREATE INDEX idx_fato_sem_hash ON fato_atendimento(atendimento_id) WHERE chave_hash IS NULL;
+CREATE INDEX idx_fato_sem_chave_natural ON fato_atendimento(atendimento_id) WHERE chave_natural IS NULL;
+
+-- Uma partição para cada mês já carregado (mesmo nome usado pelo FactLoader: fato_atendimento_AAAA_MM)
+DO $$
+DECLARE
+    mes DATE;
+BEGIN
+    FOR mes IN
+        SELECT DISTINCT date_trunc('month', data_atendimento)::date FROM fato_atendimento_legado
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF fato_atendimento FOR VALUES FROM (%L) TO (%L)',
+            'fato_atendimento_' || to_char(mes, 'YYYY_MM'), mes, (mes + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO fato_atendimento (
+    atendimento_id, unidade_id, procedimento_id, cid_id, cbo_id, perfil_id,
+    qtde_prescrita, qtde_dispensada, qtde_nao_padronizado,
+    idade_paciente, diff_prescrito_dispensado, gerou_internamento,
+    data_atendimento, morador_curitiba_rm, periodo_dia, faixa_etaria,
+    estabelecimento_solicitante, estabelecimento_destino, solicitacao_exames, encaminhamento_especialista,
+    chave_natural, chave_hash, data_carga
+)
+SELECT
+    atendimento_id, unidade_id, procedimento_id, cid_id, cbo_id, perfil_id,
+    qtde_prescrita, qtde_dispensada, qtde_nao_padronizado,
+    idade_paciente, diff_prescrito_dispensado, gerou_internamento,
+    data_atendimento, morador_curitiba_rm, periodo_dia, faixa_etaria,
+    estabelecimento_solicitante, estabelecimento_destino, solicitacao_exames, encaminhamento_especialista,
+    chave_natural, chave_hash, data_carga
+FROM fato_atendimento_legado;
+
+COMMENT ON TABLE fato_atendimento IS 'Armazena os eventos de atendimento. Uma linha por atendimento. Particionada por mês de data_atendimento.';
+
+COMMIT;
+
+-- Após conferir as contagens:
+-- DROP TABLE fato_atendimento_legado;
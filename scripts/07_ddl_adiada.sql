@@ -0,0 +1,11 @@
+-- DDL ADIADA DA CARGA INICIAL (HealthETLPipeline(initial_load=True))
+-- Índices secundários e FKs da fato removidos durante a carga inicial (o pipeline também cria a tabela se não existir).
+-- Gravados na mesma transação da remoção; cada linha é apagada quando o índice/FK é recriado.
+CREATE TABLE IF NOT EXISTS etl_ddl_adiada (
+    nome VARCHAR(255) PRIMARY KEY,              -- nome do índice ou da constraint
+    tipo VARCHAR(10) NOT NULL,                  -- 'indice' ou 'fk'
+    definicao TEXT NOT NULL,                    -- pg_get_indexdef / pg_get_constraintdef
+    data_remocao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE etl_ddl_adiada IS 'Índices e FKs da fato adiados pela carga inicial; recriados ao final da carga.';
@@ -0,0 +1,44 @@
+-- QUARENTENA DA FATO: LINHAS COM FK FALTANDO (o FactLoader também cria a tabela se não existir)
+-- Gravada em massa (COPY + INSERT ... ON CONFLICT DO NOTHING) pelo FactLoader com os códigos brutos,
+-- as medidas e a máscara das FKs faltando; reprocessada por HealthETLPipeline.reprocess_rejects()
+-- em uma única passada em SQL depois de corrigidas as dimensões.
+CREATE TABLE IF NOT EXISTS fato_atendimento_rejeitos (
+    rejeito_id BIGSERIAL PRIMARY KEY,
+    mascara_fk SMALLINT NOT NULL,               -- bits: 1 unidade, 2 procedimento, 4 cid, 8 cbo, 16 perfil
+
+    codigo_unidade TEXT,
+    codigo_procedimento TEXT,
+    codigo_cid TEXT,
+    codigo_cbo TEXT,
+    cod_usuario TEXT,
+
+    qtde_prescrita INTEGER,
+    qtde_dispensada INTEGER,
+    qtde_nao_padronizado INTEGER,
+    idade_paciente INTEGER,
+    diff_prescrito_dispensado INTEGER,
+    gerou_internamento SMALLINT,
+
+    data_atendimento TIMESTAMP,
+    morador_curitiba_rm VARCHAR(20),
+    periodo_dia VARCHAR(10),
+    faixa_etaria VARCHAR(15),
+    estabelecimento_solicitante TEXT,
+    estabelecimento_destino TEXT,
+    solicitacao_exames TEXT,
+    encaminhamento_especialista TEXT,
+
+    chave_natural VARCHAR(255) UNIQUE,          -- a mesma linha rejeitada de novo não se repete
+    chave_hash BIGINT UNIQUE,
+    data_rejeicao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE fato_atendimento_rejeitos IS 'Linhas da fato descartadas por FK faltando, para reprocessamento.';
+
+-- Rejeitos por dimensão
+-- SELECT count(*) FILTER (WHERE mascara_fk & 1 > 0) AS unidade,
+--        count(*) FILTER (WHERE mascara_fk & 2 > 0) AS procedimento,
+--        count(*) FILTER (WHERE mascara_fk & 4 > 0) AS cid,
+--        count(*) FILTER (WHERE mascara_fk & 8 > 0) AS cbo,
+--        count(*) FILTER (WHERE mascara_fk & 16 > 0) AS perfil
+-- FROM fato_atendimento_rejeitos;
@@ -0,0 +1,72 @@
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from src.models import saude
+
+
+class DataProfiler:
+    """
+    Perfil das colunas em uma única passada por coluna.
+
+    Substitui as varreduras repetidas do frame feitas só para diagnóstico
+    (isnull().sum().sum(), isna().sum() por coluna, startswith('0') sobre
+    colunas inteiras). Colunas de código são fatoradas uma vez: o código -1
+    dá os nulos e os valores únicos dão a contagem de distintos e a
+    verificação de zeros à esquerda. As demais colunas têm só os nulos
+    contados.
+
+    Com sample_size, frames maiores que a amostra são perfilados sobre uma
+    amostra aleatória de linhas e as contagens são extrapoladas.
+    """
+
+    def __init__(self, sample_size: Optional[int] = None, seed: int = 0):
+        self.sample_size = sample_size
+        self.seed = seed
+
+    def profile(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict:
+        """
+        Returns:
+            Dicionário com 'linhas', 'linhas_perfiladas', 'amostrado', 'segundos'
+            e 'colunas' (coluna -> {'nulos', e para códigos 'distintos' e
+            'zeros_esquerda'})
+        """
+        inicio = time.perf_counter()
+        colunas = [c for c in (columns or df.columns) if c in df.columns]
+
+        amostra = df
+        if self.sample_size and len(df) > self.sample_size:
+            amostra = df.sample(n=self.sample_size, random_state=self.seed)
+        escala = len(df) / len(amostra) if len(amostra) else 1.0
+
+        perfil = {}
+        for col in colunas:
+            if col in saude.COLUNAS_CODIGO:
+                perfil[col] = self._profile_code_column(amostra[col], escala)
+            else:
+                perfil[col] = {'nulos': int(round(amostra[col].isna().sum() * escala))}
+
+        return {
+            'linhas': len(df),
+            'linhas_perfiladas': len(amostra),
+            'amostrado': amostra is not df,
+            'segundos': round(time.perf_counter() - inicio, 3),
+            'colunas': perfil,
+        }
+
+    @staticmethod
+    def _profile_code_column(serie: pd.Series, escala: float) -> Dict:
+        """Nulos, distintos e zeros à esquerda a partir de um único factorize"""
+        codigos, unicos = pd.factorize(serie)
+        unicos = pd.Series(np.asarray(unicos, dtype=object)).astype(str)
+
+        return {
+            'nulos': int(round((codigos == -1).sum() * escala)),
+            'distintos': len(unicos),
+            'zeros_esquerda': bool(unicos.str.startswith('0').any()),
+        }
+
+    @staticmethod
+    def total_nulls(perfil: Dict) -> int:
+        return sum(info['nulos'] for info in perfil['colunas'].values())
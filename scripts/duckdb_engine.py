@@ -0,0 +1,271 @@
+import os
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.models import saude
+
+try:
+    import duckdb
+except ImportError:  # duckdb é opcional: sem ele só o motor pandas está disponível
+    duckdb = None
+
+
+# Valores lidos como nulos pelo pd.read_csv (na_values padrão), para o mesmo resultado
+NULOS_PANDAS = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+
+def _q(nome: str) -> str:
+    """Identificador SQL entre aspas (os nomes das colunas têm espaços e acentos)"""
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _literal(valor: str) -> str:
+    return "'" + valor.replace("'", "''") + "'"
+
+
+class DuckDBTransformEngine:
+    """
+    Motor alternativo de extract + transform em SQL DuckDB, direto sobre os CSVs.
+
+    Reproduz as etapas do transform() do pandas (datas, numéricos, nulos,
+    colunas derivadas e deduplicação pela chave natural) em duas consultas:
+    os CSVs são lidos uma vez para uma tabela temporária e o frame final sai
+    como Arrow. Usa todos os núcleos e, acima de memory_limit, derrama para
+    temp_directory em vez de estourar a memória.
+    """
+
+    FORMATO_DATA_SQL = '%d/%m/%Y %H:%M:%S'
+    COLUNAS_DATA = ['Data do Atendimento', 'Data de Nascimento']
+
+    # Mesmas colunas e valores de _handle_missing_values
+    PREENCHIMENTO_CRITICO = {
+        'Sexo': 'Não Informado',
+        'Solicitação de Exames': 'Não Informado',
+        'Encaminhamento para Atendimento Especialista': 'Não Informado',
+        'Desencadeou Internamento': 'Não Informado',
+    }
+
+    def __init__(self, threads: Optional[int] = None, memory_limit: Optional[str] = None,
+                 temp_directory: Path = Path('data/processed/duckdb_tmp/')):
+        """
+        Args:
+            threads: Threads do DuckDB (padrão: todos os núcleos)
+            memory_limit: Limite de memória, ex.: '8GB' (padrão do DuckDB: 80% da RAM)
+            temp_directory: Onde o DuckDB derrama dados que não cabem na memória
+        """
+        self.threads = threads or os.cpu_count() or 1
+        self.memory_limit = memory_limit
+        self.temp_directory = Path(temp_directory)
+        self.stats: Dict[str, object] = {}
+
+    @staticmethod
+    def is_available() -> bool:
+        return duckdb is not None
+
+    def extract_transform(self, csv_files: List[Path], columns: Optional[List[str]] = None,
+                          aliases: Optional[Dict[str, str]] = None,
+                          watermark: Optional[pd.Timestamp] = None, dedup: bool = True):
+        """
+        Lê os CSVs e aplica o transform em SQL.
+
+        Args:
+            csv_files: Arquivos a ler (mesma ordem da leitura pandas)
+            columns: Colunas a manter (None = todas)
+            aliases: Grafias alternativas -> nome padronizado
+            watermark: Se informado, só atendimentos posteriores
+            dedup: Se True, cria chave_natural e deduplica por ela; se False,
+                   deduplica pelos componentes da chave (modo hashed_key, em
+                   que o hash é calculado depois, no pandas)
+
+        Returns:
+            pyarrow.Table com a coluna _linha (posição da linha na leitura)
+        """
+        self.temp_directory.mkdir(parents=True, exist_ok=True)
+        aliases = aliases or {}
+
+        con = duckdb.connect()
+        try:
+            con.execute(f"SET threads = {int(self.threads)}")
+            con.execute(f"SET temp_directory = {_literal(str(self.temp_directory))}")
+            if self.memory_limit:
+                con.execute(f"SET memory_limit = {_literal(self.memory_limit)}")
+
+            # Nomes das colunas primeiro: types= só aceita colunas existentes
+            nomes = self._read_csv_sql(csv_files, all_varchar=True)
+            disponiveis = [linha[0] for linha in con.execute(f"DESCRIBE SELECT * FROM {nomes}").fetchall()]
+            leitura = self._read_csv_sql(csv_files, texto=disponiveis)
+
+            # 1. Leitura única dos CSVs (projeção + padronização dos nomes)
+            selecao = self._projection_sql(disponiveis, columns, aliases)
+            con.execute("SET preserve_insertion_order = true")
+            con.execute(f"CREATE TEMP TABLE lido AS SELECT filename AS _arquivo, {selecao} FROM {leitura}")
+
+            # _linha = posição na leitura pandas: ordem dos arquivos, depois a linha dentro
+            # do arquivo (rowid segue a ordem de inserção; read_csv não tem file_row_number).
+            # Sem ORDER BY, o row_number() de uma leitura paralela não é determinístico e a
+            # duplicata que sobrevive na deduplicação poderia não ser a do pandas.
+            arquivos = ', '.join(_literal(str(f)) for f in csv_files)
+            con.execute(f"""
+                CREATE TEMP TABLE bruto AS
+                SELECT row_number() OVER (ORDER BY list_position([{arquivos}], _arquivo), rowid) - 1 AS _linha, *
+                FROM lido
+            """)
+            con.execute("DROP TABLE lido")
+            colunas_bruto = [linha[0] for linha in con.execute("DESCRIBE bruto").fetchall()][2:]
+
+            self._collect_stats(con, colunas_bruto, csv_files, watermark)
+
+            # 2. Transform + deduplicação, ordenado como a leitura
+            tabela = con.execute(self._transform_sql(colunas_bruto, watermark, dedup)).arrow()
+        finally:
+            con.close()
+
+        self.stats['duplicatas_removidas'] = self.stats['linhas_filtradas'] - tabela.num_rows
+        return tabela
+
+    def _read_csv_sql(self, csv_files: List[Path], all_varchar: bool = False,
+                      texto: Optional[List[str]] = None) -> str:
+        """
+        read_csv com as mesmas regras da leitura pandas: as colunas do
+        DTYPE_SPEC (e as de data/quantidade) como texto, as demais com tipo
+        detectado e os mesmos valores nulos.
+        """
+        arquivos = ', '.join(_literal(str(f)) for f in csv_files)
+        nulos = ', '.join(_literal(v) for v in NULOS_PANDAS)
+
+        if all_varchar:
+            tipos = 'all_varchar=true'
+        else:
+            como_texto = saude.COLUNAS_CODIGO + saude.COLUNAS_CATEGORICAS + list(saude.COLUNAS_QUANTIDADE) + self.COLUNAS_DATA
+            colunas = [col for col in dict.fromkeys(como_texto) if col in (texto or [])]
+            tipos = 'types={' + ', '.join(f"{_literal(col)}: 'VARCHAR'" for col in colunas) + '}'
+
+        return f"""read_csv([{arquivos}], delim=';', header=true, encoding='latin-1',
+                            union_by_name=true, filename=true, {tipos}, nullstr=[{nulos}])"""
+
+    @staticmethod
+    def _projection_sql(disponiveis, columns, aliases) -> str:
+        """Colunas do CSV na ordem do arquivo, com as grafias alternativas unificadas"""
+        selecionadas = []
+        for col in disponiveis:
+            if col == 'filename':
+                continue
+            nome = aliases.get(col, col)
+            if columns is not None and nome not in columns:
+                continue
+            if nome in (n for n, _ in selecionadas):
+                continue
+
+            # Mesma coluna com as duas grafias (arquivos diferentes): coalesce
+            grafias = [c for c in disponiveis if aliases.get(c, c) == nome]
+            expressao = _q(col) if len(grafias) == 1 else f"coalesce({', '.join(_q(c) for c in grafias)})"
+            selecionadas.append((nome, f"{expressao} AS {_q(nome)}"))
+
+        return ', '.join(expr for _, expr in selecionadas)
+
+    def _collect_stats(self, con, colunas: List[str], csv_files: List[Path], watermark) -> None:
+        """Linhas lidas (total e por arquivo), linhas após a marca d'água e datas inválidas"""
+        filtro = self._watermark_sql(watermark) or 'WHERE true'
+        agregados = ['count(*)', f"count(*) FILTER ({filtro[len('WHERE '):]})"]
+        datas = [col for col in self.COLUNAS_DATA if col in colunas]
+        for col in datas:
+            agregados.append(
+                f"count(*) FILTER (WHERE {_q(col)} IS NOT NULL "
+                f"AND try_strptime({_q(col)}, '{self.FORMATO_DATA_SQL}') IS NULL)"
+            )
+
+        resultado = con.execute(f"SELECT {', '.join(agregados)} FROM bruto").fetchone()
+        self.stats['registros_extraidos'] = int(resultado[0])
+        self.stats['linhas_filtradas'] = int(resultado[1])
+        for col, n in zip(datas, resultado[2:]):
+            self.stats[f"datas_invalidas_{col.lower().replace(' ', '_')}"] = int(n)
+
+        por_arquivo = dict(con.execute("SELECT _arquivo, count(*) FROM bruto GROUP BY _arquivo").fetchall())
+        self.stats['linhas_por_arquivo'] = [int(por_arquivo.get(str(f), 0)) for f in csv_files]
+
+    def _watermark_sql(self, watermark) -> str:
+        if watermark is None:
+            return ''
+        return f"WHERE try_strptime({_q('Data do Atendimento')}, '{self.FORMATO_DATA_SQL}') > TIMESTAMP {_literal(str(watermark))}"
+
+    def _transform_sql(self, colunas: List[str], watermark, dedup: bool) -> str:
+        """SELECT com as mesmas regras de _convert_dates ... _create_natural_key"""
+        expressoes = {}
+        for col in colunas:
+            expressoes[col] = _q(col)
+
+        for col in self.COLUNAS_DATA:
+            if col in colunas:
+                expressoes[col] = f"try_strptime({_q(col)}, '{self.FORMATO_DATA_SQL}')"
+
+        # to_small_int: to_numeric(errors='coerce'), fração truncada, fora de BIGINT -> NA,
+        # depois fillna(0); o tipo final (Int16/Int32, alargado se preciso) sai do
+        # apply_transform_schema
+        for col in saude.COLUNAS_QUANTIDADE:
+            if col in colunas:
+                numero = f"try_cast(trim({_q(col)}) AS DOUBLE)"
+                expressoes[col] = f"coalesce(try_cast(trunc({numero}) AS BIGINT), 0)"
+
+        for col, valor in self.PREENCHIMENTO_CRITICO.items():
+            if col in colunas:
+                expressoes[col] = f"coalesce({_q(col)}, {_literal(valor)})"
+
+        base = ', '.join(f"{expr} AS {_q(col)}" for col, expr in expressoes.items())
+        filtro = self._watermark_sql(watermark)
+
+        atendimento, nascimento = _q('Data do Atendimento'), _q('Data de Nascimento')
+        hora = f"hour({atendimento})"
+
+        # .dt.days (piso de dias) // 365
+        idade = f"floor(floor((epoch_us({atendimento}) - epoch_us({nascimento})) / 86400000000.0) / 365)"
+
+        derivadas = f"""
+            {idade}::DOUBLE AS idade,
+            {_q('Qtde Prescrita Farmácia Curitibana')} - {_q('Qtde Dispensada Farmácia Curitibana')}
+                AS diff_prescrito_dispensado,
+            ({_q('Desencadeou Internamento')} = 'Sim')::TINYINT AS gerou_internamento,
+            CASE WHEN {_q('Município')} = 'Curitiba' THEN 'Curitiba' ELSE 'Região Metropolitana' END
+                AS morador_curitiba_rm,
+            CASE WHEN {hora} >= 6 AND {hora} < 12 THEN 'Manhã'
+                 WHEN {hora} >= 12 AND {hora} < 18 THEN 'Tarde'
+                 WHEN {hora} >= 18 AND {hora} < 24 THEN 'Noite'
+                 ELSE 'Madrugada' END AS periodo_dia
+        """
+
+        faixa = """
+            CASE WHEN idade <= 12 THEN 'Criança'
+                 WHEN idade <= 19 THEN 'Adolescente'
+                 WHEN idade <= 59 THEN 'Adulto'
+                 ELSE 'Idoso' END AS faixa_etaria
+        """
+
+        # Como saude.natural_key_text: data -> 'aaaa-mm-dd HH:MM:SS', NaT -> 'NaT', None -> 'None'
+        partes = [f"coalesce(strftime({atendimento}, '%Y-%m-%d %H:%M:%S'), 'NaT')"]
+        partes += [f"coalesce({_q(col)}, 'None')" for col in saude.COLUNAS_CHAVE_NATURAL[1:]]
+        chave_natural = " || '_' || ".join(partes)
+
+        if dedup:
+            chave_select = f", {chave_natural} AS chave_natural"
+            particao = "chave_natural"
+        else:
+            chave_select = ''
+            particao = ', '.join(_q(col) for col in saude.COLUNAS_CHAVE_NATURAL)
+
+        return f"""
+            WITH tipado AS (
+                SELECT _linha, {base} FROM bruto {filtro}
+            ),
+            derivado AS (
+                SELECT *, {derivadas} FROM tipado
+            ),
+            completo AS (
+                SELECT *, {faixa} {chave_select} FROM derivado
+            )
+            SELECT * FROM completo
+            QUALIFY row_number() OVER (PARTITION BY {particao} ORDER BY _linha) = 1
+            ORDER BY _linha
+        """
@@ -1,9 +1,22 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from typing import Optional
 from src.config.database import DatabaseConfig
 from scripts.loaders.dimension_loader import DimensionLoader
 from scripts.loaders.fact_loader import FactLoader
+from scripts.loaders.dimension_cache import DimensionKeyCache
+from scripts.loaders.ingestion_manifest import IngestionManifest
+from scripts.loaders.load_checkpoint import LoadCheckpoint
+from scripts.loaders.initial_load import InitialLoad
+from scripts.seen_keys import SeenKeySet
+from scripts.data_profiler import DataProfiler
+from scripts.duckdb_engine import DuckDBTransformEngine
+from scripts.parallel_reader import read_csv_files_parallel
+from scripts.staging_cache import ParquetStagingCache
+from scripts.stage_pipeline import StagePipeline
+from src.models import saude
+from src.models.saude import ColumnSelector
 import logging
 from datetime import date
 
@@ -17,11 +30,134 @@ class HealthETLPipeline:
     Esta classe orquestra todo o processo de dados.
     """
 
-    def __init__(self):
+    # Tipos de leitura: códigos como texto (zeros à esquerda) e
+    # colunas de baixa cardinalidade como category (ver src/models/saude.py)
+    DTYPE_SPEC = saude.read_dtype_spec()
+
+    # Colunas do CSV consumidas pelo transform()
+    COLUNAS_TRANSFORM = [
+        'Data do Atendimento', 'Data de Nascimento',
+        'Qtde Prescrita Farmácia Curitibana', 'Qtde Dispensada Farmácia Curitibana',
+        'Qtde de Medicamento Não Padronizado', 'Cômodos',
+        'Sexo', 'Solicitação de Exames', 'Encaminhamento para Atendimento Especialista',
+        'Desencadeou Internamento', 'Município',
+        'Código da Unidade', 'Código do Procedimento', 'Código do CID', 'Código do CBO', 'cod_usuario',
+    ]
+
+    # Códigos conferidos por _validate_data_quality (zeros à esquerda preservados)
+    COLUNAS_QUALIDADE = [
+        'Código da Unidade', 'Código do Procedimento', 'Código do CBO',
+        'CID do Internamento', 'cod_usuario', 'cod_profissional', 'Código do CID',
+    ]
+
+    # Grafias alternativas de colunas nos CSVs brutos -> nome padronizado
+    ALIASES_COLUNAS = {'Municício': 'Município'}
+
+    def __init__(self, use_key_cache: bool = True, chunksize: Optional[int] = None,
+                 workers: int = 1, use_staging_cache: bool = False,
+                 all_columns: bool = False, incremental: bool = True,
+                 use_watermark: bool = False, hashed_key: bool = False,
+                 profile_sample_size: Optional[int] = None, engine: str = 'pandas',
+                 duckdb_memory_limit: Optional[str] = None, pipelined: bool = False,
+                 queue_size: int = 2, load_workers: int = 1, batch_size: Optional[int] = None,
+                 checkpoint: bool = True, partitioned_fact: bool = False,
+                 initial_load: bool = False, index_workers: int = 4, binary_copy: bool = False):
+        """
+        Args:
+            use_key_cache: Pré-carrega os mapeamentos das dimensões de um cache
+                           em disco (data/processed/cache/), invalidado pela
+                           contagem de linhas e maior ID de cada tabela
+            chunksize: Se informado, executa em modo streaming: cada CSV é lido
+                       em blocos desse tamanho e cada bloco passa por transform
+                       e load, com memória limitada
+            workers: Número de processos para ler os CSVs em paralelo no
+                     extract() (1 = leitura sequencial)
+            use_staging_cache: Converte cada CSV uma única vez para Parquet em
+                               data/processed/staging/ (chave: tamanho, mtime e
+                               hash do conteúdo) e reutiliza nas execuções seguintes
+            all_columns: Modo debug: lê todas as colunas do CSV em vez de apenas
+                         as consumidas por transform() e pelos loaders
+            incremental: Consulta o manifesto de ingestão (etl_arquivos_ingeridos)
+                         em run() e ignora os CSVs já carregados
+            use_watermark: Com incremental, carrega apenas linhas com
+                           'Data do Atendimento' posterior à maior já ingerida
+            hashed_key: Chave compacta: em vez da chave_natural em texto, usa
+                        chave_hash (hash de 64 bits dos mesmos componentes),
+                        gravada em BIGINT na fato (scripts/03_chave_hash.sql)
+            profile_sample_size: Perfila (nulos, zeros à esquerda) uma amostra
+                                 desse tamanho em vez do frame inteiro; as
+                                 contagens de diagnóstico ficam estimadas
+            engine: 'pandas' ou 'duckdb'. Com 'duckdb', extract + transform
+                    rodam em SQL DuckDB direto sobre os CSVs (todos os núcleos,
+                    derramando em data/processed/duckdb_tmp/) e o resultado
+                    chega aos loaders via Arrow; não se aplica ao modo streaming
+            duckdb_memory_limit: Limite de memória do DuckDB (ex.: '8GB')
+            pipelined: Com chunksize, sobrepõe as etapas: o chunk N+1 é lido e
+                       transformado enquanto o chunk N é carregado, cada etapa
+                       em sua thread, ligadas por filas limitadas
+            queue_size: Capacidade de cada fila entre etapas no modo pipelined
+                        (chunks em espera; limita a memória)
+            load_workers: Conexões do pool usadas em paralelo na carga da fato
+                          (partições pelo hash da chave natural); não combina
+                          com batch_size nem com checkpoint no modo streaming
+            batch_size: Commit a cada batch_size linhas na fato e em
+                        dim_perfil_paciente (None = um commit por carga/chunk)
+            checkpoint: No modo streaming, grava em etl_checkpoint_carga a
+                        última linha confirmada de cada CSV (na transação de
+                        cada lote) e retoma dali após uma falha
+            partitioned_fact: A fato é particionada por mês
+                              (scripts/06_fato_particionada.sql): partições
+                              novas são criadas na carga e cada lote vai
+                              direto para a partição do seu mês
+            initial_load: Carga inicial na fato vazia: remove os índices
+                          secundários e as FKs antes da carga e os recria
+                          ao final (recusada se a fato já tiver linhas)
+            index_workers: Índices recriados em paralelo ao fim da carga inicial
+            binary_copy: Envia fato e dimensões no formato binário do COPY
+                         (sem formatar texto para inteiros e datas)
+        """
+        if engine not in ('pandas', 'duckdb'):
+            raise ValueError(f"engine inválido: {engine} (use 'pandas' ou 'duckdb')")
+        if pipelined and not chunksize:
+            raise ValueError("pipelined requer chunksize (modo streaming)")
+        # Partições paralelas não confirmam as linhas em ordem: sem lotes nem checkpoint
+        if load_workers > 1 and batch_size:
+            raise ValueError("load_workers > 1 não combina com batch_size (commit por partição)")
+        if load_workers > 1 and chunksize and checkpoint:
+            raise ValueError("load_workers > 1 não combina com checkpoint no modo streaming (use checkpoint=False)")
+
         self.raw_data_path = Path('data/raw/saude/test_samples/')
         self.processed_data_path = Path('data/processed/')
+        self.use_key_cache = use_key_cache
+        self.chunksize = chunksize
+        self.workers = workers
+        self.use_staging_cache = use_staging_cache
+        self.all_columns = all_columns
         self.df = None # DataFrame principal onde trabalharemos
         self.stats = {}  # Para guardar estatísticas do processo
+        self._seen_keys = None  # Chaves naturais já vistas (apenas no modo streaming)
+        self.incremental = incremental
+        self.use_watermark = use_watermark
+        self.hashed_key = hashed_key
+        self.engine = engine
+        self.duckdb_memory_limit = duckdb_memory_limit
+        self.profiler = DataProfiler(sample_size=profile_sample_size)
+        self._nulos_perfil = {}  # Nulos por coluna do último perfil do transform
+        self._manifest = None   # Manifesto de ingestão (apenas em run() incremental)
+        self._watermark = None  # Marca d'água de 'Data do Atendimento'
+        self._file_ranges = []  # (arquivo, início, fim) de cada CSV no frame extraído
+        self.pipelined = pipelined
+        self.queue_size = queue_size
+        self._stage_pipeline = None  # Etapas em execução (apenas no modo pipelined)
+        self.load_workers = load_workers
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self._checkpoint = None  # Checkpoint da carga (apenas no modo streaming)
+        self.partitioned_fact = partitioned_fact
+        self.initial_load = initial_load
+        self.index_workers = index_workers
+        self.binary_copy = binary_copy
+        self._hash_backfill_feito = False  # backfill de chave_hash já executado nesta instância
 
     def run(self):
         """
@@ -31,11 +167,29 @@ class HealthETLPipeline:
 
         try:
 
-            self.extract() #Extração
+            if self.incremental and not self._prepare_incremental():
+                print("✅ Nenhum arquivo novo para ingerir")
+                return
+
+            carga_inicial = self._prepare_initial_load() if self.initial_load else None
+
+            try:
+                if self.chunksize:
+                    self.run_streaming() # Extração, transformação e carga por chunk
+                elif self.engine == 'duckdb':
+                    self.extract_transform_duckdb() # Extração + transformação em SQL
 
-            self.transform() #Transformação
+                    self.load() #Carga
+                else:
+                    self.extract() #Extração
+
+                    self.transform() #Transformação
 
-            self.load() #Carga
+                    self.load() #Carga
+            finally:
+                # Índices e FKs voltam mesmo se a carga falhar
+                if carga_inicial:
+                    carga_inicial.restore()
 
             self._print_statistics()
             print("✅ Pipeline de saúde concluído com sucesso!")
@@ -45,6 +199,232 @@ class HealthETLPipeline:
             print(f"❌ Erro no pipeline de saúde: {e}")
             raise
 
+    def reprocess_rejects(self):
+        """
+        Reprocessa as linhas de fato_atendimento_rejeitos (FK faltando)
+        depois de corrigidas as dimensões, em uma única passada em SQL.
+        """
+        with DatabaseConfig.get_connection(session='bulk') as conn:
+            fact_loader = FactLoader({}, hashed_key=self.hashed_key, partitioned=self.partitioned_fact)
+            resultado = fact_loader.reprocess_rejects(conn)
+
+        for chave, valor in resultado.items():
+            self.stats[f'rejeitos_{chave}'] = valor
+        return resultado
+
+    def _prepare_initial_load(self) -> InitialLoad:
+        """
+        Carga inicial: com a fato vazia, adia índices secundários e FKs para
+        o fim da carga. A carga incremental (padrão) não passa por aqui.
+        """
+        print("🚀 Modo carga inicial")
+        carga_inicial = InitialLoad(workers=self.index_workers)
+        with DatabaseConfig.get_connection() as conn:
+            carga_inicial.prepare(conn)
+        return carga_inicial
+
+    def run_streaming(self):
+        """
+        Executa extract → transform → load chunk a chunk.
+
+        Cada arquivo é lido com read_csv(chunksize=...), e cada chunk passa
+        pelas mesmas etapas de transform() e pelos loaders. Apenas um chunk
+        fica em memória por vez; a deduplicação por chave_natural entre
+        chunks usa um conjunto de hashes das chaves já vistas.
+
+        Com checkpoint=True, cada lote confirmado atualiza o checkpoint do
+        arquivo na mesma transação; uma nova execução pula as linhas já
+        confirmadas de cada CSV.
+
+        Com pipelined=True as três etapas rodam em threads ligadas por filas
+        de queue_size chunks: enquanto o chunk N é carregado no banco, o
+        N+1 já é lido e transformado. Um erro em qualquer etapa cancela as
+        demais e é relançado aqui.
+        """
+        print(f"📥 Modo streaming: chunks de {self.chunksize:,} linhas")
+
+        csv_files = self._find_csv_files()
+        self._seen_keys = SeenKeySet()
+        self.stats['registros_extraidos'] = 0
+
+        with DatabaseConfig.get_connection(session='bulk') as conn:
+            if self.checkpoint:
+                self._checkpoint = LoadCheckpoint()
+                self._checkpoint.load(conn)
+
+            dimension_loader = self._create_dimension_loader()
+            load_chunk = self._chunk_loader(conn, dimension_loader)
+
+            if self.pipelined:
+                print(f"   🔀 Etapas sobrepostas (filas de {self.queue_size} chunks)")
+                self._stage_pipeline = StagePipeline(
+                    self._iter_stream(csv_files),
+                    [('transform', self._transform_chunk), ('load', load_chunk)],
+                    maxsize=self.queue_size,
+                )
+                try:
+                    self.stats['etapas'] = self._stage_pipeline.run()
+                finally:
+                    self._stage_pipeline = None
+                self._print_stage_times()
+            else:
+                for item in self._iter_stream(csv_files):
+                    load_chunk(self._transform_chunk(item))
+
+            dimension_loader.persist_cache(conn)
+
+        self.stats['arquivos_processados'] = len(csv_files)
+        self.stats['chaves_unicas_vistas'] = len(self._seen_keys)
+        self._seen_keys = None
+        self._checkpoint = None
+
+    def reload_month(self, mes, modo: str = 'swap'):
+        """
+        Recarrega um único mês da fato particionada a partir de todos os CSVs
+        (ignora o manifesto), trocando ou esvaziando só a partição do mês.
+
+        Args:
+            mes: Mês a recarregar (ex.: '2024-03')
+            modo: 'swap' (carrega ao lado e troca) ou 'truncate'
+        """
+        if not self.partitioned_fact:
+            raise ValueError("reload_month requer partitioned_fact=True")
+
+        mes = pd.Period(mes, freq='M')
+        print(f"🔄 Recarregando o mês {mes} da fato...")
+
+        self._manifest = None
+        self.extract()
+        self.transform()
+        self.df = self.df[self.df['Data do Atendimento'].dt.to_period('M') == mes]
+
+        with DatabaseConfig.get_connection(session='bulk') as conn:
+            dimension_loader = self._create_dimension_loader()
+            self._verify_data_types_before_load(self.df)
+            dimension_maps = dimension_loader.load_all(self.df, conn)
+
+            fact_loader = FactLoader(dimension_maps, hashed_key=self.hashed_key, partitioned=True,
+                                     binary_copy=self.binary_copy)
+            resultado = fact_loader.reload_month(self.df, conn, mes, modo)
+
+        for chave, valor in resultado.items():
+            self.stats[f'fato_{chave}'] = valor
+        return resultado
+
+    def cancel(self):
+        """Cancela uma execução pipelined em andamento (chamado de outra thread)"""
+        if self._stage_pipeline is not None:
+            self._stage_pipeline.cancel()
+
+    def _iter_stream(self, csv_files):
+        """
+        Etapa extract do modo streaming: (arquivo, chunk) para cada chunk
+        e (arquivo, None) ao fim de cada arquivo.
+        """
+        for csv_file in csv_files:
+            print(f"Lendo arquivo: {csv_file.name}")
+
+            # Linhas já confirmadas em uma execução interrompida
+            inicio = self._checkpoint.start_row(csv_file) if self._checkpoint is not None else 0
+            if inicio:
+                print(f"   📍 Retomando {csv_file.name} a partir da linha {inicio:,} (checkpoint)")
+
+            for n_chunk, chunk in enumerate(self._iter_csv_chunks(csv_file)):
+                if len(chunk) == 0 or chunk.index[-1] < inicio:
+                    continue
+                if chunk.index[0] < inicio:
+                    chunk = chunk.loc[inicio:].copy()
+
+                print(f"\n📦 {csv_file.name} - chunk {n_chunk + 1} ({len(chunk):,} linhas)")
+                self.stats['registros_extraidos'] += len(chunk)
+                yield csv_file, chunk
+
+            yield csv_file, None
+
+    def _transform_chunk(self, item):
+        """Etapa transform do modo streaming: (arquivo, chunk transformado, linhas lidas)"""
+        csv_file, chunk = item
+        if chunk is None:
+            return csv_file, None, 0
+
+        self.df = chunk
+        if 'colunas_extraídas' not in self.stats:
+            self.stats['colunas_extraídas'] = list(chunk.columns)
+            self._validate_data_quality()
+
+        self.transform()
+        df, self.df = self.df, None
+        return csv_file, df, len(chunk)
+
+    def _chunk_loader(self, conn, dimension_loader):
+        """
+        Etapa load do modo streaming. Carrega cada chunk transformado,
+        atualiza o checkpoint a cada lote e, ao fim de cada arquivo,
+        registra-o no manifesto.
+        """
+        linhas_arquivo, datas_arquivo = {}, {}
+
+        def iniciar_arquivo(csv_file):
+            # Retomada: linhas e datas já confirmadas vêm do checkpoint
+            posicao = self._checkpoint.position(csv_file) if self._checkpoint is not None else None
+            if posicao is None:
+                linhas_arquivo[csv_file], datas_arquivo[csv_file] = 0, []
+            else:
+                linhas_arquivo[csv_file] = posicao['ultima_linha'] + 1
+                datas_arquivo[csv_file] = [pd.Series([posicao['data_atendimento_min'], posicao['data_atendimento_max']],
+                                                     dtype='datetime64[ns]')]
+
+        def load_chunk(item):
+            csv_file, df, linhas = item
+            if csv_file not in linhas_arquivo:
+                iniciar_arquivo(csv_file)
+
+            if df is None:  # fim do arquivo
+                linhas, datas = linhas_arquivo.pop(csv_file), datas_arquivo.pop(csv_file)
+                if self._checkpoint is not None:
+                    self._checkpoint.clear(conn, csv_file)
+                if self._manifest is not None:
+                    self._register_ingested_file(conn, csv_file, linhas, datas)
+                else:
+                    conn.commit()
+                return
+
+            datas = df['Data do Atendimento']
+            datas_chunk = pd.Series([datas.min(), datas.max()], dtype='datetime64[ns]')
+
+            on_batch = None
+            if self._checkpoint is not None:
+                def on_batch(conn_lote, lote):
+                    datas_lote = lote['data_atendimento']
+                    self._save_checkpoint(conn_lote, csv_file, int(lote.index[-1]), datas_arquivo[csv_file] + [
+                        pd.Series([datas_lote.min(), datas_lote.max()], dtype='datetime64[ns]')])
+
+            if len(df):  # pode ficar vazio com a marca d'água
+                self._load_frame(conn, dimension_loader, persist_cache=False, df=df, on_batch=on_batch)
+
+            linhas_arquivo[csv_file] += linhas
+            datas_arquivo[csv_file].append(datas_chunk)
+
+            # Fim do chunk: confirma até a última linha lida (inclusive as descartadas no transform)
+            if self._checkpoint is not None:
+                self._save_checkpoint(conn, csv_file, linhas_arquivo[csv_file] - 1, datas_arquivo[csv_file])
+                conn.commit()
+
+        return load_chunk
+
+    def _save_checkpoint(self, conn, csv_file, ultima_linha, datas):
+        """Grava o checkpoint de um arquivo (sem commit)"""
+        datas = pd.concat(datas)
+        self._checkpoint.save(conn, csv_file, ultima_linha // self.chunksize, ultima_linha,
+                              datas.min(), datas.max())
+
+    def _print_stage_times(self):
+        """Tempo ocupado e ocioso de cada etapa do modo pipelined"""
+        print("\n⏱️  Tempo por etapa (ocupado / esperando entrada / esperando saída):")
+        for etapa, tempos in self.stats['etapas'].items():
+            print(f"   {etapa}: {tempos['ocupado_s']:.2f}s / {tempos['espera_entrada_s']:.2f}s / "
+                  f"{tempos['espera_saida_s']:.2f}s ({tempos['itens']} itens)")
+
     def extract(self):
         """
         Extrai os dados brutos dos arquivos CSV.
@@ -52,58 +432,211 @@ class HealthETLPipeline:
         print("📥 Extraindo dados brutos...")
 
         # 1. Encontrar todos os arquivos CSV na pasta raw_data_path
-        csv_files = list(self.raw_data_path.glob('*.csv'))
+        csv_files = self._find_csv_files()
+        self._file_ranges = []
+
+        # 2. Ler e combinar todos os arquivos em um único DataFrame
+        staging_cache = self._get_staging_cache()
+
+        if staging_cache is not None:
+            # O Parquet guarda todas as colunas; a projeção é feita na leitura
+            data_frames = staging_cache.read_many(
+                csv_files, self._read_csv_options(projetar=False), self.workers,
+                columns=self._projected_columns()
+            )
+        elif self.workers > 1 and len(csv_files) > 1:
+            print(f"Lendo {len(csv_files)} arquivos em paralelo ({self.workers} processos)...")
+            data_frames = read_csv_files_parallel(csv_files, self._read_csv_options(), self.workers)
+        else:
+            data_frames = []
+
+            for csv_file in csv_files:
+                print(f"Lendo arquivo: {csv_file.name}")
+
+                # Ler CSV com configurações para dados brasileiros
+                df_temp = pd.read_csv(csv_file, **self._read_csv_options())
+                
+                data_frames.append(df_temp)
+
+        # Intervalo de linhas de cada arquivo no frame concatenado (para o manifesto)
+        inicio = 0
+        for csv_file, df_temp in zip(csv_files, data_frames):
+            self._file_ranges.append((csv_file, inicio, inicio + len(df_temp)))
+            inicio += len(df_temp)
+
+        # 3. Concatenar todos os DataFrames e renomear Município
+        self.df = self._standardize_columns(saude.concat_preserving_categories(data_frames))
+
+        # 4. Salvar estatísticas 
+        self.stats['arquivos_processados'] = len(csv_files)
+        self.stats['registros_extraidos'] = len(self.df)
+        self.stats['colunas_extraídas'] = list(self.df.columns)
+        self._report_memory('extract')
+
+        # 5. Verificação de qualidade
+        self._validate_data_quality()
+
+    def extract_transform_duckdb(self):
+        """
+        Extract + transform pelo DuckDB: mesmo frame que extract() seguido de
+        transform(), calculado em SQL e convertido de Arrow para pandas.
+        """
+        print("🦆 Extraindo e transformando com DuckDB...")
+
+        if not DuckDBTransformEngine.is_available():
+            raise ImportError("duckdb não instalado - use engine='pandas'")
+
+        csv_files = self._find_csv_files()
+        engine = DuckDBTransformEngine(
+            memory_limit=self.duckdb_memory_limit,
+            temp_directory=self.processed_data_path / 'duckdb_tmp',
+        )
+        tabela = engine.extract_transform(
+            csv_files, self._projected_columns(), self.ALIASES_COLUNAS,
+            watermark=self._watermark, dedup=not self.hashed_key,
+        )
+
+        # Arrow -> pandas (libera os buffers do Arrow à medida que converte)
+        df = tabela.to_pandas(coerce_temporal_nanoseconds=True, split_blocks=True, self_destruct=True)
+        del tabela
+        self.df = saude.apply_transform_schema(df.set_index('_linha').rename_axis(None))
+        self.df.index = self.df.index.astype('int64')
+
+        # Estatísticas equivalentes às do extract()/transform()
+        linhas_por_arquivo = engine.stats.pop('linhas_por_arquivo')
+        self._file_ranges = []
+        inicio = 0
+        for csv_file, linhas in zip(csv_files, linhas_por_arquivo):
+            self._file_ranges.append((csv_file, inicio, inicio + linhas))
+            inicio += linhas
+
+        self.stats['arquivos_processados'] = len(csv_files)
+        self.stats.update(engine.stats)
+        self.stats['colunas_extraídas'] = [c for c in self.df.columns if c not in FactLoader.COLUNAS_DERIVADAS]
+        print(f"   ✅ {self.stats['registros_extraidos']:,} linhas lidas, "
+              f"{self.stats['duplicatas_removidas']:,} duplicatas removidas")
+
+        if self.hashed_key:
+            self._create_hashed_key()  # hash calculado no pandas, deduplicação já feita no SQL
+
+        self._report_memory('transform')
+
+    def _find_csv_files(self):
+        """Encontra todos os arquivos CSV na pasta raw_data_path"""
+        csv_files = sorted(self.raw_data_path.glob('*.csv'))
 
         if not csv_files:
             raise FileNotFoundError(f"Nenhum arquivo CSV encontrado em {self.raw_data_path}")
         
         print(f"Encontrados {len(csv_files)} arquivos CSV.")
 
-        # 2 Definir tipos para colunas de códigos (podem conter zeros à esquerda)
-        dtype_spec = {
-        'Código da Unidade': 'str',
-        'Código do Procedimento': 'str', 
-        'Código do CBO': 'str',
-        'Código do CID': 'str',
-        'CID do Internamento': 'str',
-        'cod_usuario': 'str',           # Pode ter zeros à esquerda
-        'cod_profissional': 'str'       # Pode ter zeros à esquerda
-        }
+        # Carga incremental: ignora os arquivos já registrados no manifesto
+        if self._manifest is not None:
+            pendentes = self._manifest.pending_files(csv_files)
+            print(f"   ⏭️  {len(csv_files) - len(pendentes)} já ingerido(s), {len(pendentes)} pendente(s)")
+            csv_files = pendentes
 
-        # 3. Ler e combinar todos os arquivos em um único DataFrame
-        data_frames = []
+        return csv_files
 
-        for csv_file in csv_files:
-            print(f"Lendo arquivo: {csv_file.name}")
+    def _prepare_incremental(self) -> bool:
+        """
+        Lê o manifesto de ingestão e define a marca d'água.
+
+        Returns:
+            False se não houver nenhum arquivo novo a processar
+        """
+        self._manifest = IngestionManifest()
+        with DatabaseConfig.get_connection() as conn:
+            self._manifest.load(conn)
+
+        if self.use_watermark:
+            self._watermark = self._manifest.watermark()
+            if self._watermark is not None:
+                print(f"   📒 Marca d'água: apenas atendimentos após {self._watermark}")
+
+        return bool(self._find_csv_files())
+
+    def _register_ingested_file(self, conn, csv_file, linhas, datas):
+        """Registra um arquivo no manifesto, com o intervalo de 'Data do Atendimento' carregado"""
+        datas = pd.concat(datas) if datas else pd.Series(dtype='datetime64[ns]')
+        self._manifest.register(conn, csv_file, linhas, datas.min(), datas.max())
+        conn.commit()
 
-            # Ler CSV com configurações para dados brasileiros
-            df_temp = pd.read_csv(
-                csv_file,
-                sep=';',               # Separador comum em CSVs BR
-                encoding='latin-1',    # Encoding comum em dados BR  
-                low_memory=False,      # Evita warnings de memória
-                dtype=dtype_spec,      # códigos como string
-                parse_dates=False      # Parse datas manual
+    @classmethod
+    def required_columns(cls):
+        """
+        União das colunas do CSV consumidas por transform(), DimensionLoader,
+        FactLoader e pela validação de qualidade do extract.
+        """
+        colunas = (cls.COLUNAS_TRANSFORM + DimensionLoader.required_columns() +
+                   FactLoader.required_columns() + cls.COLUNAS_QUALIDADE)
+        return list(dict.fromkeys(colunas))
+
+    def _projected_columns(self):
+        """Colunas a ler (incluindo grafias alternativas), ou None para todas"""
+        if self.all_columns:
+            return None
+
+        colunas = self.required_columns()
+        aliases = [alias for alias, nome in self.ALIASES_COLUNAS.items() if nome in colunas]
+        return colunas + aliases
+
+    def _read_csv_options(self, projetar: bool = True):
+        """Configurações de leitura para os CSVs do e-Saúde"""
+        options = dict(
+            sep=';',               # Separador comum em CSVs BR
+            encoding='latin-1',    # Encoding comum em dados BR  
+            low_memory=False,      # Evita warnings de memória
+            dtype=self.DTYPE_SPEC, # códigos como string, categorias como category
+            parse_dates=False      # Parse datas manual
+        )
+
+        # Lê apenas as colunas usadas pelas etapas seguintes
+        colunas = self._projected_columns()
+        if projetar and colunas is not None:
+            options['usecols'] = ColumnSelector(colunas)
+
+        return options
+
+    def _iter_csv_chunks(self, csv_file):
+        """Lê um CSV em blocos de self.chunksize linhas (do Parquet de staging, se houver)"""
+        reader = None
+
+        staging_cache = self._get_staging_cache()
+        if staging_cache is not None:
+            reader = staging_cache.iter_chunks(
+                csv_file, self._read_csv_options(projetar=False), self.chunksize,
+                columns=self._projected_columns()
             )
-            
-            data_frames.append(df_temp)
 
-        # 4. Concatenar todos os DataFrames e renomear Município
-        self.df = pd.concat(data_frames, ignore_index=True) # Limite para teste rápido
+        if reader is None:
+            reader = pd.read_csv(csv_file, chunksize=self.chunksize, **self._read_csv_options())
 
-        if 'Municício' in self.df.columns:
-            self.df.rename(columns={'Municício': 'Município'}, inplace=True)
-    
-        # 🚀 MELHORIA FUTURA: Para projetos maiores, criar função _standardize_column_names()
-        # que gerencia múltiplas inconsistências de nomenclatura automaticamente
+        # Índice = número da linha no CSV (o Parquet recomeça em 0 a cada bloco)
+        inicio = 0
+        for chunk in reader:
+            chunk.index = pd.RangeIndex(inicio, inicio + len(chunk))
+            inicio += len(chunk)
+            yield self._standardize_columns(chunk)
 
-        # 5. Salvar estatísticas 
-        self.stats['arquivos_processados'] = len(csv_files)
-        self.stats['registros_extraidos'] = len(self.df)
-        self.stats['colunas_extraídas'] = list(self.df.columns)
+    def _get_staging_cache(self):
+        """Cache Parquet de staging, se habilitado e com pyarrow disponível"""
+        if not self.use_staging_cache:
+            return None
 
-        # 6. Verificação de qualidade
-        self._validate_data_quality()
+        if not ParquetStagingCache.is_available():
+            print("   ⚠️  pyarrow não instalado - cache de staging Parquet desabilitado")
+            return None
+
+        return ParquetStagingCache(self.processed_data_path / 'staging')
+
+    @classmethod
+    def _standardize_columns(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Corrige inconsistências de nomenclatura dos CSVs"""
+        aliases = {alias: nome for alias, nome in cls.ALIASES_COLUNAS.items() if alias in df.columns}
+        if aliases:
+            df = df.rename(columns=aliases)
+        return df
 
     def  transform(self):
         """Fase 2: Limpeza e transformação dos dados"""
@@ -111,12 +644,14 @@ class HealthETLPipeline:
         
         # Ordem CRÍTICA das transformações
         self._convert_dates()           # 1. Datas primeiro
+        self._apply_watermark()         #    Carga incremental (opcional)
         self._convert_numeric()         # 2. Depois números
         self._handle_missing_values()   # 3. Tratar nulos (já existe)
         self._clean_na_values()         # 4. NOVO: Limpar NaNs de códigos!
         self._create_derived_columns()  # 5. Novas colunas
         self._create_natural_key()      # 6. Chave única
         
+        self._report_memory('transform')
         print("   ✅ Transformação concluída")
         
     def _convert_dates(self):
@@ -125,38 +660,59 @@ class HealthETLPipeline:
         
         for col in date_cols:
             if col in self.df.columns:
-                self.df[col] = pd.to_datetime(
-                    self.df[col], 
-                    format='%d/%m/%Y %H:%M:%S',
-                    errors='coerce'
-                    )
+                # Parser de formato fixo sobre os valores únicos (errors='coerce')
+                self.df[col], n_invalidos = saude.parse_esaude_datetime(self.df[col])
+
+                chave = f"datas_invalidas_{col.lower().replace(' ', '_')}"
+                self.stats[chave] = self.stats.get(chave, 0) + n_invalidos
+                if n_invalidos:
+                    print(f"      ⚠️  {col}: {n_invalidos} datas inválidas → NaT")
         
         print("  🔄 Datas convertidas para datetime")
 
+    def _apply_watermark(self):
+        """Mantém apenas atendimentos posteriores à marca d'água, se definida"""
+        if self._watermark is None:
+            return
+
+        antes = len(self.df)
+        self.df = self.df[self.df['Data do Atendimento'] > self._watermark]
+        descartados = antes - len(self.df)
+
+        self.stats['descartados_marca_dagua'] = self.stats.get('descartados_marca_dagua', 0) + descartados
+        print(f"  🔄 Marca d'água: {descartados} registros anteriores a {self._watermark} descartados")
+
     def _convert_numeric(self):
         """Trata valores missing e converte numéricos SIMPLES"""
     
-        # Colunas que queremos como inteiros
-        int_columns = [
-            'Qtde Prescrita Farmácia Curitibana',
-            'Qtde Dispensada Farmácia Curitibana', 
-            'Qtde de Medicamento Não Padronizado',
-            'Cômodos'
-        ]
-        
-        for col in int_columns:
+        # Colunas que queremos como inteiros (tipos pequenos definidos no schema)
+        for col, dtype in saude.COLUNAS_QUANTIDADE.items():
             if col in self.df.columns:
-                # Converte para numérico, trata erros, depois para inteiro
-                self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
-                self.df[col] = self.df[col].fillna(0).astype(int)
-                print(f"   ✅ {col} convertida para inteiro")
+                # Converte para numérico (fração truncada), trata erros, depois para inteiro
+                convertido = saude.to_small_int(self.df[col], dtype)
+
+                # Fora da faixa do tipo pequeno: o tipo é alargado, nunca zerado
+                info = np.iinfo(dtype.lower())
+                n_fora = int(((convertido < info.min) | (convertido > info.max)).sum())
+                if n_fora:
+                    chave = f"fora_da_faixa_{col.lower().replace(' ', '_')}"
+                    self.stats[chave] = self.stats.get(chave, 0) + n_fora
+                    print(f"      ⚠️  {col}: {n_fora} valores fora da faixa de {dtype} → tipo alargado "
+                          f"para {convertido.dtype}")
+
+                self.df[col] = convertido.fillna(0)
+                print(f"   ✅ {col} convertida para inteiro ({convertido.dtype})")
     
     def _handle_missing_values(self):
         """Trata valores missing em colunas categóricas importantes"""
         
         print("  🔄 Tratando valores missing...")
 
-        total_nulos_inicial = self.df.isnull().sum().sum()
+        # Uma passada por coluna: os nulos servem a este passo, à validação
+        # de integridade e à limpeza dos códigos
+        perfil = self._profile('transform')
+        nulos = {col: info['nulos'] for col, info in perfil['colunas'].items()}
+        total_nulos_inicial = DataProfiler.total_nulls(perfil)
 
         # Apenas colunas que NÃO podem ser NULL na tabela fato
         CRITICAL_COLUMNS = {
@@ -167,24 +723,31 @@ class HealthETLPipeline:
         
         for col, fill_value in CRITICAL_COLUMNS.items():
             if col in self.df.columns:
-                n_nulos = self.df[col].isna().sum()
-                if n_nulos > 0:
-                    self.df[col] = self.df[col].fillna(fill_value)
+                n_nulos = nulos.get(col, 0)
+                if n_nulos > 0 or perfil['amostrado']:
+                    self.df[col] = saude.fillna_categorical_safe(self.df[col], fill_value)
                     print(f"      ✅ {col}: {n_nulos} nulos → '{fill_value}'")
+                    nulos[col] = 0
                 else:
                     print(f"      ℹ️  {col}: sem nulos")
 
-        # Validaçao da integridade de dados
-        total_nulos_final = self.df.isna().sum().sum()
+        # Validaçao da integridade de dados (sem nova varredura: só as colunas críticas mudaram)
+        total_nulos_final = sum(nulos.values())
 
         print(f"   🔍 Total de valores missing antes: {total_nulos_inicial}, depois: {total_nulos_final}")
 
         # Validaçao final
-        self._validate_data_integrity()
+        self._validate_data_integrity(nulos)
+        self._nulos_perfil = nulos
 
     def _clean_na_values(self):
-        """Limpa valores 'NA' ou similares em colunas de códigos"""
-        print("  🔄 Substituindo valores 'NA' em colunas de códigos por None (NULL no Postgre)...")
+        """
+        Contabiliza os nulos das colunas de códigos.
+
+        Os códigos já chegam do extract como string anulável (saude.TIPO_CODIGO):
+        o NA vira NULL direto no COPY, sem converter para objetos None.
+        """
+        print("  🔄 Verificando valores 'NA' em colunas de códigos (NULL no Postgre)...")
         
         CODE_COLUMNS = [
             'Código da Unidade',
@@ -196,22 +759,19 @@ class HealthETLPipeline:
         ]
         
         cleaned_count = 0
+        nulos = self._nulos_perfil
         
         for col in CODE_COLUMNS:
             if col in self.df.columns:
-                # Contar NaNs antes
-                n_nans_before = self.df[col].isna().sum()
+                # NaNs (do perfil feito em _handle_missing_values)
+                n_nans_before = nulos.get(col, 0)
 
-                # Substituir valores comuns de 'NA' por NaN
-                self.df[col] = self.df[col].replace({np.nan: None})
-
-                #Contar após limpeza
                 cleaned_count += n_nans_before
 
                 if n_nans_before > 0:
-                    print(f"      ✅ {col}: {n_nans_before} valores limpos para NULL")
+                    print(f"      ✅ {col}: {n_nans_before} valores serão gravados como NULL")
                 
-        print(f"   🔍 Total de valores 'NA' limpos: {cleaned_count}")
+        print(f"   🔍 Total de valores 'NA' em códigos: {cleaned_count}")
 
     def _create_derived_columns(self):
         """Cria novas colunas derivadas (feature engineering)"""
@@ -224,36 +784,61 @@ class HealthETLPipeline:
         self.df['diff_prescrito_dispensado'] = self.df['Qtde Prescrita Farmácia Curitibana'] - self.df['Qtde Dispensada Farmácia Curitibana']
         
         # Flag para atendimento que gerou internação
-        self.df['gerou_internamento'] = self.df['Desencadeou Internamento'].apply(lambda x: 1 if x == 'Sim' else 0)
+        # (comparação direta: .apply em coluna category propagaria NaN)
+        self.df['gerou_internamento'] = (self.df['Desencadeou Internamento'] == 'Sim').astype('int8')
         
-        # Flag para morador de Curitiba ou região metropolitana
-        self.df['morador_curitiba_rm'] = self.df['Município'].apply(lambda x: "Curitiba" if x == "Curitiba" else "Região Metropolitana")
+        # Flag para morador de Curitiba ou região metropolitana (município ausente conta como RM)
+        fora_de_curitiba = (self.df['Município'] != 'Curitiba').to_numpy(dtype='int8')
+        self.df['morador_curitiba_rm'] = pd.Categorical.from_codes(
+            fora_de_curitiba, categories=saude.CATEGORIAS_DERIVADAS['morador_curitiba_rm']
+        )
 
         # Perídodo do dia do atendimento
-        self.df['periodo_dia'] = self.df['Data do Atendimento'].dt.hour.apply(
-        lambda x: 'Manhã' if 6 <= x < 12 else 
-                  'Tarde' if 12 <= x < 18 else 
-                  'Noite' if 18 <= x < 24 else 'Madrugada')
+        self.df['periodo_dia'] = self.periodo_dia(self.df['Data do Atendimento'])
         
         # Faixa etária
-        self.df['faixa_etaria'] = self.df['idade'].apply(
-        lambda x: 'Criança' if x <= 12 else 
-                  'Adolescente' if x <= 19 else 
-                  'Adulto' if x <= 59 else 'Idoso'
-    )
+        self.df['faixa_etaria'] = self.faixa_etaria(self.df['idade'])
 
         print("   ✅ Colunas derivadas criadas")
 
+    @staticmethod
+    def periodo_dia(datas: pd.Series) -> pd.Series:
+        """
+        Período do dia do atendimento (vetorizado).
+
+        Manhã [6, 12), Tarde [12, 18), Noite [18, 24), Madrugada no resto,
+        inclusive hora ausente (NaT), como na versão com .apply.
+        """
+        hora = datas.dt.hour.to_numpy(dtype='float64', na_value=np.nan)
+        codigos = np.select(
+            [(hora >= 6) & (hora < 12), (hora >= 12) & (hora < 18), (hora >= 18) & (hora < 24)],
+            [1, 2, 3],
+            default=0,
+        )
+        categorias = saude.CATEGORIAS_DERIVADAS['periodo_dia']  # Madrugada, Manhã, Tarde, Noite
+        return pd.Series(pd.Categorical.from_codes(codigos, categories=categorias), index=datas.index)
+
+    @staticmethod
+    def faixa_etaria(idades: pd.Series) -> pd.Series:
+        """
+        Faixa etária (vetorizada): até 12 Criança, até 19 Adolescente,
+        até 59 Adulto e Idoso no resto, inclusive idade ausente (NaN),
+        como na versão com .apply.
+        """
+        categorias = saude.CATEGORIAS_DERIVADAS['faixa_etaria']
+        faixas = pd.cut(idades, bins=[-np.inf, 12, 19, 59, np.inf], labels=categorias)
+        return faixas.fillna('Idoso')
+
     def _create_natural_key(self):
         """Cria a chave natural única para cada atendimento."""
+        if self.hashed_key:
+            self._create_hashed_key()
+            return
+
         print("  🔄 Criando chave natural única...")
         
-        self.df['chave_natural'] = (
-            self.df['Data do Atendimento'].astype(str) + 
-            '_' + self.df['Código da Unidade'].astype(str) + 
-            '_' + self.df['cod_usuario'].astype(str) + 
-            '_' + self.df['Código do Procedimento'].astype(str)
-        )
+        # Código nulo entra como 'None' (mesmo texto das cargas anteriores)
+        self.df['chave_natural'] = saude.natural_key_text(self.df)
         
         duplicates = self.df[self.df.duplicated('chave_natural', keep=False)]
 
@@ -266,6 +851,9 @@ class HealthETLPipeline:
         self.df = self.df.drop_duplicates(subset=['chave_natural'], keep='first')
         print(f"🔄 Removidas {len(duplicates) - len(duplicates.drop_duplicates('chave_natural'))} duplicatas")
 
+        # Modo streaming: descarta chaves já vistas em chunks anteriores
+        self._drop_keys_seen_in_previous_chunks('chave_natural')
+
         # Valida se realmente é única
         total_registros = len(self.df)
         registros_unicos = self.df['chave_natural'].nunique()
@@ -278,7 +866,64 @@ class HealthETLPipeline:
         else:
             print("      ✅ Chave natural é única!")
 
-    def _verify_data_types_before_load(self):
+    def _create_hashed_key(self):
+        """
+        Cria chave_hash (int64) e deduplica por ela.
+
+        Linhas com o mesmo hash só são descartadas se os componentes também
+        forem iguais; se houver colisão (componentes diferentes, mesmo hash),
+        a linha extra fica com chave_hash nula e o FactLoader a grava pela
+        chave em texto.
+        """
+        print("  🔄 Criando chave natural compacta (hash de 64 bits)...")
+
+        self.df['chave_hash'] = pd.array(saude.hash_natural_key(self.df), dtype='Int64')
+
+        # Só as linhas com hash repetido precisam da comparação por componentes
+        hash_repetido = self.df.duplicated('chave_hash', keep=False)
+        if hash_repetido.any():
+            repetidas = self.df.loc[hash_repetido, ['chave_hash'] + saude.COLUNAS_CHAVE_NATURAL]
+            duplicatas = repetidas.duplicated(saude.COLUNAS_CHAVE_NATURAL, keep='first')
+            colisoes = repetidas.duplicated('chave_hash', keep='first') & ~duplicatas
+
+            if colisoes.any():
+                print(f"  ⚠️  {int(colisoes.sum())} colisões de hash: gravadas pela chave em texto")
+                self.df.loc[colisoes[colisoes].index, 'chave_hash'] = pd.NA
+            self.stats['colisoes_chave_hash'] = self.stats.get('colisoes_chave_hash', 0) + int(colisoes.sum())
+
+            # ✅ DECISÃO: Manter a PRIMEIRA ocorrência, descartar duplicatas
+            self.df = self.df.drop(index=duplicatas[duplicatas].index)
+            print(f"🔄 Removidas {int(duplicatas.sum())} duplicatas")
+
+        # Modo streaming: descarta chaves já vistas em chunks anteriores
+        self._drop_keys_seen_in_previous_chunks('chave_hash')
+
+        # Valida se realmente é única (as colisões, sem hash, já são únicas pelos componentes)
+        com_hash = self.df['chave_hash'].dropna()
+        print(f"      📊 Registros: {len(self.df):,}")
+        print(f"      🔑 Chaves únicas: {com_hash.nunique() + (len(self.df) - len(com_hash)):,}")
+
+        if not com_hash.is_unique:
+            raise ValueError("Chave hash não é única após a deduplicação!")
+        print("      ✅ Chave natural é única!")
+
+    def _drop_keys_seen_in_previous_chunks(self, coluna: str):
+        """Modo streaming: descarta as chaves já vistas em chunks anteriores"""
+        if self._seen_keys is None:
+            return
+
+        chaves = self.df[coluna]
+        novas = np.ones(len(chaves), dtype=bool)
+        presentes = chaves.notna().to_numpy()  # colisões sem hash não entram no conjunto
+        novas[presentes] = self._seen_keys.filter_new(chaves[presentes])
+
+        n_repetidas = int((~novas).sum())
+        if n_repetidas:
+            self.df = self.df[novas]
+            print(f"🔄 Removidas {n_repetidas} duplicatas de chunks anteriores")
+        self.stats['duplicatas_entre_chunks'] = self.stats.get('duplicatas_entre_chunks', 0) + n_repetidas
+
+    def _verify_data_types_before_load(self, df: pd.DataFrame):
         """Verifica se os tipos de dados estão compatíveis"""
         print("🔍 Verificando tipos de dados antes do load...")
         
@@ -286,15 +931,15 @@ class HealthETLPipeline:
         code_columns = ['Código da Unidade', 'Código do Procedimento', 'Código do CID', 'Código do CBO', 'cod_usuario']
         
         for col in code_columns:
-            if col in self.df.columns:
-                dtype = self.df[col].dtype
-                sample = self.df[col].iloc[0] if len(self.df) > 0 else 'N/A'
+            if col in df.columns:
+                dtype = df[col].dtype
+                sample = df[col].iloc[0] if len(df) > 0 else 'N/A'
                 print(f"   {col}: dtype={dtype}, amostra='{sample}'")
                 
-                # Se não for string, converter
-                if dtype != 'object':
+                # Se não for texto, converter (mantendo os nulos como NA, não 'nan')
+                if not pd.api.types.is_string_dtype(dtype):
                     print(f"   ⚠️  Convertendo {col} para string...")
-                    self.df[col] = self.df[col].astype(str)
+                    df[col] = df[col].astype(saude.TIPO_CODIGO)
 
     def load(self):
         """
@@ -303,41 +948,88 @@ class HealthETLPipeline:
         print("💾 Carregando dados no banco...")
 
         try:
-            with DatabaseConfig.get_connection() as conn:
+            with DatabaseConfig.get_connection(session='bulk') as conn:
+                dimension_loader = self._create_dimension_loader()
+                if len(self.df):  # pode ficar vazio com a marca d'água
+                    self._load_frame(conn, dimension_loader)
 
-                # ✅ CHAMAR AQUI - antes de qualquer loader
-                self._verify_data_types_before_load()
+                print("   ✅ Dimensões carregadas com sucesso")
 
-                # 1. Carregar dimensoes primeiro
-                dimension_loader = DimensionLoader()
-                dimension_maps = dimension_loader.load_all(self.df, conn)
+                # Manifesto: só depois da carga da fato
+                if self._manifest is not None:
+                    for (csv_file, inicio, fim), posicoes in zip(self._file_ranges, self._rows_by_file()):
+                        datas = self.df['Data do Atendimento'].iloc[posicoes]
+                        self._register_ingested_file(conn, csv_file, fim - inicio, [datas])
 
-                # 2. Guardar os mapeamentos para usar na tabela fato
-                self.dimension_maps = dimension_maps
+        except Exception as e:
+            print(f"❌ Erro ao carregar dados: {e}")
+            raise
 
-                # 3. Carregar tabela fato (usando os mapeamentos)
-                fact_loader = FactLoader(dimension_maps)
-                fact_loader.load_fato_atendimento(self.df, conn)
+    def _rows_by_file(self):
+        """
+        Posições de self.df vindas de cada arquivo de _file_ranges.
 
-                # 4. Estatísticas
-                self.stats['dimensoes_carregadas'] = len(dimension_maps)
-                for dim_name, mapping in dimension_maps.items():
-                    self.stats[f'registros_{dim_name}_inseridos'] = len(mapping)
+        O rótulo de cada linha é o seu número no frame extraído (preservado
+        pelo transform), então o arquivo de origem sai do rótulo, sem
+        depender de o índice continuar ordenado.
+        """
+        limites = np.array([fim for _, _, fim in self._file_ranges], dtype='int64')
+        arquivo = np.searchsorted(limites, self.df.index.to_numpy(dtype='int64'), side='right')
+        return [np.flatnonzero(arquivo == i) for i in range(len(self._file_ranges))]
 
-                print("   ✅ Dimensões carregadas com sucesso")
+    def _create_dimension_loader(self):
+        """Cria o DimensionLoader (com cache de chaves, se habilitado)"""
+        cache = DimensionKeyCache(self.processed_data_path / 'cache') if self.use_key_cache else None
+        return DimensionLoader(cache=cache, batch_size=self.batch_size, binary_copy=self.binary_copy)
 
-        except Exception as e:
-            print(f"❌ Erro ao carregar dados: {e}")
-            raise
+    def _load_frame(self, conn, dimension_loader, persist_cache: bool = True,
+                    df: Optional[pd.DataFrame] = None, on_batch=None):
+        """
+        Carrega df (padrão: self.df; frame completo ou um chunk) nas dimensões e na fato.
 
+        on_batch é repassado ao FactLoader (checkpoint a cada lote da fato).
+        """
+        if df is None:
+            df = self.df
+
+        # ✅ CHAMAR AQUI - antes de qualquer loader
+        self._verify_data_types_before_load(df)
+
+        # 1. Carregar dimensoes primeiro
+        dimension_maps = dimension_loader.load_all(df, conn, persist_cache=persist_cache)
+
+        # 2. Guardar os mapeamentos para usar na tabela fato
+        self.dimension_maps = dimension_maps
+
+        # 3. Carregar tabela fato (usando os mapeamentos)
+        fact_loader = FactLoader(dimension_maps, hashed_key=self.hashed_key, workers=self.load_workers,
+                                 batch_size=self.batch_size, partitioned=self.partitioned_fact,
+                                 binary_copy=self.binary_copy)
+        if self.hashed_key and not self._hash_backfill_feito:
+            # Linhas gravadas antes do modo hashed_key precisam do hash para o ON CONFLICT
+            fact_loader.backfill_hash_keys(conn)
+            self._hash_backfill_feito = True
+        resultado_fato = fact_loader.load_fato_atendimento(df, conn, on_batch=on_batch)
+
+        # 4. Estatísticas (acumuladas entre chunks no modo streaming)
+        self.stats['dimensoes_carregadas'] = len(dimension_maps)
+        for dim_name, mapping in dimension_maps.items():
+            self.stats[f'registros_{dim_name}_inseridos'] = len(mapping)
+        for chave, valor in resultado_fato.items():
+            self.stats[f'fato_{chave}'] = self.stats.get(f'fato_{chave}', 0) + valor
+        for chave, valor in dimension_loader.stats_perfil.items():
+            self.stats[f'perfis_{chave}'] = self.stats.get(f'perfis_{chave}', 0) + valor
+        for dim, valor in fact_loader.rejeitos_por_dimensao.items():
+            self.stats[f'rejeitos_{dim}'] = self.stats.get(f'rejeitos_{dim}', 0) + valor
 
     def _validate_data_quality(self):
         """Faz verificações básicas de qualidade dos dados extraídos"""
         print("   🔍 Validando qualidade dos dados...")
         
         # Verificar se códigos importantes não foram convertidos para numéricos
-        code_columns = ['Código da Unidade', 'Código do Procedimento','Código do CBO', 
-                        'CID do Internamento', 'cod_usuario', 'cod_profissional', 'Código do CID']
+        code_columns = self.COLUNAS_QUALIDADE
+
+        perfil = self._profile('extract', code_columns)
         
         for col in code_columns:
             if col in self.df.columns:
@@ -345,16 +1037,16 @@ class HealthETLPipeline:
                 sample = self.df[col].head(3).tolist()
                 print(f"      {col}: {sample}")
                 
-                # Verificar se há zeros à esquerda
-                if self.df[col].dtype == 'object':  # string
-                    has_leading_zeros = self.df[col].astype(str).str.startswith('0').any()
+                # Verificar se há zeros à esquerda (calculado sobre os valores únicos)
+                if pd.api.types.is_string_dtype(self.df[col].dtype):  # texto
+                    has_leading_zeros = perfil['colunas'][col]['zeros_esquerda']
                     if has_leading_zeros:
                         print(f"      ✅ {col} - Zeros à esquerda preservados")
                     else:
                         print(f"      ℹ️  {col} - Sem zeros à esquerda")
 
-    def _validate_data_integrity(self):
-        """Valida que colunas essenciais estão preenchidas"""
+    def _validate_data_integrity(self, nulos):
+        """Valida que colunas essenciais estão preenchidas (nulos por coluna vindos do perfil)"""
         print("   🔍 Validando integridade dos dados...")
         
         ESSENTIAL_COLUMNS = [
@@ -371,7 +1063,7 @@ class HealthETLPipeline:
         issues = []
         for col in ESSENTIAL_COLUMNS:
             if col in self.df.columns:
-                n_nulos = self.df[col].isna().sum()
+                n_nulos = nulos.get(col, 0)
                 if n_nulos > 0:
                     issues.append(f"{col}: {n_nulos} nulos")
                 else:
@@ -382,6 +1074,27 @@ class HealthETLPipeline:
         else:
             print("      ✅ Todas colunas essenciais estão completas!") 
 
+    def _profile(self, etapa: str, columns=None):
+        """Perfila self.df e guarda o resultado em self.stats['perfil_<etapa>']"""
+        perfil = self.profiler.profile(self.df, columns)
+        self.stats[f'perfil_{etapa}'] = perfil
+
+        if perfil['amostrado']:
+            print(f"   🔬 Perfil por amostragem: {perfil['linhas_perfiladas']:,} de {perfil['linhas']:,} linhas "
+                  f"(contagens estimadas)")
+        return perfil
+
+    def _report_memory(self, etapa: str):
+        """Registra a memória do frame e a economia do schema compacto"""
+        atual, sem_schema = saude.memory_report(self.df)
+        economia = sem_schema - atual
+
+        self.stats[f'memoria_{etapa}_mb'] = round(atual / 1e6, 1)
+        self.stats[f'memoria_economizada_{etapa}_mb'] = round(economia / 1e6, 1)
+
+        print(f"   💾 Memória após {etapa}: {atual / 1e6:.1f} MB "
+              f"(economia estimada do schema: {economia / 1e6:.1f} MB)")
+
     def _print_statistics(self):
         """Exibe estatísticas do processo"""
         print("\n📊 Estatísticas do Processamento:")
@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+# Assinatura + flags + tamanho da extensão do cabeçalho do COPY binário
+CABECALHO = b'PGCOPY\n\xff\r\n\x00' + b'\x00\x00\x00\x00' + b'\x00\x00\x00\x00'
+TRAILER = b'\xff\xff'
+
+# Epoch do PostgreSQL (2000-01-01) em microssegundos/dias desde o epoch Unix
+EPOCH_PG_US = 946_684_800_000_000
+EPOCH_PG_DIAS = 10_957
+
+# Tipo do PostgreSQL (format_type) -> codificação do campo
+TIPOS_FIXOS = {
+    'smallint': '>i2',
+    'integer': '>i4',
+    'bigint': '>i8',
+    'real': '>f4',
+    'double precision': '>f8',
+    'boolean': '>u1',
+    'date': '>i4',
+    'timestamp without time zone': '>i8',
+}
+
+# Faixa de cada tipo inteiro: valores fora dela dariam a volta no astype
+LIMITES_INTEIROS = {
+    'smallint': (-2**15, 2**15 - 1),
+    'integer': (-2**31, 2**31 - 1),
+    'bigint': (-2**63, 2**63 - 1),
+}
+
+
+def normalize_type(tipo: str) -> Optional[str]:
+    """Tipo do catálogo -> tipo suportado pelo codificador (None = sem suporte)"""
+    if tipo in TIPOS_FIXOS:
+        return tipo
+    if tipo == 'text' or tipo.startswith('character'):
+        return 'text'
+    return None
+
+
+def column_types(cursor, table: str, columns: List[str]) -> Dict[str, str]:
+    """Tipos (format_type) das colunas de uma tabela, inclusive temporárias"""
+    cursor.execute("""
+        SELECT attname, format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+    """, (table,))
+    tipos = dict(cursor.fetchall())
+    return {col: tipos[col] for col in columns}
+
+
+class BinaryCopyStream:
+    """
+    Arquivo (read()) no formato binário do COPY, gerado a partir das colunas
+    tipadas de um DataFrame.
+
+    Cada bloco de block_size linhas é serializado de uma vez com operações
+    vetorizadas do NumPy em um buffer reaproveitado entre os blocos: campos
+    de largura fixa (int2/int4/int8, timestamps em µs desde 2000-01-01) são
+    convertidos para big-endian coluna a coluna, e textos são codificados
+    em UTF-8 uma vez por valor distinto (factorize) e copiados para as
+    posições de cada linha. Nulos (NaN/NaT/None/pd.NA) viram comprimento -1.
+    """
+
+    def __init__(self, df: pd.DataFrame, types: Dict[str, str], block_size: int = 200_000):
+        """
+        Args:
+            df: DataFrame com as colunas na ordem do COPY
+            types: Coluna -> tipo do PostgreSQL (format_type) da tabela destino
+            block_size: Linhas serializadas por bloco
+        """
+        self.df = df
+        self.tipos = []
+        for col in df.columns:
+            tipo = normalize_type(types[col])
+            if tipo is None:
+                raise ValueError(f"Tipo sem suporte no COPY binário: {col} {types[col]}")
+            self.tipos.append(tipo)
+            if tipo in LIMITES_INTEIROS:
+                self._check_integers(df[col], tipo)
+
+        self.block_size = block_size
+        self._buffer = np.empty(0, dtype=np.uint8)  # Reaproveitado entre os blocos
+        self._pendente = memoryview(CABECALHO)
+        self._proximo = 0  # Primeira linha ainda não serializada
+        self._fim = False
+
+    @staticmethod
+    def _check_integers(serie: pd.Series, tipo: str) -> None:
+        """
+        Garante que a coluna cabe no tipo inteiro antes de qualquer byte ir
+        ao servidor: o astype para int2/int4 dá a volta em valores fora da
+        faixa e a conversão de float para int64 trunca a parte fracionária,
+        gravando valores errados em silêncio (o COPY em CSV seria recusado).
+
+        Raises:
+            ValueError: valor fracionário, infinito ou fora da faixa do tipo
+        """
+        minimo, maximo = LIMITES_INTEIROS[tipo]
+        valores = serie.dropna()
+        if valores.empty:
+            return
+
+        if pd.api.types.is_float_dtype(valores.dtype):
+            numeros = valores.to_numpy(dtype='float64')
+            invalidos = ~np.isfinite(numeros) | (numeros != np.floor(numeros))
+            # maximo + 1 é potência de 2, exata em float64
+            invalidos |= (numeros < minimo) | (numeros >= float(maximo + 1))
+        elif pd.api.types.is_integer_dtype(valores.dtype) or pd.api.types.is_bool_dtype(valores.dtype):
+            numeros = valores.to_numpy()
+            if int(numeros.min()) >= minimo and int(numeros.max()) <= maximo:
+                return
+            # Só no caminho de erro: comparação em int do Python (uint64 inclusive)
+            invalidos = np.array([not minimo <= int(v) <= maximo for v in numeros])
+        else:
+            # object (ex.: inteiros do Python): mesma checagem no dtype numérico inferido
+            BinaryCopyStream._check_integers(pd.to_numeric(valores).rename(serie.name), tipo)
+            return
+
+        if invalidos.any():
+            amostra = valores[invalidos].head(3).tolist()
+            raise ValueError(f"Coluna {serie.name}: valores que não cabem em {tipo} (amostra: {amostra})")
+
+    @classmethod
+    def supports(cls, types: Dict[str, str]) -> bool:
+        return all(normalize_type(tipo) is not None for tipo in types.values())
+
+    def read(self, size: int = -1) -> bytes:
+        """Entrega até size bytes, serializando o próximo bloco quando necessário"""
+        while not len(self._pendente) and not self._fim:
+            self._pendente = self._next_block()
+
+        if size is None or size < 0:
+            size = len(self._pendente)
+        dados = bytes(self._pendente[:size])
+        self._pendente = self._pendente[size:]
+        return dados
+
+    def _next_block(self) -> memoryview:
+        if self._proximo >= len(self.df):
+            self._fim = True
+            return memoryview(TRAILER)
+
+        bloco = self.df.iloc[self._proximo:self._proximo + self.block_size]
+        self._proximo += len(bloco)
+        return self.encode(bloco)
+
+    def encode(self, bloco: pd.DataFrame) -> memoryview:
+        """Serializa as linhas do bloco (sem cabeçalho/trailer)"""
+        n = len(bloco)
+        campos = [self._field(bloco.iloc[:, i], tipo) for i, tipo in enumerate(self.tipos)]
+
+        # Tamanho de cada campo: 4 bytes de comprimento + dados (nulos: só o comprimento)
+        tamanhos = np.column_stack([2 + np.zeros(n, dtype=np.int64)] +
+                                   [4 + comprimentos.clip(min=0) for comprimentos, _ in campos])
+        inicios = np.cumsum(tamanhos, axis=1) - tamanhos
+        linhas = np.cumsum(tamanhos.sum(axis=1))
+        total = int(linhas[-1]) if n else 0
+        inicios += (linhas - tamanhos.sum(axis=1))[:, None]
+
+        if len(self._buffer) < total:
+            self._buffer = np.empty(total, dtype=np.uint8)
+        buffer = self._buffer
+
+        self._scatter(buffer, inicios[:, 0], np.full(n, len(campos), dtype='>i2'))
+        for i, (comprimentos, dados) in enumerate(campos, start=1):
+            self._scatter(buffer, inicios[:, i], comprimentos.astype('>i4'))
+            dados(buffer, inicios[:, i] + 4)
+
+        return memoryview(buffer)[:total]
+
+    @staticmethod
+    def _scatter(buffer: np.ndarray, posicoes: np.ndarray, valores: np.ndarray, mascara=None) -> None:
+        """Grava cada valor de largura fixa (já big-endian) na sua posição do buffer"""
+        if mascara is not None:
+            posicoes, valores = posicoes[mascara], valores[mascara]
+        largura = valores.dtype.itemsize
+        bytes_valores = np.ascontiguousarray(valores).view(np.uint8).reshape(-1, largura)
+        buffer[posicoes[:, None] + np.arange(largura)] = bytes_valores
+
+    def _field(self, serie: pd.Series, tipo: str):
+        """
+        Returns:
+            Tupla (comprimento de cada campo, -1 = nulo; função que grava os
+            dados do campo a partir das posições informadas)
+        """
+        if tipo == 'text':
+            return self._text_field(serie)
+
+        nulos = serie.isna().to_numpy()
+        formato = TIPOS_FIXOS[tipo]
+        if tipo == 'timestamp without time zone':
+            valores = pd.to_datetime(serie).to_numpy(dtype='datetime64[us]').view('int64')
+            valores = np.where(nulos, 0, valores - EPOCH_PG_US)
+        elif tipo == 'date':
+            valores = pd.to_datetime(serie).to_numpy(dtype='datetime64[D]').view('int64')
+            valores = np.where(nulos, 0, valores - EPOCH_PG_DIAS)
+        elif formato[1] == 'f':
+            valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            # Direto para int64 (Int64 com pd.NA inclusive): BIGINT não passa por float
+            valores = serie.to_numpy(dtype='int64', na_value=0)
+
+        valores = valores.astype(formato)
+        largura = valores.dtype.itemsize
+        comprimentos = np.where(nulos, -1, largura).astype(np.int64)
+
+        def dados(buffer, posicoes):
+            self._scatter(buffer, posicoes, valores, ~nulos)
+
+        return comprimentos, dados
+
+    @staticmethod
+    def _text_field(serie: pd.Series):
+        """Texto: UTF-8 de cada valor distinto, copiado para as linhas que o usam"""
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+        codificados = [str(valor).encode('utf-8') for valor in unicos]
+        tamanhos_unicos = np.fromiter((len(b) for b in codificados), dtype=np.int64, count=len(codificados))
+        origens_unicos = np.cumsum(tamanhos_unicos) - tamanhos_unicos
+        blob = np.frombuffer(b''.join(codificados), dtype=np.uint8)
+
+        nulos = codigos < 0
+        comprimentos = np.where(nulos, -1, tamanhos_unicos[np.where(nulos, 0, codigos)] if len(unicos) else 0)
+
+        def dados(buffer, posicoes):
+            validos = ~nulos
+            tamanhos = comprimentos[validos]
+            total = int(tamanhos.sum())
+            if not total:
+                return
+            # Índice de cada byte: início do valor (origem/destino) + deslocamento dentro dele
+            deslocamento = np.arange(total) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+            origem = np.repeat(origens_unicos[codigos[validos]], tamanhos) + deslocamento
+            destino = np.repeat(posicoes[validos], tamanhos) + deslocamento
+            buffer[destino] = blob[origem]
+
+        return comprimentos.astype(np.int64), dados
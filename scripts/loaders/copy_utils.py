@@ -0,0 +1,65 @@
+import io
+import logging
+import pandas as pd
+from typing import Dict, List, Optional
+
+from scripts.loaders.binary_copy import BinaryCopyStream, column_types
+
+logger = logging.getLogger(__name__)
+
+
+def copy_dataframe(cursor, df: pd.DataFrame, table: str, columns: List[str],
+                   block_size: int = 200_000, binary: bool = False,
+                   types: Optional[Dict[str, str]] = None) -> int:
+    """
+    Envia um DataFrame para uma tabela via COPY FROM STDIN (formato CSV).
+
+    O DataFrame já deve estar com os nomes de coluna da tabela destino.
+    Valores nulos (NaN/NaT/None) viram campos vazios, que o COPY em CSV
+    interpreta como NULL. O envio é feito em blocos para não materializar
+    o CSV inteiro em memória.
+
+    Com binary=True usa o formato binário do COPY (BinaryCopyStream), sem
+    formatar texto: os campos saem direto das colunas tipadas. Os tipos
+    vêm do catálogo da tabela destino quando não informados; se alguma
+    coluna tiver tipo sem suporte (ex.: NUMERIC), o envio volta ao CSV.
+
+    Args:
+        cursor: Cursor psycopg2
+        df: DataFrame com os dados
+        table: Tabela destino
+        columns: Colunas (na ordem) a serem enviadas
+        block_size: Linhas por bloco de COPY
+        binary: Usa o formato binário do COPY
+        types: Coluna -> tipo do PostgreSQL (format_type) na tabela destino
+
+    Returns:
+        Número de linhas enviadas
+    """
+    if binary:
+        types = types or column_types(cursor, table, columns)
+        if BinaryCopyStream.supports(types):
+            stream = BinaryCopyStream(df[columns], types, block_size)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)",
+                               stream, size=1 << 20)
+            return len(df)
+        logger.warning(f"COPY binário sem suporte para {table} {types}; usando CSV")
+
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    for inicio in range(0, len(df), block_size):
+        bloco = df.iloc[inicio:inicio + block_size]
+
+        buffer = io.StringIO()
+        bloco.to_csv(
+            buffer,
+            columns=columns,
+            header=False,
+            index=False,
+            na_rep='',
+            date_format='%Y-%m-%d %H:%M:%S'
+        )
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+
+    return len(df)
@@ -0,0 +1,146 @@
+import numpy as np
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+
+class DimensionKeyCache:
+    """
+    Cache persistente dos mapeamentos código -> ID das dimensões.
+
+    Os mapeamentos completos de cada dimensão são lidos do banco em massa e
+    gravados em disco (.npz, binário compacto). Cada arquivo guarda a
+    "assinatura" da tabela no momento da leitura: total de linhas, maior ID
+    e o filenode (que muda em TRUNCATE). Se a assinatura atual do banco for
+    igual, o mapeamento vem do disco e a consulta de lookup é evitada.
+    """
+
+    # Dimensão -> (tabela, coluna de código, coluna de ID)
+    TABELAS = {
+        'unidade': ('dim_unidade', 'codigo_unidade', 'unidade_id'),
+        'procedimento': ('dim_procedimento', 'codigo_procedimento', 'procedimento_id'),
+        'cid': ('dim_cid', 'codigo_cid', 'cid_id'),
+        'cbo': ('dim_cbo', 'codigo_cbo', 'cbo_id'),
+        'perfil': ('dim_perfil_paciente', 'codigo_usuario', 'perfil_id'),
+    }
+
+    def __init__(self, cache_dir: Path = Path('data/processed/cache/')):
+        self.cache_dir = Path(cache_dir)
+        self.logger = logging.getLogger(__name__)
+
+    def load(self, conn) -> Dict[str, Dict]:
+        """
+        Carrega os mapeamentos completos de todas as dimensões.
+
+        Usa o arquivo em disco quando a assinatura da tabela não mudou;
+        caso contrário, lê a tabela inteira com um único SELECT e regrava o cache.
+
+        Returns:
+            Dicionário dimensão -> {código: ID}
+        """
+        cursor = conn.cursor()
+        dimension_maps = {}
+
+        for dim, (tabela, coluna_codigo, coluna_id) in self.TABELAS.items():
+            assinatura = self._table_signature(cursor, tabela, coluna_id)
+            cached = self._read(dim)
+
+            if cached is not None and cached[1] == assinatura:
+                dimension_maps[dim] = cached[0]
+                print(f"      💾 {tabela}: {len(cached[0]):,} chaves lidas do cache")
+                continue
+
+            cursor.execute(f"SELECT {coluna_codigo}, {coluna_id} FROM {tabela}")
+            mapping = dict(cursor.fetchall())
+            self._write(dim, mapping, assinatura)
+
+            dimension_maps[dim] = mapping
+            print(f"      🔄 {tabela}: {len(mapping):,} chaves lidas do banco (cache atualizado)")
+
+        return dimension_maps
+
+    def save(self, conn, dimension_maps: Dict[str, Dict]) -> None:
+        """
+        Regrava o cache após uma carga.
+
+        O mapeamento só é persistido se estiver completo (mesmo número de
+        chaves que linhas na tabela); senão o arquivo é invalidado e a
+        próxima execução relê a tabela.
+        """
+        cursor = conn.cursor()
+
+        for dim, (tabela, _, coluna_id) in self.TABELAS.items():
+            mapping = dimension_maps.get(dim, {})
+            assinatura = self._table_signature(cursor, tabela, coluna_id)
+
+            if assinatura[0] == len(mapping):
+                self._write(dim, mapping, assinatura)
+            else:
+                self.logger.warning(
+                    f"Cache de {tabela} invalidado: {len(mapping)} chaves em memória, {assinatura[0]} linhas no banco"
+                )
+                self.invalidate(dim)
+
+    def invalidate(self, dim: Optional[str] = None) -> None:
+        """Remove o cache de uma dimensão (ou de todas)"""
+        dims = [dim] if dim else list(self.TABELAS)
+        for nome in dims:
+            path = self._path(nome)
+            if path.exists():
+                path.unlink()
+
+    def _table_signature(self, cursor, tabela: str, coluna_id: str) -> Tuple[int, int, int]:
+        """Assinatura barata da tabela: (total de linhas, maior ID, filenode)"""
+        cursor.execute(f"""
+            SELECT count(*), coalesce(max({coluna_id}), 0), pg_relation_filenode('{tabela}')
+            FROM {tabela}
+        """)
+        total, max_id, filenode = cursor.fetchone()
+        return int(total), int(max_id), int(filenode or 0)
+
+    def _path(self, dim: str) -> Path:
+        return self.cache_dir / f"dim_{dim}_keys.npz"
+
+    def _write(self, dim: str, mapping: Dict, assinatura: Tuple[int, int, int]) -> None:
+        """Grava o mapeamento em .npz (gravação atômica via arquivo temporário)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        codigos = list(mapping.keys())
+        if codigos and isinstance(codigos[0], str):
+            # Texto em UTF-8 de largura fixa: bem menor que o dtype unicode do NumPy
+            chaves = np.char.encode(np.array(codigos, dtype=str), 'utf-8')
+        else:
+            chaves = np.array(codigos, dtype=np.int64)
+
+        ids = np.fromiter(mapping.values(), dtype=np.int32, count=len(mapping))
+
+        path = self._path(dim)
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp_path, chaves=chaves, ids=ids, assinatura=np.array(assinatura, dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    def _read(self, dim: str):
+        """
+        Lê o mapeamento do disco.
+
+        Returns:
+            Tupla (mapeamento, assinatura) ou None se não houver cache válido
+        """
+        path = self._path(dim)
+        if not path.exists():
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as dados:
+                chaves = dados['chaves']
+                ids = dados['ids']
+                assinatura = tuple(int(v) for v in dados['assinatura'])
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Cache {path} ilegível, será recriado: {e}")
+            return None
+
+        if chaves.dtype.kind == 'S':
+            chaves = np.char.decode(chaves, 'utf-8')
+
+        return dict(zip(chaves.tolist(), ids.tolist())), assinatura
@@ -3,6 +3,9 @@ import numpy as np
 from pathlib import Path
 from typing import Dict, Optional
 from src.config.database import DatabaseConfig
+from scripts.loaders.copy_utils import copy_dataframe
+from scripts.loaders.dimension_cache import DimensionKeyCache
+from src.models import saude
 import logging
 
 class DimensionLoader:
@@ -11,7 +14,69 @@ class DimensionLoader:
     Gerencia a carga de todas as dimensões e mantém mapeamentos de IDs.
     """
     
-    def __init__(self):
+    # Colunas do DataFrame consumidas por cada dimensão
+    COLUNAS_UNIDADE = ['Código da Unidade', 'Descrição da Unidade', 'Código do Tipo de Unidade', 'Tipo de Unidade']
+    COLUNAS_PROCEDIMENTO = ['Código do Procedimento', 'Descrição do Procedimento']
+    COLUNAS_CID = ['Código do CID', 'Descrição do CID']
+    COLUNAS_CBO = ['Código do CBO', 'Descrição do CBO']
+    COLUNAS_PERFIL = [
+        'cod_usuario', 'Sexo', 'Data de Nascimento', 'Nacionalidade', 
+        'origem_usuario', 'Município', 'Bairro',
+        'Tratamento no Domicílio', 'Abastecimento', 'Energia Elétrica', 
+        'Tipo de Habitação', 'Destino Lixo', 'Fezes/Urina', 'Cômodos', 
+        'Em Caso de Doença', 'Grupo Comunitário', 'Meio de Comunicacao', 
+        'Meio de Transporte'
+    ]
+
+    # Colunas do DataFrame -> colunas de dim_perfil_paciente
+    MAPA_PERFIL = {
+        'cod_usuario': 'codigo_usuario',
+        'Sexo': 'sexo',
+        'Data de Nascimento': 'data_nascimento',
+        'Nacionalidade': 'nacionalidade',
+        'origem_usuario': 'origem_usuario',
+        'Município': 'municipio',
+        'Bairro': 'bairro',
+        'Tratamento no Domicílio': 'tratamento_domicilio',
+        'Abastecimento': 'abastecimento',
+        'Energia Elétrica': 'energia_eletrica',
+        'Tipo de Habitação': 'tipo_habitacao',
+        'Destino Lixo': 'destino_lixo',
+        'Fezes/Urina': 'fezes_urina',
+        'Cômodos': 'comodos',
+        'Em Caso de Doença': 'em_caso_doenca',
+        'Grupo Comunitário': 'grupo_comunitario',
+        'Meio de Comunicacao': 'meio_comunicacao',
+        'Meio de Transporte': 'meio_transporte',
+    }
+
+    # Atributos de dim_perfil_paciente cobertos pelo hash_perfil
+    ATRIBUTOS_PERFIL = [col for col in MAPA_PERFIL.values() if col != 'codigo_usuario']
+
+    @classmethod
+    def required_columns(cls):
+        """Colunas do CSV que a carga de dimensões consome"""
+        return (cls.COLUNAS_UNIDADE + cls.COLUNAS_PROCEDIMENTO + cls.COLUNAS_CID
+                + cls.COLUNAS_CBO + cls.COLUNAS_PERFIL)
+
+    def __init__(self, cache: Optional[DimensionKeyCache] = None, batch_size: Optional[int] = None,
+                 binary_copy: bool = False):
+        """
+        Args:
+            cache: Cache persistente de chaves; se informado, os mapeamentos
+                   completos são pré-carregados e códigos já conhecidos não
+                   voltam ao banco
+            batch_size: Commit a cada batch_size perfis em load_perfis (a
+                        maior dimensão); None = um único commit
+            binary_copy: Envia as tabelas temporárias do upsert no formato
+                         binário do COPY
+        """
+        self.cache = cache
+        self.batch_size = batch_size
+        self.binary_copy = binary_copy
+        self._hash_perfil_pronto = False  # Coluna hash_perfil já verificada nesta instância
+        self.stats_perfil: Dict[str, int] = {}  # Novos, alterados e inalterados da última carga de perfis
+        self._cache_preloaded = False
         self.dimension_maps: Dict[str, Dict] = {
             'unidade': {},      # Mapeia codigo_unidade -> unidade_id
             'procedimento': {}, # Mapeia codigo_procedimento -> procedimento_id  
@@ -20,19 +85,28 @@ class DimensionLoader:
             'perfil': {}        # Mapeia cod_usuario -> perfil_id
         }
         self.logger = logging.getLogger(__name__)
-    
-    def load_all(self, df: pd.DataFrame, conn) -> Dict[str, Dict]:
+
+    def load_all(self, df: pd.DataFrame, conn, persist_cache: bool = True) -> Dict[str, Dict]:
         """
         Carrega todas as dimensões na ordem correta.
         
         Args:
             df: DataFrame com dados transformados
             conn: Conexão PostgreSQL
+            persist_cache: Regrava o cache de chaves ao final (no modo streaming
+                           o pipeline chama persist_cache() uma vez após o último chunk)
             
         Returns:
             Dicionário com mapeamentos de IDs gerados
         """
         print("📥 Iniciando carga de dimensões...")
+
+        # Pré-carrega os mapeamentos completos (linhas já existentes inclusive)
+        if self.cache is not None and not self._cache_preloaded:
+            print("   💾 Pré-carregando chaves das dimensões...")
+            for dim_name, mapping in self.cache.load(conn).items():
+                self.dimension_maps[dim_name].update(mapping)
+            self._cache_preloaded = True
         
         # Ordem CRÍTICA - algumas dimensões podem depender de outras
         self.load_unidades(df, conn)
@@ -41,6 +115,9 @@ class DimensionLoader:
         self.load_cbos(df, conn)
         self.load_perfis(df, conn)
 
+        if persist_cache:
+            self.persist_cache(conn)
+
         # ✅ DEBUG: Verificar o que foi realmente carregado
         print("\n🔍 DEBUG - Dimension Maps carregados:")
         for dim_name, mapping in self.dimension_maps.items():
@@ -52,42 +129,31 @@ class DimensionLoader:
         print("✅ Todas dimensões carregadas!")
         return self.dimension_maps
     
+    def persist_cache(self, conn) -> None:
+        """Regrava o cache de chaves com os mapeamentos atuais"""
+        if self.cache is not None:
+            self.cache.save(conn, self.dimension_maps)
+
     def load_unidades(self, df: pd.DataFrame, conn) -> None:
         """Carrega dim_unidade com dados únicos"""
         cursor = conn.cursor()
 
         # Extrai dados unicos de unidade
-        colunas_unidade = ['Código da Unidade', 'Descrição da Unidade', 'Código do Tipo de Unidade', 'Tipo de Unidade',]
-        dim_unidade = df[colunas_unidade].drop_duplicates()
-
-        # Contador para debug
-        inseridas = 0
-        existentes = 0
-
-        for _, row in dim_unidade.iterrows():
-            cursor.execute("""
-                           INSERT INTO dim_unidade (codigo_unidade, descricao_unidade, codigo_tipo_unidade, tipo_unidade)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (codigo_unidade) DO NOTHING
-                           RETURNING unidade_id, codigo_unidade;""",
-                           (row['Código da Unidade'], 
-                            row['Descrição da Unidade'],
-                            row['Código do Tipo de Unidade'], 
-                            row['Tipo de Unidade']))
-        
-            # Atualiza o mapeamento
-            result = cursor.fetchone()
-            
-            if result:
-                unidade_id, codigo_unidade = result
-                self.dimension_maps['unidade'][codigo_unidade] = unidade_id
-                inseridas += 1
-            else:
-                existentes +=1
+        dim_unidade = df[self.COLUNAS_UNIDADE].drop_duplicates().rename(columns={
+            'Código da Unidade': 'codigo_unidade',
+            'Descrição da Unidade': 'descricao_unidade',
+            'Código do Tipo de Unidade': 'codigo_tipo_unidade',
+            'Tipo de Unidade': 'tipo_unidade',
+        })
+
+        dim_unidade = self._filter_known(dim_unidade, 'codigo_unidade', 'unidade')
+
+        mapping, existentes = self._bulk_upsert(cursor, dim_unidade, 'dim_unidade', 'codigo_unidade', 'unidade_id')
+        self.dimension_maps['unidade'].update(mapping)
 
         conn.commit()
 
-        self.logger.info(f"📥 dim_unidade: {inseridas} novas, {existentes} existentes")
+        self.logger.info(f"📥 dim_unidade: {len(mapping) - existentes} novas, {existentes} existentes")
         print("      ✅ Dimensão unidade carregada com sucesso!")
     
     def load_procedimentos(self, df: pd.DataFrame, conn) -> None:
@@ -96,32 +162,18 @@ class DimensionLoader:
         cursor = conn.cursor()
 
         # Extrai dados unicos de procedimento
-        colunas_procedimento = ['Código do Procedimento', 'Descrição do Procedimento']
-        dim_procedimento = df[colunas_procedimento].drop_duplicates()
-
-        # Contador para debug
-        inseridas = 0
-        existentes = 0
-
-        for _, row in dim_procedimento.iterrows():
-            cursor.execute("""
-                           INSERT INTO dim_procedimento (codigo_procedimento, descricao_procedimento)
-                            VALUES (%s, %s)
-                            ON CONFLICT (codigo_procedimento) DO NOTHING
-                           RETURNING procedimento_id, codigo_procedimento;""",
-                           (row['Código do Procedimento'], 
-                            row['Descrição do Procedimento']))
-            
-            result = cursor.fetchone()
-            if result:
-                procedimento_id, codigo_procedimento = result
-                self.dimension_maps['procedimento'][codigo_procedimento] = procedimento_id
-                inseridas += 1
-            else:
-                existentes +=1
+        dim_procedimento = df[self.COLUNAS_PROCEDIMENTO].drop_duplicates().rename(columns={
+            'Código do Procedimento': 'codigo_procedimento',
+            'Descrição do Procedimento': 'descricao_procedimento',
+        })
+
+        dim_procedimento = self._filter_known(dim_procedimento, 'codigo_procedimento', 'procedimento')
+
+        mapping, existentes = self._bulk_upsert(cursor, dim_procedimento, 'dim_procedimento', 'codigo_procedimento', 'procedimento_id')
+        self.dimension_maps['procedimento'].update(mapping)
         
         conn.commit()
-        self.logger.info(f"📥 dim_procedimento: {inseridas} novas, {existentes} existentes")
+        self.logger.info(f"📥 dim_procedimento: {len(mapping) - existentes} novas, {existentes} existentes")
         print(f"      ✅ Dimensão procedimento carregada com sucesso!")
     
     def load_cids(self, df: pd.DataFrame, conn) -> None:
@@ -130,67 +182,35 @@ class DimensionLoader:
         cursor = conn.cursor()
 
         # Extrai dados unicos de cid
-        colunas_cid = ['Código do CID', 'Descrição do CID']
-        dim_cid = df[colunas_cid].drop_duplicates()
+        dim_cid = df[self.COLUNAS_CID].drop_duplicates()
 
         
         # ✅ FILTRO MAIS ROBUSTO
         dim_cid = dim_cid[
             dim_cid['Código do CID'].notna() & 
             (dim_cid['Código do CID'] != '') &
-            (dim_cid['Código do CID'].astype(str).str.strip() != '')
+            (dim_cid['Código do CID'].str.strip() != '')
         ].copy()
 
         print(f"   ✅ Após filtro: {len(dim_cid)} registros válidos")
 
         # 3. Cria registro "CID Não Informado" para valores nulos
-        cursor.execute("""
-            INSERT INTO dim_cid (codigo_cid, descricao_cid)
-            VALUES ('NI', 'CID Não Informado')
-            ON CONFLICT (codigo_cid) DO NOTHING
-            RETURNING cid_id, codigo_cid;
-        """)
+        if 'NI' not in self.dimension_maps['cid']:
+            self._ensure_cid_nao_informado(cursor)
 
-        result = cursor.fetchone()
+        # Garante que o código do CID é string
+        dim_cid = pd.DataFrame({
+            'codigo_cid': dim_cid['Código do CID'].str.strip(),
+            'descricao_cid': dim_cid['Descrição do CID'],
+        })
 
-        if result:
-            cid_id, codigo_cid = result
-            self.dimension_maps['cid'][codigo_cid] = cid_id
-            print(f"      ✅ Registro 'CID Não Informado' criado: ID {cid_id}")
-        else:
-            # Se já existir, busca o ID existente
-            cursor.execute("SELECT cid_id FROM dim_cid WHERE codigo_cid = 'NI'")
-            result = cursor.fetchone()
-            if result:
-                self.dimension_maps['cid']['NI'] = result[0]
+        dim_cid = self._filter_known(dim_cid, 'codigo_cid', 'cid')
 
-        # Contador para debug
-        inseridas = 0
-        existentes = 0
-
-        for _, row in dim_cid.iterrows():
-            # Garante que o código do CID é string
-            codigo_cid = str(row['Código do CID'].strip())
-            descricao_cid = row['Descrição do CID']
-
-            cursor.execute("""
-                           INSERT INTO dim_cid (codigo_cid, descricao_cid)
-                            VALUES (%s, %s)
-                            ON CONFLICT (codigo_cid) DO NOTHING
-                           RETURNING cid_id, codigo_cid;""",
-                           (codigo_cid, 
-                            descricao_cid))
-            
-            result = cursor.fetchone()
-            if result:
-                cid_id, codigo_cid = result
-                self.dimension_maps['cid'][codigo_cid] = cid_id
-                inseridas += 1
-            else:
-                existentes +=1
+        mapping, existentes = self._bulk_upsert(cursor, dim_cid, 'dim_cid', 'codigo_cid', 'cid_id')
+        self.dimension_maps['cid'].update(mapping)
         
         conn.commit()
-        self.logger.info(f"📥 dim_cid: {inseridas} novas, {existentes} existentes")
+        self.logger.info(f"📥 dim_cid: {len(mapping) - existentes} novas, {existentes} existentes")
         print(f"      ✅ Dimensão cid carregada com sucesso!")
     
     def load_cbos(self, df: pd.DataFrame, conn) -> None:
@@ -199,32 +219,18 @@ class DimensionLoader:
         cursor = conn.cursor()
 
         # Extrai dados unicos de cbo
-        colunas_cbo = ['Código do CBO', 'Descrição do CBO']
-        dim_cbo = df[colunas_cbo].drop_duplicates()
-
-        # Contador para debug
-        inseridas = 0
-        existentes = 0
-
-        for _, row in dim_cbo.iterrows():
-            cursor.execute("""
-                           INSERT INTO dim_cbo (codigo_cbo, descricao_cbo)
-                            VALUES (%s, %s)
-                            ON CONFLICT (codigo_cbo) DO NOTHING
-                           RETURNING cbo_id, codigo_cbo;""",
-                           (row['Código do CBO'], 
-                            row['Descrição do CBO']))
-            
-            result = cursor.fetchone()
-            if result:
-                cbo_id, codigo_cbo = result
-                self.dimension_maps['cbo'][codigo_cbo] = cbo_id
-                inseridas += 1
-            else:
-                existentes +=1
+        dim_cbo = df[self.COLUNAS_CBO].drop_duplicates().rename(columns={
+            'Código do CBO': 'codigo_cbo',
+            'Descrição do CBO': 'descricao_cbo',
+        })
+
+        dim_cbo = self._filter_known(dim_cbo, 'codigo_cbo', 'cbo')
+
+        mapping, existentes = self._bulk_upsert(cursor, dim_cbo, 'dim_cbo', 'codigo_cbo', 'cbo_id')
+        self.dimension_maps['cbo'].update(mapping)
         
         conn.commit()
-        self.logger.info(f"📥 dim_cbo: {inseridas} novas, {existentes} existentes")
+        self.logger.info(f"📥 dim_cbo: {len(mapping) - existentes} novas, {existentes} existentes")
         print(f"      ✅ Dimensão cbo carregada com sucesso!")
     
     def load_perfis(self, df: pd.DataFrame, conn) -> None:
@@ -232,100 +238,183 @@ class DimensionLoader:
         
         cursor = conn.cursor()
 
-        colunas_perfil = [
-        'cod_usuario', 'Sexo', 'Data de Nascimento', 'Nacionalidade', 
-        'origem_usuario', 'Município', 'Bairro',
-        'Tratamento no Domicílio', 'Abastecimento', 'Energia Elétrica', 
-        'Tipo de Habitação', 'Destino Lixo', 'Fezes/Urina', 'Cômodos', 
-        'Em Caso de Doença', 'Grupo Comunitário', 'Meio de Comunicacao', 
-        'Meio de Transporte'
-        ]
+        # Colunas opcionais ausentes no CSV viram NULL
+        dim_perfil = df.reindex(columns=self.COLUNAS_PERFIL).rename(columns=self.MAPA_PERFIL)
+
+        # ✅ CONVERSÃO CRÍTICA: Garantir que cod_usuario seja INT
+        codigo_usuario = saude.to_user_code(dim_perfil['codigo_usuario'])
+        invalidos = codigo_usuario.isna()
+        if invalidos.any():
+            amostra = dim_perfil.loc[invalidos, 'codigo_usuario'].drop_duplicates().head(10).tolist()
+            print(f"❌ Erro ao converter cod_usuario: {int(invalidos.sum())} linhas ignoradas (amostra: {amostra})")
+
+        dim_perfil = dim_perfil.loc[~invalidos].copy()
+        dim_perfil['codigo_usuario'] = codigo_usuario[~invalidos].astype('int64')
+        for col in ['origem_usuario', 'comodos']:
+            dim_perfil[col] = pd.to_numeric(dim_perfil[col], errors='coerce').astype('Int64')
 
         # Remove duplicatas e pega ultima ocorrencia
-        dim_perfil = df[colunas_perfil].drop_duplicates(subset=['cod_usuario'], keep='last')
+        dim_perfil = dim_perfil.drop_duplicates(subset=['codigo_usuario'], keep='last')
 
-        # Contador para debug
-        inseridas = 0
-        existentes = 0
-        total_linhas = len(dim_perfil)
+        # Hash-diff: só perfis novos ou com atributos alterados vão ao banco
+        dim_perfil['hash_perfil'] = saude.hash_columns(dim_perfil, self.ATRIBUTOS_PERFIL)
+        inalterados, novos = self._diff_perfil_hashes(cursor, dim_perfil)
+        alterados = int((~inalterados).sum()) - novos
+        enviar = dim_perfil.loc[~inalterados]
 
-        for index, (_, row) in enumerate(dim_perfil.iterrows()):
-            
-            # ✅ CONVERSÃO CRÍTICA: Garantir que cod_usuario seja INT
-            try:
-                cod_usuario_int = int(row['cod_usuario'])
-            except (ValueError, TypeError):
-                print(f"❌ Erro ao converter cod_usuario: {row['cod_usuario']}")
-                continue
-
-            # ✅ MOSTRAR PROGRESSO (a cada 5.000 linhas ou 10% do total)
-            if index % 5000 == 0 and index > 0:
-                percentual = (index / total_linhas) * 100
-                print(f"         📈 Progresso carregamento dim_perfil: {index:,}/{total_linhas:,} ({percentual:.1f}%)")
-            
-            cursor.execute("""
-            INSERT INTO dim_perfil_paciente (
-                codigo_usuario, sexo, data_nascimento, nacionalidade,
-                origem_usuario, municipio, bairro,
-                tratamento_domicilio, abastecimento, energia_eletrica,
-                tipo_habitacao, destino_lixo, fezes_urina, comodos,
-                em_caso_doenca, grupo_comunitario, meio_comunicacao, 
-                meio_transporte
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (codigo_usuario) 
-            DO UPDATE SET
-                sexo = EXCLUDED.sexo,
-                data_nascimento = EXCLUDED.data_nascimento,
-                nacionalidade = EXCLUDED.nacionalidade,
-                origem_usuario = EXCLUDED.origem_usuario,
-                municipio = EXCLUDED.municipio,
-                bairro = EXCLUDED.bairro,
-                tratamento_domicilio = EXCLUDED.tratamento_domicilio,
-                abastecimento = EXCLUDED.abastecimento,
-                energia_eletrica = EXCLUDED.energia_eletrica,
-                tipo_habitacao = EXCLUDED.tipo_habitacao,
-                destino_lixo = EXCLUDED.destino_lixo,
-                fezes_urina = EXCLUDED.fezes_urina,
-                comodos = EXCLUDED.comodos,
-                em_caso_doenca = EXCLUDED.em_caso_doenca,
-                grupo_comunitario = EXCLUDED.grupo_comunitario,
-                meio_comunicacao = EXCLUDED.meio_comunicacao,
-                meio_transporte = EXCLUDED.meio_transporte
-            RETURNING perfil_id, codigo_usuario
-            """, (
-                cod_usuario_int, 
-                row['Sexo'], 
-                row['Data de Nascimento'],
-                row['Nacionalidade'],
-                row['origem_usuario'],
-                row['Município'],
-                row['Bairro'],
-                row.get('Tratamento no Domicílio', None),
-                row.get('Abastecimento', None),
-                row['Energia Elétrica'],
-                row.get('Tipo de Habitação', None),
-                row.get('Destino Lixo', None),
-                row.get('Fezes/Urina', None),
-                row.get('Cômodos', None),
-                row.get('Em Caso de Doença', None),
-                row.get('Grupo Comunitário', None),
-                row.get('Meio de Comunicacao', None),
-                row.get('Meio de Transporte', None)
-            ))
+        atualizacao = ',\n                '.join(
+            f"{col} = EXCLUDED.{col}" for col in self.ATRIBUTOS_PERFIL + ['hash_perfil']
+        )
+        # Condicional: uma linha igual à gravada não é reescrita (sem WAL nem bloat)
+        on_conflict = (f"DO UPDATE SET\n                {atualizacao}\n"
+                       f"            WHERE dim_perfil_paciente.hash_perfil IS DISTINCT FROM EXCLUDED.hash_perfil")
+
+        # Commits por lote: uma falha não desfaz os lotes anteriores e a
+        # transação não segura locks/WAL da dimensão inteira
+        tamanho = self.batch_size or max(len(enviar), 1)
+        for inicio in range(0, len(enviar), tamanho):
+            lote = enviar.iloc[inicio:inicio + tamanho]
+            mapping, _ = self._bulk_upsert(cursor, lote, 'dim_perfil_paciente', 'codigo_usuario', 'perfil_id',
+                                           on_conflict=on_conflict)
+            self.dimension_maps['perfil'].update(mapping)
+
+            conn.commit()
+
+        self.stats_perfil = {'novos': novos, 'alterados': alterados, 'inalterados': int(inalterados.sum())}
+        self.logger.info(f"📥 dim_perfil_paciente: {novos} novos, {alterados} alterados, "
+                         f"{self.stats_perfil['inalterados']} inalterados")
+        print(f"      ✅ Dimensão perfil carregada! {novos} novos, {alterados} alterados, "
+              f"{self.stats_perfil['inalterados']} inalterados (não enviados)")
+
+    def _diff_perfil_hashes(self, cursor, dim_perfil: pd.DataFrame):
+        """
+        Compara no banco o hash_perfil dos perfis do frame com o gravado
+        (coluna de scripts/05_hash_perfil.sql, criada aqui se faltar).
+
+        Só os pares (codigo_usuario, hash_perfil) do frame vão ao servidor,
+        via COPY para uma tabela temporária, e voltam só os perfis novos ou
+        alterados; a dimensão não é lida inteira. Perfis gravados antes do
+        hash (hash nulo) contam como alterados e são reenviados uma vez. Os
+        IDs dos inalterados que ainda não estão no mapeamento (sem cache)
+        vêm de uma segunda consulta, também restrita ao frame.
+
+        Returns:
+            Tupla (máscara dos perfis inalterados, quantidade de perfis novos)
+        """
+        if dim_perfil.empty:
+            return np.zeros(0, dtype=bool), 0
+
+        if not self._hash_perfil_pronto:
+            self._ensure_hash_perfil(cursor)
+            self._hash_perfil_pronto = True
+
+        temp = 'tmp_perfil_hash'
+        cursor.execute(f"CREATE TEMP TABLE {temp} (codigo_usuario BIGINT, hash_perfil BIGINT) ON COMMIT DROP")
+        copy_dataframe(cursor, dim_perfil, temp, ['codigo_usuario', 'hash_perfil'], binary=self.binary_copy)
+
+        cursor.execute(f"""
+            SELECT t.codigo_usuario, d.perfil_id
+            FROM {temp} t
+            LEFT JOIN dim_perfil_paciente d ON d.codigo_usuario = t.codigo_usuario
+            WHERE d.hash_perfil IS DISTINCT FROM t.hash_perfil
+        """)
+        diferentes = cursor.fetchall()
+        novos = sum(perfil_id is None for _, perfil_id in diferentes)
+        inalterados = ~dim_perfil['codigo_usuario'].isin([codigo for codigo, _ in diferentes]).to_numpy()
+
+        conhecidos = self.dimension_maps['perfil']
+        if (inalterados & ~dim_perfil['codigo_usuario'].isin(list(conhecidos)).to_numpy()).any():
+            cursor.execute(f"""
+                SELECT d.codigo_usuario, d.perfil_id
+                FROM {temp} t
+                JOIN dim_perfil_paciente d ON d.codigo_usuario = t.codigo_usuario
+                WHERE d.hash_perfil = t.hash_perfil
+            """)
+            conhecidos.update(cursor.fetchall())
+
+        # Descartada já aqui: sem perfis a enviar, não há commit até o próximo chunk
+        cursor.execute(f"DROP TABLE {temp}")
+        return inalterados, novos
+
+    def _ensure_hash_perfil(self, cursor) -> None:
+        """Cria a coluna hash_perfil se faltar (mesma DDL de scripts/05_hash_perfil.sql)"""
+        cursor.execute("ALTER TABLE dim_perfil_paciente ADD COLUMN IF NOT EXISTS hash_perfil BIGINT")
+
+    def _ensure_cid_nao_informado(self, cursor) -> None:
+        """Cria (ou recupera) o registro 'NI' usado para CID não informado"""
+        cursor.execute("""
+            INSERT INTO dim_cid (codigo_cid, descricao_cid)
+            VALUES ('NI', 'CID Não Informado')
+            ON CONFLICT (codigo_cid) DO NOTHING
+            RETURNING cid_id, codigo_cid;
+        """)
 
+        result = cursor.fetchone()
+
+        if result:
+            cid_id, codigo_cid = result
+            self.dimension_maps['cid'][codigo_cid] = cid_id
+            print(f"      ✅ Registro 'CID Não Informado' criado: ID {cid_id}")
+        else:
+            # Se já existir, busca o ID existente
+            cursor.execute("SELECT cid_id FROM dim_cid WHERE codigo_cid = 'NI'")
             result = cursor.fetchone()
             if result:
-                perfil_id, codigo_usuario = result
-                self.dimension_maps['perfil'][int(codigo_usuario)] = perfil_id
-                
-                # Verifica se foi INSERT ou UPDATE
-                if cursor.statusmessage.startswith('INSERT'):
-                    inseridas += 1
-                else:
-                    existentes += 1
+                self.dimension_maps['cid']['NI'] = result[0]
 
-        conn.commit()
-        self.logger.info(f"📥 dim_perfil_paciente: {inseridas} novos, {existentes} atualizados")
-        print(f"      ✅ Dimensão perfil carregada! {inseridas} novos, {existentes} atualizados")
-    
+    def _filter_known(self, frame: pd.DataFrame, coluna_codigo: str, dim: str) -> pd.DataFrame:
+        """Remove do frame os códigos que já estão no mapeamento (ex.: pré-carregados do cache)"""
+        conhecidos = self.dimension_maps[dim]
+        if not conhecidos:
+            return frame
+        return frame[~frame[coluna_codigo].isin(list(conhecidos))]
+
+    def _bulk_upsert(self, cursor, frame: pd.DataFrame, tabela: str, coluna_codigo: str,
+                     coluna_id: str, on_conflict: str = "DO NOTHING"):
+        """
+        Upsert em massa de uma dimensão.
+
+        Copia o frame distinto para uma tabela temporária via COPY, faz o
+        upsert com um único INSERT ... SELECT e devolve o mapeamento
+        código -> ID completo (novos e já existentes) com um único SELECT.
+
+        Args:
+            cursor: Cursor psycopg2
+            frame: Linhas distintas da dimensão, com os nomes de coluna da tabela
+            tabela: Tabela dimensão
+            coluna_codigo: Coluna da chave natural (alvo do ON CONFLICT)
+            coluna_id: Coluna da chave substituta
+            on_conflict: Ação do ON CONFLICT
+
+        Returns:
+            Tupla (mapeamento código -> ID, quantidade de códigos já existentes)
+        """
+        # Nada novo para enviar (ex.: todos os códigos já vieram do cache)
+        if frame.empty:
+            return {}, 0
+
+        colunas = ', '.join(frame.columns)
+        temp = f"tmp_{tabela}"
+
+        # Mesma estrutura de colunas da dimensão, sem constraints/defaults
+        cursor.execute(f"""
+            CREATE TEMP TABLE {temp} ON COMMIT DROP AS
+            SELECT {colunas} FROM {tabela} WITH NO DATA
+        """)
+        copy_dataframe(cursor, frame, temp, list(frame.columns), binary=self.binary_copy)
+
+        codigos_lote = f"SELECT {coluna_codigo} FROM {temp}"
+
+        cursor.execute(f"SELECT count(*) FROM {tabela} WHERE {coluna_codigo} IN ({codigos_lote})")
+        existentes = cursor.fetchone()[0]
+
+        cursor.execute(f"""
+            INSERT INTO {tabela} ({colunas})
+            SELECT {colunas} FROM {temp}
+            ON CONFLICT ({coluna_codigo}) {on_conflict}
+        """)
+
+        cursor.execute(f"SELECT {coluna_codigo}, {coluna_id} FROM {tabela} WHERE {coluna_codigo} IN ({codigos_lote})")
+        mapping = dict(cursor.fetchall())
+
+        return mapping, existentes
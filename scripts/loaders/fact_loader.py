@@ -1,8 +1,12 @@
+import time
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from src.config.database import DatabaseConfig
+from scripts.loaders.copy_utils import copy_dataframe
+from src.models import saude
 import logging
 
 class FactLoader:
@@ -12,127 +16,974 @@ class FactLoader:
     Gerencia a carga de todas as dimensões e mantém mapeamentos de IDs.
     """
 
-    def __init__(self, dimension_maps):
+    # Colunas da tabela fato (na ordem do INSERT), além das FKs
+    COLUNAS_FATO = [
+        'unidade_id', 'procedimento_id', 'cid_id', 'cbo_id', 'perfil_id',
+        'qtde_prescrita', 'qtde_dispensada', 'qtde_nao_padronizado',
+        'idade_paciente', 'diff_prescrito_dispensado', 'gerou_internamento',
+        'data_atendimento', 'morador_curitiba_rm', 'periodo_dia', 'faixa_etaria',
+        'estabelecimento_solicitante', 'estabelecimento_destino',
+        'solicitacao_exames', 'encaminhamento_especialista',
+        'chave_natural'
+    ]
+
+    # Colunas do DataFrame transformado -> colunas da tabela fato
+    MAPA_MEDIDAS = {
+        'Qtde Prescrita Farmácia Curitibana': 'qtde_prescrita',
+        'Qtde Dispensada Farmácia Curitibana': 'qtde_dispensada',
+        'Qtde de Medicamento Não Padronizado': 'qtde_nao_padronizado',
+        'idade': 'idade_paciente',
+        'diff_prescrito_dispensado': 'diff_prescrito_dispensado',
+        'gerou_internamento': 'gerou_internamento',
+        'Data do Atendimento': 'data_atendimento',
+        'morador_curitiba_rm': 'morador_curitiba_rm',
+        'periodo_dia': 'periodo_dia',
+        'faixa_etaria': 'faixa_etaria',
+        'Estabelecimento Solicitante': 'estabelecimento_solicitante',
+        'Estabelecimento Destino': 'estabelecimento_destino',
+        'Solicitação de Exames': 'solicitacao_exames',
+        'Encaminhamento para Atendimento Especialista': 'encaminhamento_especialista',
+        'chave_natural': 'chave_natural',
+        'chave_hash': 'chave_hash',
+    }
+
+    COLUNAS_INTEIRAS = [
+        'unidade_id', 'procedimento_id', 'cid_id', 'cbo_id', 'perfil_id',
+        'qtde_prescrita', 'qtde_dispensada', 'qtde_nao_padronizado',
+        'idade_paciente', 'diff_prescrito_dispensado', 'gerou_internamento'
+    ]
+
+    # Dimensão -> coluna de código natural no DataFrame transformado
+    COLUNAS_CODIGO = {
+        'unidade': 'Código da Unidade',
+        'procedimento': 'Código do Procedimento',
+        'cid': 'Código do CID',
+        'cbo': 'Código do CBO',
+        'perfil': 'cod_usuario',
+    }
+
+    # Colunas criadas pelo transform() (não existem no CSV bruto)
+    COLUNAS_DERIVADAS = [
+        'idade', 'diff_prescrito_dispensado', 'gerou_internamento',
+        'morador_curitiba_rm', 'periodo_dia', 'faixa_etaria', 'chave_natural', 'chave_hash'
+    ]
+
+    # Componentes da chave natural já resolvidos para colunas da fato
+    # (usados na verificação de colisão do modo hashed_key)
+    COMPONENTES_CHAVE = ['data_atendimento', 'unidade_id', 'perfil_id', 'procedimento_id']
+
+    STAGING_TABLE = 'fato_atendimento_staging'
+
+    # Quarentena das linhas com FK faltando (scripts/08_fato_rejeitos.sql)
+    TABELA_REJEITOS = 'fato_atendimento_rejeitos'
+    # Dimensão -> coluna do código bruto na tabela de rejeitos; a máscara
+    # mascara_fk tem o bit i ligado quando falta a FK da i-ésima dimensão
+    COLUNAS_REJEITO_CODIGO = {
+        'unidade': 'codigo_unidade',
+        'procedimento': 'codigo_procedimento',
+        'cid': 'codigo_cid',
+        'cbo': 'codigo_cbo',
+        'perfil': 'cod_usuario',
+    }
+
+    # Fato particionada por mês (scripts/06_fato_particionada.sql)
+    TABELA_FATO = 'fato_atendimento'
+    MODOS_RECARGA = ('truncate', 'swap')
+
+    @classmethod
+    def required_columns(cls):
+        """Colunas do CSV que a carga da fato consome diretamente"""
+        medidas = [col for col in cls.MAPA_MEDIDAS if col not in cls.COLUNAS_DERIVADAS]
+        return list(cls.COLUNAS_CODIGO.values()) + medidas
+
+    PARTICIONAMENTOS = ('hash', 'month')
+
+    def __init__(self, dimension_maps, bulk: bool = True, hashed_key: bool = False,
+                 workers: int = 1, partition_by: str = 'hash', session: str = 'bulk',
+                 batch_size: Optional[int] = None, partitioned: bool = False,
+                 binary_copy: bool = False):
+        """
+        Args:
+            dimension_maps: Mapeamentos código -> ID gerados pelo DimensionLoader
+            bulk: Se True, carrega via COPY + staging (modo em massa);
+                  se False, usa um INSERT por linha (modo legado)
+            hashed_key: Usa chave_hash (BIGINT) como chave de conflito em vez
+                        da chave_natural em texto (apenas no modo em massa)
+            workers: Conexões usadas em paralelo no modo em massa; com mais de
+                     uma, a fato é dividida em partições carregadas cada uma
+                     em sua conexão do pool, com staging e commit próprios
+            partition_by: 'hash' (hash dos componentes da chave natural,
+                          partições equilibradas) ou 'month' (mês do atendimento)
+            session: Perfil de sessão (DatabaseConfig.SESSION_PROFILES) das
+                     conexões das partições
+            batch_size: Commit a cada batch_size linhas da fato; None = um
+                        único commit. Requer workers=1
+            partitioned: A fato é particionada por mês de data_atendimento:
+                         as partições que faltam são criadas antes da carga,
+                         cada lote é gravado direto na partição do seu mês e
+                         as chaves de conflito incluem data_atendimento
+            binary_copy: Envia a staging no formato binário do COPY (FKs
+                         int4, datas int8, flags int2, textos sem escape)
+        """
+        if hashed_key and not bulk:
+            raise ValueError("hashed_key requer o modo em massa (bulk=True)")
+        if partitioned and not bulk:
+            raise ValueError("partitioned requer o modo em massa (bulk=True)")
+        if partition_by not in self.PARTICIONAMENTOS:
+            raise ValueError(f"partition_by inválido: {partition_by} (use 'hash' ou 'month')")
+        if workers > 1 and batch_size:
+            raise ValueError("batch_size requer workers=1: cada partição paralela faz um único commit")
+
         self.dimension_maps = dimension_maps
+        self.bulk = bulk
+        self.hashed_key = hashed_key
+        self.workers = max(1, workers)
+        self.partition_by = partition_by
+        self.session = session
+        self.batch_size = batch_size
+        self.partitioned = partitioned
+        self.binary_copy = binary_copy
+        self.rejeitos_por_dimensao = {dim: 0 for dim in self.COLUNAS_CODIGO}  # Linhas sem FK, acumuladas
+        self._rejeitos_prontos = False  # Tabela de rejeitos já verificada nesta instância
+        self.resultados_particoes = []  # Resultado de cada partição da última carga paralela
+        self._origem: Optional[pd.DataFrame] = None  # Frame da carga em curso (chave em texto das colisões)
+        self._chaves_texto_verificadas = False  # Modo texto já conferido contra linhas só com hash
         self.logger = logging.getLogger(__name__)
 
-    def load_fato_atendimento(self, df: pd.DataFrame, conn) -> None:
+        # No modo hashed_key a chave em texto só é montada para as colisões
+        # (fallback); nas demais linhas ela fica nula na staging e na fato
+        self.colunas_fato = list(self.COLUNAS_FATO) + (['chave_hash'] if hashed_key else [])
+
+    def load_fato_atendimento(self, df: pd.DataFrame, conn,
+                              on_batch: Optional[Callable] = None) -> Dict[str, int]:
         """
         Carrega a tabela fato_atendimento no banco de dados.
         Usa os mapeamentos de dimensão para substituir valores por IDs.
+
+        Args:
+            on_batch: Chamado como on_batch(conn, lote) após o merge de cada
+                      lote e antes do seu commit (ex.: gravar um checkpoint
+                      na mesma transação). O índice do lote é o do df.
+                      Requer workers=1.
+
+        Returns:
+            Dicionário com contagens de inseridos, duplicados e erros
+        """
+        if on_batch is not None and self.workers > 1:
+            # As partições confirmam linhas fora de ordem: não há "até aqui" para um checkpoint
+            raise ValueError("on_batch (checkpoint por lote) requer workers=1")
+
+        if not self.hashed_key and not self._chaves_texto_verificadas:
+            self._check_text_keys(conn.cursor())
+            self._chaves_texto_verificadas = True
+
+        try:
+            if self.bulk:
+                return self._load_bulk(df, conn, on_batch)
+            return self._load_row_by_row(df, conn)
+        finally:
+            self._origem = None
+
+    def _check_text_keys(self, cursor) -> None:
+        """
+        Modo texto (ON CONFLICT (chave_natural)): linhas gravadas no modo
+        hashed_key têm chave_natural nula e não seriam reconhecidas, então
+        cada uma delas voltaria como duplicata. Sem scripts/03_chave_hash.sql
+        a coluna é NOT NULL e não há o que checar; com ele, a busca usa o
+        índice parcial idx_fato_sem_chave_natural.
+
+        Raises:
+            ValueError: se a fato tiver linhas sem chave_natural
+        """
+        cursor.execute("""
+            SELECT attnotnull FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attname = 'chave_natural'
+        """, (self.TABELA_FATO,))
+        if cursor.fetchone()[0]:
+            return
+
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {self.TABELA_FATO} WHERE chave_natural IS NULL)")
+        if cursor.fetchone()[0]:
+            raise ValueError(f"{self.TABELA_FATO} tem linhas gravadas com hashed_key=True (chave_natural nula): "
+                             f"a carga sem hashed_key as duplicaria; continue com hashed_key=True")
+
+    def resolve_foreign_keys(self, df: pd.DataFrame):
+        """
+        Resolve as 5 FKs sobre colunas inteiras (sem laço por linha).
+
+        Cada coluna de código é fatorada; apenas os valores distintos passam
+        pela normalização e pelo lookup no dimension_maps, e o resultado é
+        redistribuído para todas as linhas.
+
+        Returns:
+            Tupla (fks, missing_mask, miss_counts):
+              - fks: DataFrame com unidade_id ... perfil_id (Int64, <NA> se faltando)
+              - missing_mask: Series booleana, True para linhas com alguma FK faltando
+              - miss_counts: dicionário dimensão -> linhas sem FK
+        """
+        fks = pd.DataFrame(index=df.index)
+
+        for dim, col in self.COLUNAS_CODIGO.items():
+            fks[f'{dim}_id'] = self._map_codes(df[col], dim)
+
+        missing = fks.isna()
+        missing_mask = missing.any(axis=1)
+        miss_counts = {col[:-3]: int(n) for col, n in missing.sum().items()}
+
+        return fks, missing_mask, miss_counts
+
+    def _map_codes(self, serie: pd.Series, dim: str) -> pd.arrays.IntegerArray:
+        """Mapeia uma coluna de códigos naturais para IDs da dimensão"""
+        codes, uniques = pd.factorize(serie)
+        mapping = self.dimension_maps[dim]
+
+        if dim == 'perfil':
+            # Mesma regra do DimensionLoader.load_perfis (saude.to_user_code), vetorizada
+            codigos = [None if pd.isna(c) else int(c) for c in saude.to_user_code(pd.Series(uniques))]
+        else:
+            codigos = [self._normalize_code(dim, valor) for valor in uniques]
+        codigos.append(self._normalize_code(dim, None))  # sentinela dos nulos (code -1)
+
+        ids_unicos = [mapping.get(codigo, np.nan) if codigo is not None else np.nan for codigo in codigos]
+
+        ids = np.asarray(ids_unicos, dtype='float64')[codes]
+        return pd.array(ids, dtype='Int64')
+
+    @staticmethod
+    def _normalize_code(dim: str, valor):
+        """Converte um código natural para o mesmo tipo/forma das chaves do dimension_maps"""
+        nulo = valor is None or (not isinstance(valor, str) and pd.isna(valor))
+
+        if dim == 'cid':
+            # Tratar código CID "Não Informado"
+            if nulo or valor in ['', 'None', 'NaN']:
+                return 'NI'
+            return str(valor).strip()
+
+        if nulo:
+            return None
+
+        if dim == 'perfil':
+            # dim_perfil_paciente.codigo_usuario é INTEGER (regra de saude.to_user_code)
+            codigo = saude.to_user_code(pd.Series([valor], dtype=object)).iloc[0]
+            return None if pd.isna(codigo) else int(codigo)
+
+        return str(valor)
+
+    def _load_bulk(self, df: pd.DataFrame, conn, on_batch: Optional[Callable] = None) -> Dict[str, int]:
+        """
+        Carga em massa: resolve as FKs, envia o frame para uma tabela de
+        staging temporária via COPY e faz o merge com um
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING por lote (um único
+        lote se batch_size não for informado), com commit a cada lote.
+        """
+        cursor = conn.cursor()
+
+        print("📊 Carregando tabela fato (modo COPY)...")
+
+        fato, erros = self._prepare_fact_frame(df, cursor)
+
+        if self.partitioned:
+            fato, sem_data = self._drop_undated(fato)
+            erros += sem_data
+            # DDL em transação curta: criar partição bloqueia a tabela pai até o commit
+            self.ensure_partitions(conn, fato['data_atendimento'])
+            conn.commit()
+
+        if self.workers > 1 and len(fato) > 1:
+            conn.commit()  # dimensões visíveis para as conexões das partições
+            inseridos, duplicados, erros_particoes = self._load_partitions(fato)
+            erros += erros_particoes
+        else:
+            inseridos = duplicados = 0
+            tamanho = self.batch_size or max(len(fato), 1)
+            for inicio in range(0, max(len(fato), 1), tamanho):
+                lote = fato.iloc[inicio:inicio + tamanho]
+                inseridos_lote, duplicados_lote = self._copy_and_merge(lote, cursor)
+                inseridos += inseridos_lote
+                duplicados += duplicados_lote
+
+                if on_batch is not None and len(lote):
+                    on_batch(conn, lote)
+                conn.commit()
+
+        print(f"✅ Carga concluída: {inseridos} inseridos, {duplicados} duplicados, {erros} erros.")
+
+        return {'inseridos': inseridos, 'duplicados': duplicados, 'erros': erros}
+
+    def _prepare_fact_frame(self, df: pd.DataFrame, cursor=None):
+        """
+        Resolve as FKs, descarta as linhas com FK faltando e monta o frame
+        no layout da tabela fato.
+
+        As linhas descartadas vão em massa para fato_atendimento_rejeitos
+        (se cursor for informado, na transação da carga) e entram nos
+        contadores de rejeitos_por_dimensao.
+
+        Returns:
+            Tupla (fato, erros)
+        """
+        fks, missing_mask, miss_counts = self.resolve_foreign_keys(df)
+        erros = int(missing_mask.sum())
+        self._origem = df  # Componentes da chave em texto, se houver colisão de hash no banco
+
+        if erros:
+            for dim, n in miss_counts.items():
+                self.rejeitos_por_dimensao[dim] += n
+            destino = f" → {self.TABELA_REJEITOS}" if cursor is not None else ""
+            print(f"   ⚠️  {erros} linhas com FKs faltando por dimensão: {miss_counts}{destino}")
+
+            if cursor is not None:
+                rejeitos = self._build_reject_frame(df.loc[missing_mask], fks.loc[missing_mask])
+                self._write_rejects(cursor, rejeitos)
+
+        fato = self._build_fact_frame(df.loc[~missing_mask], fks.loc[~missing_mask])
+        return fato, erros
+
+    def _build_reject_frame(self, df: pd.DataFrame, fks: pd.DataFrame) -> pd.DataFrame:
+        """Linhas sem FK no layout de fato_atendimento_rejeitos: códigos brutos, máscara e medidas"""
+        rejeitos = pd.DataFrame({
+            coluna: df[self.COLUNAS_CODIGO[dim]] for dim, coluna in self.COLUNAS_REJEITO_CODIGO.items()
+        }, index=df.index)
+
+        bits = 1 << np.arange(len(fks.columns))
+        rejeitos['mascara_fk'] = (fks.isna().to_numpy() * bits).sum(axis=1).astype('int16')
+
+        fato = self._build_fact_frame(df, fks)
+        for col in self.colunas_fato:
+            if col not in fks.columns:
+                rejeitos[col] = fato[col]
+        if self.hashed_key and 'chave_natural' not in df.columns:
+            # Poucas linhas: a quarentena guarda a chave em texto de todas (reprocess_rejects)
+            rejeitos['chave_natural'] = saude.natural_key_text(df) if len(df) else None
+        return rejeitos
+
+    def _write_rejects(self, cursor, rejeitos: pd.DataFrame) -> int:
+        """
+        Grava os rejeitos via COPY em uma tabela temporária e um único
+        INSERT ... ON CONFLICT DO NOTHING: a mesma linha rejeitada de novo
+        (retomada, recarga) não se repete.
+        """
+        if not self._rejeitos_prontos:
+            self._ensure_rejects_table(cursor)
+            self._rejeitos_prontos = True
+
+        colunas = list(rejeitos.columns)
+        lista = ', '.join(colunas)
+        temp = f"tmp_{self.TABELA_REJEITOS}"
+
+        cursor.execute(f"""
+            CREATE TEMP TABLE {temp} ON COMMIT DROP AS
+            SELECT {lista} FROM {self.TABELA_REJEITOS} WITH NO DATA
+        """)
+        copy_dataframe(cursor, rejeitos, temp, colunas, binary=self.binary_copy)
+        cursor.execute(f"""
+            INSERT INTO {self.TABELA_REJEITOS} ({lista})
+            SELECT {lista} FROM {temp}
+            ON CONFLICT DO NOTHING
+        """)
+        gravados = cursor.rowcount
+        cursor.execute(f"DROP TABLE {temp}")
+        return gravados
+
+    def _ensure_rejects_table(self, cursor) -> None:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABELA_REJEITOS} (
+                rejeito_id BIGSERIAL PRIMARY KEY,
+                mascara_fk SMALLINT NOT NULL,
+                codigo_unidade TEXT,
+                codigo_procedimento TEXT,
+                codigo_cid TEXT,
+                codigo_cbo TEXT,
+                cod_usuario TEXT,
+                qtde_prescrita INTEGER,
+                qtde_dispensada INTEGER,
+                qtde_nao_padronizado INTEGER,
+                idade_paciente INTEGER,
+                diff_prescrito_dispensado INTEGER,
+                gerou_internamento SMALLINT,
+                data_atendimento TIMESTAMP,
+                morador_curitiba_rm VARCHAR(20),
+                periodo_dia VARCHAR(10),
+                faixa_etaria VARCHAR(15),
+                estabelecimento_solicitante TEXT,
+                estabelecimento_destino TEXT,
+                solicitacao_exames TEXT,
+                encaminhamento_especialista TEXT,
+                chave_natural VARCHAR(255) UNIQUE,
+                chave_hash BIGINT UNIQUE,
+                data_rejeicao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def _build_fact_frame(self, df: pd.DataFrame, fks: pd.DataFrame) -> pd.DataFrame:
+        """Monta o frame no layout da tabela fato a partir das FKs resolvidas"""
+        fato = fks.copy()
+
+        for origem, destino in self.MAPA_MEDIDAS.items():
+            fato[destino] = df[origem] if origem in df.columns else None
+
+        # Inteiros com nulos viram float no pandas; o COPY exige "1", não "1.0"
+        for col in self.COLUNAS_INTEIRAS:
+            fato[col] = pd.to_numeric(fato[col], errors='coerce').astype('Int64')
+
+        if self.hashed_key:
+            fato['chave_hash'] = fato['chave_hash'].astype('Int64')
+            if 'chave_natural' not in df.columns:
+                # Chave em texto só nas colisões do transform (hash nulo); as colisões
+                # com a fato são resolvidas depois do COPY (_resolve_hash_collisions)
+                sem_hash = fato['chave_hash'].isna().to_numpy()
+                fato['chave_natural'] = None
+                if sem_hash.any():
+                    fato.loc[sem_hash, 'chave_natural'] = saude.natural_key_text(df.loc[sem_hash]).astype(object)
+
+        return fato[self.colunas_fato]
+
+    def partition(self, fato: pd.DataFrame, n: int):
+        """
+        Divide o frame da fato em até n partições disjuntas pela chave natural.
+
+        Linhas com a mesma chave caem sempre na mesma partição, então as
+        cargas concorrentes nunca disputam a mesma entrada do índice único.
+        """
+        if self.partition_by == 'month':
+            datas = fato['data_atendimento']
+            particao = (datas.dt.year * 12 + datas.dt.month).fillna(0).to_numpy(dtype='int64') % n
+        else:
+            hashes = pd.util.hash_pandas_object(fato[self.COMPONENTES_CHAVE], index=False).to_numpy()
+            particao = hashes % np.uint64(n)
+
+        return [fato[particao == i] for i in range(n) if (particao == i).any()]
+
+    def _load_partitions(self, fato: pd.DataFrame):
+        """
+        Carrega as partições em paralelo, uma conexão do pool por partição.
+
+        Cada partição faz commit sozinha; uma partição que falha é desfeita,
+        as demais seguem, e a primeira exceção é relançada ao final (a
+        recarga é segura: o merge ignora as linhas já gravadas).
+
+        Returns:
+            Tupla (inseridos, duplicados, erros) somada entre as partições
+        """
+        workers = self._partition_workers()
+        particoes = self.partition(fato, workers)
+        print(f"   🔀 {len(particoes)} partições ({self.partition_by}) em {workers} conexões")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fato') as executor:
+            futuros = [executor.submit(self._load_partition, i, parte) for i, parte in enumerate(particoes)]
+
+        self.resultados_particoes, falha = [], None
+        for i, (parte, futuro) in enumerate(zip(particoes, futuros)):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                self.logger.error(f"Erro na partição {i} da fato: {e}")
+                resultado = {'particao': i, 'linhas': len(parte), 'inseridos': 0, 'duplicados': 0,
+                             'erros': len(parte), 'segundos': None}
+                falha = falha or e
+            self.resultados_particoes.append(resultado)
+
+        totais = {chave: sum(r[chave] for r in self.resultados_particoes)
+                  for chave in ('inseridos', 'duplicados', 'erros')}
+        if falha is not None:
+            print(f"❌ Partições com erro: {totais['erros']} linhas não gravadas")
+            raise falha
+
+        return totais['inseridos'], totais['duplicados'], totais['erros']
+
+    def _partition_workers(self) -> int:
+        """
+        Conexões usadas pelas partições: quem chama já segura uma conexão do
+        pool, então no máximo maxconn - 1 (sem pool, maxconn <= 0: workers).
+
+        Raises:
+            ValueError: se o pool não tiver conexão sobrando para as partições
+        """
+        maxconn = DatabaseConfig.POOL_CONFIG['maxconn']
+        if maxconn <= 0:
+            return self.workers
+        if maxconn < 2:
+            raise ValueError(f"Carga paralela requer DB_POOL_MAX >= 2 (atual: {maxconn}); use workers=1")
+        if self.workers > maxconn - 1:
+            print(f"   ⚠️  workers={self.workers} reduzido para {maxconn - 1} (DB_POOL_MAX={maxconn}, "
+                  f"uma conexão já em uso pela carga)")
+        return min(self.workers, maxconn - 1)
+
+    def _load_partition(self, i: int, parte: pd.DataFrame) -> Dict:
+        """Carrega uma partição em uma conexão própria, com staging própria"""
+        inicio = time.perf_counter()
+        with DatabaseConfig.get_connection(session=self.session) as conn:
+            inseridos, duplicados = self._copy_and_merge(parte, conn.cursor(), f"{self.STAGING_TABLE}_p{i}")
+
+        return {'particao': i, 'linhas': len(parte), 'inseridos': inseridos, 'duplicados': duplicados,
+                'erros': 0, 'segundos': round(time.perf_counter() - inicio, 3)}
+
+    @classmethod
+    def partition_name(cls, mes) -> str:
+        """Partição mensal da fato: fato_atendimento_AAAA_MM"""
+        mes = pd.Period(mes, freq='M')
+        return f"{cls.TABELA_FATO}_{mes.year}_{mes.month:02d}"
+
+    @staticmethod
+    def _month_bounds(mes):
+        """Limites [início, fim) do mês, no formato do FOR VALUES da partição"""
+        mes = pd.Period(mes, freq='M')
+        return mes.start_time.to_pydatetime(), (mes + 1).start_time.to_pydatetime()
+
+    def ensure_partitions(self, conn, datas: pd.Series) -> None:
+        """Cria as partições mensais que faltam para as datas informadas (sem commit)"""
+        cursor = conn.cursor()
+        for mes in sorted(datas.dt.to_period('M').dropna().unique()):
+            particao = self.partition_name(mes)
+            cursor.execute("SELECT to_regclass(%s)", (particao,))
+            if cursor.fetchone()[0] is not None:
+                continue
+
+            inicio, fim = self._month_bounds(mes)
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {particao}
+                PARTITION OF {self.TABELA_FATO} FOR VALUES FROM (%s) TO (%s)
+            """, (inicio, fim))
+            print(f"   🗂️  Partição {particao} criada")
+
+    @staticmethod
+    def _drop_undated(fato: pd.DataFrame):
+        """Linhas sem data_atendimento não têm partição: descartadas como erro"""
+        sem_data = fato['data_atendimento'].isna()
+        if sem_data.any():
+            print(f"   ⚠️  {int(sem_data.sum())} linhas sem data_atendimento descartadas (fato particionada)")
+        return fato.loc[~sem_data], int(sem_data.sum())
+
+    def reload_month(self, df: pd.DataFrame, conn, mes, modo: str = 'swap') -> Dict[str, int]:
+        """
+        Recarrega um mês da fato particionada, sem tocar nos demais.
+
+        Args:
+            df: Frame transformado (as linhas de outros meses são ignoradas)
+            mes: Mês a recarregar (ex.: '2024-03')
+            modo: 'truncate' esvazia a partição e carrega nela (o mês fica
+                  vazio para as consultas durante a carga); 'swap' carrega
+                  uma tabela nova e troca as partições com DETACH/ATTACH no
+                  fim (o mês antigo segue consultável até a troca)
+
+        Returns:
+            Dicionário com contagens de inseridos, duplicados e erros
+        """
+        if not self.partitioned:
+            raise ValueError("reload_month requer a fato particionada (partitioned=True)")
+        if modo not in self.MODOS_RECARGA:
+            raise ValueError(f"modo inválido: {modo} (use 'truncate' ou 'swap')")
+
+        mes = pd.Period(mes, freq='M')
+        particao = self.partition_name(mes)
+        print(f"📊 Recarregando {particao} (modo {modo})...")
+
+        fato, erros = self._prepare_fact_frame(df, conn.cursor())
+        fato = fato[fato['data_atendimento'].dt.to_period('M') == mes]
+        try:
+            inseridos, duplicados = self._reload_partition(conn, fato, mes, modo)
+        finally:
+            self._origem = None
+
+        conn.commit()
+        print(f"✅ {particao} recarregada: {inseridos} inseridos, {duplicados} duplicados, {erros} erros.")
+
+        return {'inseridos': inseridos, 'duplicados': duplicados, 'erros': erros}
+
+    def _reload_partition(self, conn, fato: pd.DataFrame, mes: pd.Period, modo: str):
+        """Troca o conteúdo da partição de mes pelo frame (sem o commit final)"""
+        particao = self.partition_name(mes)
+        inicio, fim = self._month_bounds(mes)
+
+        self.ensure_partitions(conn, pd.Series([mes.start_time]))
+        conn.commit()
+
+        cursor = conn.cursor()
+        if modo == 'truncate':
+            cursor.execute(f"TRUNCATE {particao}")
+            inseridos, duplicados = self._copy_and_merge(fato, cursor)
+        else:
+            nova = f"{particao}_nova"
+            cursor.execute(f"DROP TABLE IF EXISTS {nova}")
+            cursor.execute(f"CREATE TABLE {nova} (LIKE {particao} INCLUDING ALL)")
+            # CHECK igual ao intervalo: o ATTACH não precisa varrer a tabela para validar
+            cursor.execute(f"""
+                ALTER TABLE {nova} ADD CONSTRAINT {nova}_intervalo
+                CHECK (data_atendimento >= %s AND data_atendimento < %s)
+            """, (inicio, fim))
+            inseridos, duplicados = self._copy_and_merge(fato, cursor, destino=nova)
+
+            cursor.execute(f"ALTER TABLE {self.TABELA_FATO} DETACH PARTITION {particao}")
+            cursor.execute(f"ALTER TABLE {self.TABELA_FATO} ATTACH PARTITION {nova} FOR VALUES FROM (%s) TO (%s)",
+                           (inicio, fim))
+            cursor.execute(f"DROP TABLE {particao}")
+            cursor.execute(f"ALTER TABLE {nova} RENAME TO {particao}")
+            cursor.execute(f"ALTER TABLE {particao} DROP CONSTRAINT {nova}_intervalo")
+            self._rename_swapped_objects(cursor, particao, nova)
+
+        return inseridos, duplicados
+
+    @staticmethod
+    def _rename_swapped_objects(cursor, tabela: str, prefixo: str) -> None:
+        """
+        Tira o prefixo da tabela trocada (..._nova) dos nomes das restrições
+        e índices criados pelo LIKE ... INCLUDING ALL; sem isso, a próxima
+        troca do mesmo mês gera nomes que colidem com os que ficaram.
+        """
+        # Restrições primeiro: PK/UNIQUE renomeiam junto o índice que as sustenta
+        cursor.execute("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = %s::regclass AND left(conname, %s) = %s
+        """, (tabela, len(prefixo), prefixo))
+        for (nome,) in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {tabela} RENAME CONSTRAINT {nome} TO {tabela}{nome[len(prefixo):]}")
+
+        cursor.execute("""
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass AND left(c.relname, %s) = %s
+        """, (tabela, len(prefixo), prefixo))
+        for (nome,) in cursor.fetchall():
+            cursor.execute(f"ALTER INDEX {nome} RENAME TO {tabela}{nome[len(prefixo):]}")
+
+    def reprocess_rejects(self, conn) -> Dict[str, int]:
+        """
+        Reprocessa fato_atendimento_rejeitos em uma única passada em SQL.
+
+        Os códigos brutos são resolvidos por JOIN com as dimensões (com as
+        mesmas regras de _normalize_code: CID nulo/vazio vira 'NI', o
+        usuário só com dígitos é comparado como inteiro, como em
+        saude.to_user_code); as linhas que agora resolvem
+        todas as FKs passam por uma staging e pelo mesmo merge da carga, e
+        saem da quarentena. As demais continuam lá.
+
+        Returns:
+            Dicionário com contagens de resolvidos, inseridos, duplicados e pendentes
+        """
+        cursor = conn.cursor()
+        self._ensure_rejects_table(cursor)
+        staging = f"{self.STAGING_TABLE}_rejeitos"
+        outras = [col for col in self.colunas_fato if not col.endswith('_id')]
+
+        print(f"♻️  Reprocessando {self.TABELA_REJEITOS}...")
+
+        # Temporária (sem WAL, visível só nesta sessão): some no commit
+        cursor.execute(f"""
+            CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+            SELECT r.rejeito_id, u.unidade_id, p.procedimento_id, c.cid_id, b.cbo_id, pp.perfil_id,
+                   {', '.join(f'r.{col}' for col in outras)}
+            FROM {self.TABELA_REJEITOS} r
+            JOIN dim_unidade u ON u.codigo_unidade = r.codigo_unidade
+            JOIN dim_procedimento p ON p.codigo_procedimento = r.codigo_procedimento
+            JOIN dim_cid c ON c.codigo_cid = CASE
+                WHEN r.codigo_cid IS NULL OR r.codigo_cid IN ('', 'None', 'NaN') THEN 'NI'
+                ELSE btrim(r.codigo_cid) END
+            JOIN dim_cbo b ON b.codigo_cbo = r.codigo_cbo
+            JOIN dim_perfil_paciente pp ON pp.codigo_usuario = CASE
+                WHEN btrim(r.cod_usuario) ~ '^[+-]?[0-9]{{1,18}}$' THEN btrim(r.cod_usuario)::bigint END
+            {'WHERE r.data_atendimento IS NOT NULL' if self.partitioned else ''}
+        """)
+        resolvidos = cursor.rowcount
+
+        meses = None
+        if self.partitioned:
+            cursor.execute(f"SELECT DISTINCT date_trunc('month', data_atendimento) FROM {staging}")
+            meses = pd.Series([linha[0] for linha in cursor.fetchall()], dtype='datetime64[ns]')
+            self.ensure_partitions(conn, meses)
+
+        if self.hashed_key:
+            self._null_hash_collisions(cursor, staging)
+        inseridos = self._merge_staging(cursor, staging, meses)
+
+        cursor.execute(f"DELETE FROM {self.TABELA_REJEITOS} r USING {staging} s WHERE r.rejeito_id = s.rejeito_id")
+        cursor.execute(f"SELECT count(*) FROM {self.TABELA_REJEITOS}")
+        pendentes = cursor.fetchone()[0]
+        conn.commit()
+
+        print(f"✅ Rejeitos: {resolvidos} resolvidos ({inseridos} inseridos), {pendentes} pendentes")
+
+        return {'resolvidos': resolvidos, 'inseridos': inseridos,
+                'duplicados': resolvidos - inseridos, 'pendentes': pendentes}
+
+    def backfill_hash_keys(self, conn, batch_size: int = 200_000) -> int:
+        """
+        Preenche chave_hash das linhas gravadas antes do modo hashed_key.
+
+        Sem isso o ON CONFLICT (chave_hash) não enxerga essas linhas e uma
+        recarga as duplicaria. O hash é o mesmo do transform
+        (saude.hash_natural_key), calculado a partir dos componentes da
+        chave_natural em texto; vai ao banco via COPY e um UPDATE por lote,
+        com commit a cada lote. Hashes que colidem (dentro do lote ou com
+        uma linha já gravada) ficam nulos: a linha segue pela chave em texto.
+
+        Returns:
+            Total de linhas preenchidas
+        """
+        cursor = conn.cursor()
+        temp = f"tmp_{self.TABELA_FATO}_hash"
+        preenchidas, ultimo_id = 0, 0
+
+        while True:
+            # Índice parcial idx_fato_sem_hash (scripts/03_chave_hash.sql)
+            cursor.execute(f"""
+                SELECT atendimento_id, data_atendimento, chave_natural FROM {self.TABELA_FATO}
+                WHERE chave_hash IS NULL AND chave_natural IS NOT NULL AND atendimento_id > %s
+                ORDER BY atendimento_id
+                LIMIT %s
+            """, (ultimo_id, batch_size))
+            linhas = cursor.fetchall()
+            if not linhas:
+                break
+
+            lote = pd.DataFrame(linhas, columns=['atendimento_id', 'data_atendimento', 'chave_natural'])
+            ultimo_id = int(lote['atendimento_id'].iloc[-1])
+
+            componentes = saude.parse_natural_key(lote['chave_natural'])
+            lote['chave_hash'] = pd.array(saude.hash_natural_key(componentes), dtype='Int64')
+            lote = lote.loc[componentes['Data do Atendimento'].notna().to_numpy()]
+
+            cursor.execute(f"""
+                CREATE TEMP TABLE {temp} (atendimento_id BIGINT, data_atendimento TIMESTAMP, chave_hash BIGINT)
+                ON COMMIT DROP
+            """)
+            copy_dataframe(cursor, lote, temp, ['atendimento_id', 'data_atendimento', 'chave_hash'],
+                           binary=self.binary_copy)
+            cursor.execute(f"""
+                UPDATE {self.TABELA_FATO} f SET chave_hash = t.chave_hash
+                FROM {temp} t
+                WHERE f.atendimento_id = t.atendimento_id AND f.data_atendimento = t.data_atendimento
+                  AND t.chave_hash IN (SELECT chave_hash FROM {temp} GROUP BY chave_hash HAVING count(*) = 1)
+                  AND NOT EXISTS (SELECT 1 FROM {self.TABELA_FATO} o WHERE o.chave_hash = t.chave_hash)
+            """)
+            preenchidas += cursor.rowcount
+            conn.commit()
+
+        if preenchidas:
+            print(f"   🔑 chave_hash preenchida em {preenchidas:,} linhas gravadas sem hash")
+        return preenchidas
+
+    def _copy_and_merge(self, fato: pd.DataFrame, cursor, staging: Optional[str] = None,
+                        destino: Optional[str] = None):
+        """
+        Envia o frame para a staging via COPY e faz o merge na tabela fato.
+
+        Na fato particionada, o merge é feito direto em cada partição mensal
+        presente no frame (só o índice daquele mês é consultado).
+
+        Args:
+            staging: Tabela de staging (padrão: STAGING_TABLE; uma por partição na carga paralela)
+            destino: Tabela do merge (padrão: a fato, ou as partições do mês)
+
+        Returns:
+            Tupla (inseridos, duplicados)
+        """
+        # Lote vazio (ex.: todas as linhas sem FK): nada a enviar
+        if fato.empty:
+            return 0, 0
+
+        staging = staging or self.STAGING_TABLE
+
+        # Staging temporária, como em DimensionLoader._bulk_upsert: sem WAL, privada
+        # da sessão (cargas concorrentes não disputam o nome) e descartada no commit
+        cursor.execute(f"""
+            CREATE TEMP TABLE {staging} (
+                unidade_id INTEGER,
+                procedimento_id INTEGER,
+                cid_id INTEGER,
+                cbo_id INTEGER,
+                perfil_id INTEGER,
+                qtde_prescrita INTEGER,
+                qtde_dispensada INTEGER,
+                qtde_nao_padronizado INTEGER,
+                idade_paciente INTEGER,
+                diff_prescrito_dispensado INTEGER,
+                gerou_internamento SMALLINT,
+                data_atendimento TIMESTAMP,
+                morador_curitiba_rm VARCHAR(20),
+                periodo_dia VARCHAR(10),
+                faixa_etaria VARCHAR(15),
+                estabelecimento_solicitante TEXT,
+                estabelecimento_destino TEXT,
+                solicitacao_exames TEXT,
+                encaminhamento_especialista TEXT,
+                chave_natural VARCHAR(255){', chave_hash BIGINT' if self.hashed_key else ''}
+            ) ON COMMIT DROP
+        """)
+
+        colunas = self.colunas_fato
+        if self.hashed_key and fato['chave_natural'].isna().all():
+            # Sem colisões no transform: a chave em texto nem vai para a staging
+            colunas = [col for col in colunas if col != 'chave_natural']
+
+        staged = copy_dataframe(cursor, fato, staging, colunas, binary=self.binary_copy)
+        print(f"   📤 {staged:,} linhas enviadas para {staging} via COPY{' binário' if self.binary_copy else ''}")
+
+        if self.hashed_key:
+            self._resolve_hash_collisions(cursor, staging, fato)
+
+        inseridos = self._merge_staging(cursor, staging, fato['data_atendimento'], destino)
+
+        # Descartada já aqui: o chamador pode enviar outro lote antes do commit
+        cursor.execute(f"DROP TABLE {staging}")
+
+        return inseridos, staged - inseridos
+
+    def _merge_staging(self, cursor, staging: str, datas: Optional[pd.Series] = None,
+                       destino: Optional[str] = None) -> int:
+        """Merge da staging na fato, ou em cada partição mensal presente em datas"""
+        if destino is not None or not self.partitioned:
+            return self._merge(cursor, staging, destino or self.TABELA_FATO)
+
+        inseridos = 0
+        for mes in sorted(datas.dt.to_period('M').dropna().unique()):
+            inseridos += self._merge(cursor, staging, self.partition_name(mes), self._month_bounds(mes))
+        return inseridos
+
+    def _conflict_target(self, coluna: str) -> str:
+        """Na fato particionada as chaves únicas incluem a coluna de partição"""
+        return f"{coluna}, data_atendimento" if self.partitioned else coluna
+
+    def _merge(self, cursor, staging: str, destino: str, intervalo=None) -> int:
+        """
+        INSERT ... SELECT da staging em destino, ignorando chaves já gravadas.
+
+        Args:
+            intervalo: (início, fim) de data_atendimento a copiar (partição mensal)
+
+        Returns:
+            Total de linhas inseridas
+        """
+        filtro, params = "", None
+        if intervalo is not None:
+            filtro, params = "AND data_atendimento >= %s AND data_atendimento < %s", intervalo
+
+        if self.hashed_key:
+            return self._merge_hashed(cursor, staging, destino, filtro, params)
+
+        colunas = ', '.join(self.colunas_fato)
+        cursor.execute(f"""
+            INSERT INTO {destino} ({colunas})
+            SELECT {colunas} FROM {staging}
+            WHERE TRUE {filtro}
+            ON CONFLICT ({self._conflict_target('chave_natural')}) DO NOTHING
+        """, params)
+        return cursor.rowcount
+
+    def _null_hash_collisions(self, cursor, staging: str) -> None:
+        """
+        Modo hashed_key, reprocessamento da quarentena (que já guarda a
+        chave em texto): linhas da staging cujo hash já existe na fato com
+        outros componentes (colisão) perdem o hash e vão pelo fallback em texto.
+        """
+        componentes_fato = ', '.join(f'f.{col}' for col in self.COMPONENTES_CHAVE)
+        componentes_staging = ', '.join(f's.{col}' for col in self.COMPONENTES_CHAVE)
+
+        cursor.execute(f"""
+            UPDATE {staging} s SET chave_hash = NULL
+            FROM {self.TABELA_FATO} f
+            WHERE f.chave_hash = s.chave_hash
+              AND ({componentes_fato}) IS DISTINCT FROM ({componentes_staging})
+        """)
+        if cursor.rowcount:
+            print(f"   ⚠️  {cursor.rowcount} colisões de hash com a fato: gravadas pela chave em texto")
+
+    def _resolve_hash_collisions(self, cursor, staging: str, fato: pd.DataFrame) -> None:
+        """
+        Modo hashed_key: colisões da staging com a fato (mesmo hash, outros
+        componentes). Só os hashes em colisão voltam do banco; a chave em
+        texto é montada apenas para essas linhas, enviada em uma tabela
+        temporária, e elas perdem o hash para ir pelo fallback em texto.
+        """
+        componentes_fato = ', '.join(f'f.{col}' for col in self.COMPONENTES_CHAVE)
+        componentes_staging = ', '.join(f's.{col}' for col in self.COMPONENTES_CHAVE)
+
+        cursor.execute(f"""
+            SELECT s.chave_hash FROM {staging} s
+            JOIN {self.TABELA_FATO} f ON f.chave_hash = s.chave_hash
+            WHERE ({componentes_fato}) IS DISTINCT FROM ({componentes_staging})
+        """)
+        hashes = [linha[0] for linha in cursor.fetchall()]
+        if not hashes:
+            return
+
+        linhas = fato.loc[fato['chave_hash'].isin(hashes).to_numpy(dtype=bool)]
+        colisoes = pd.DataFrame({'chave_hash': linhas['chave_hash'],
+                                 'chave_natural': saude.natural_key_text(self._origem.loc[linhas.index])})
+
+        temp = f"tmp_{staging}_colisoes"
+        cursor.execute(f"CREATE TEMP TABLE {temp} (chave_hash BIGINT, chave_natural VARCHAR(255)) ON COMMIT DROP")
+        copy_dataframe(cursor, colisoes, temp, ['chave_hash', 'chave_natural'], binary=self.binary_copy)
+        cursor.execute(f"""
+            UPDATE {staging} s SET chave_hash = NULL, chave_natural = t.chave_natural
+            FROM {temp} t
+            WHERE s.chave_hash = t.chave_hash
+        """)
+        cursor.execute(f"DROP TABLE {temp}")
+        print(f"   ⚠️  {len(colisoes)} colisões de hash com a fato: gravadas pela chave em texto")
+
+    def _merge_hashed(self, cursor, staging: str, destino: str, filtro: str = "", params=None) -> int:
+        """
+        Merge do modo hashed_key: ON CONFLICT (chave_hash).
+
+        As linhas com chave_hash nula (colisões detectadas no transform ou
+        por _null_hash_collisions) são gravadas com a chave_natural em texto,
+        no mesmo formato do modo sem hash.
+
+        Returns:
+            Total de linhas inseridas
+        """
+        colunas = ', '.join(col for col in self.colunas_fato if col != 'chave_natural')
+        cursor.execute(f"""
+            INSERT INTO {destino} ({colunas})
+            SELECT {colunas} FROM {staging}
+            WHERE chave_hash IS NOT NULL {filtro}
+            ON CONFLICT ({self._conflict_target('chave_hash')}) DO NOTHING
+        """, params)
+        inseridos = cursor.rowcount
+
+        # Fallback pela chave em texto (a chave em texto fica nula nas demais linhas)
+        colunas_sem_hash = ', '.join(col for col in self.colunas_fato if col != 'chave_hash')
+        cursor.execute(f"""
+            INSERT INTO {destino} ({colunas_sem_hash})
+            SELECT {colunas_sem_hash} FROM {staging}
+            WHERE chave_hash IS NULL {filtro}
+            ON CONFLICT ({self._conflict_target('chave_natural')}) DO NOTHING
+        """, params)
+        return inseridos + cursor.rowcount
+
+    def _load_row_by_row(self, df: pd.DataFrame, conn) -> Dict[str, int]:
+        """
+        Modo legado: um INSERT ... ON CONFLICT por linha.
         """
 
         cursor = conn.cursor()
         
         inseridos = 0
         duplicados = 0
-        erros = 0
         
         print("📊 Carregando tabela fato...")
 
-        # ✅ DEBUG CRÍTICO: Verificar tipos de dados na PRIMEIRA linha
-        primeira_linha = df.iloc[0]
-        print("🔍 DEBUG - Tipos de dados na primeira linha:")
-        print(f"   'cod_usuario' type: {type(primeira_linha['cod_usuario'])}, value: {primeira_linha['cod_usuario']}")
-        print(f"   'Código da Unidade' type: {type(primeira_linha['Código da Unidade'])}, value: {primeira_linha['Código da Unidade']}")
-        
-        # ✅ DEBUG: Verificar tipos no dimension_maps
-        print("🔍 DEBUG - Tipos no dimension_maps:")
-        perfil_sample_key = list(self.dimension_maps['perfil'].keys())[0]
-        print(f"   dimension_maps['perfil'] key type: {type(perfil_sample_key)}, value: {perfil_sample_key}")
-        
-        error_types = {'unidade': 0, 'procedimento': 0, 'cid': 0, 'cbo': 0, 'perfil': 0}
+        fato, erros = self._prepare_fact_frame(df, cursor)
+        falhas, primeira_falha = 0, None
+
+        # psycopg2 não adapta pd.NA: converte para None
+        fato = fato.astype(object).where(fato.notna(), None)
+
+        colunas = ', '.join(self.colunas_fato)
+        placeholders = ', '.join(['%s'] * len(self.colunas_fato))
 
-        for index, row in df.iterrows():
-            # Mostrar progresso a cada 10.000 linhas
+        for index, valores in enumerate(fato.itertuples(index=False, name=None)):
+            # Mostrar progresso a cada 15.000 linhas
             if index % 15000 == 0 and index > 0:
                 print(f"   📈 Processadas {index} linhas fact_loader...")
             
             try:
-
-                # Tratar código CID "Não Informado"
-                if pd.isna(row['Código do CID']) or row['Código do CID'] in ['', 'None', None, 'NaN']:
-                    codigo_cid = 'NI'  # Usa o código "Não Informado"
-                else:
-                    codigo_cid = str(row['Código do CID']).strip()
-
-                # ✅ CONVERTER para os mesmos tipos do dimension_maps
-                codigo_unidade = str(row['Código da Unidade']) if pd.notna(row['Código da Unidade']) else None
-                codigo_procedimento = str(row['Código do Procedimento']) if pd.notna(row['Código do Procedimento']) else None
-                codigo_cbo = str(row['Código do CBO']) if pd.notna(row['Código do CBO']) else None
-                codigo_usuario = str(row['cod_usuario']) if pd.notna(row['cod_usuario']) else None  
-
-                # Se qualquer FK for none, pular
-                if None in [codigo_unidade, codigo_procedimento, codigo_cid, codigo_cbo, codigo_usuario]:
-                    erros += 1
-                    if erros <= 7:  # Mostrar apenas os primeiros 10 erros
-                        print(f"   ❌  Linha {index}: Código None encontrado - pulando")
-
-                # códigos naturais -> IDs de dimensão
-                unidade_id = self.dimension_maps['unidade'].get(codigo_unidade)
-                procedimento_id = self.dimension_maps['procedimento'].get(codigo_procedimento)
-                cid_id = self.dimension_maps['cid'].get(codigo_cid)
-                cbo_id = self.dimension_maps['cbo'].get(codigo_cbo)
-                perfil_id = self.dimension_maps['perfil'].get(int(codigo_usuario)) # <- converte para int na hora da busca
-
-                # ✅ VALIDAR e IDENTIFICAR qual FK está faltando
-                missing_fks = []
-                if unidade_id is None:
-                    missing_fks.append('unidade')
-                    error_types['unidade'] += 1
-                if procedimento_id is None:
-                    missing_fks.append('procedimento') 
-                    error_types['procedimento'] += 1
-                if cid_id is None:
-                    missing_fks.append('cid')
-                    error_types['cid'] += 1
-                if cbo_id is None:
-                    missing_fks.append('cbo')
-                    error_types['cbo'] += 1  
-                if perfil_id is None:
-                    missing_fks.append('perfil')
-                    error_types['perfil'] += 1
-                
-                if missing_fks:
-                    # Mostrar apenas algumas linhas de erro para debug
-                    if erros < 10:  # Mostra apenas os primeiros 10 erros
-                        print(f"   ❌ Linha {index}: FKs faltando - {missing_fks}")
-                        print(f"      Valores: unidade={row['Código da Unidade']}, procedimento={row['Código do Procedimento']}, cid={row['Código do CID']}, cbo={row['Código do CBO']}, usuario={row['cod_usuario']}")
-                    erros += 1
-                    continue
-
                 # Inserir na tabela fato (apenas IDs e medidas)
-                cursor.execute("""
-                    INSERT INTO fato_atendimento (
-                        unidade_id, procedimento_id, cid_id, cbo_id, perfil_id,
-                        qtde_prescrita, qtde_dispensada, qtde_nao_padronizado,
-                        idade_paciente, diff_prescrito_dispensado, gerou_internamento,
-                        data_atendimento, morador_curitiba_rm, periodo_dia, faixa_etaria,
-                        -- ✅ NOVAS COLUNAS
-                        estabelecimento_solicitante, estabelecimento_destino,
-                        solicitacao_exames, encaminhamento_especialista,
-                        chave_natural
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                cursor.execute(f"""
+                    INSERT INTO fato_atendimento ({colunas})
+                    VALUES ({placeholders})
                     ON CONFLICT (chave_natural) DO NOTHING
-                    """, (
-                    unidade_id, procedimento_id, cid_id, cbo_id, perfil_id,
-                    row['Qtde Prescrita Farmácia Curitibana'],
-                    row['Qtde Dispensada Farmácia Curitibana'],
-                    row['Qtde de Medicamento Não Padronizado'],
-                    row['idade'],
-                    row['diff_prescrito_dispensado'],
-                    row['gerou_internamento'],
-                    row['Data do Atendimento'],
-                    row['morador_curitiba_rm'],
-                    row['periodo_dia'],
-                    row['faixa_etaria'],
-                    # ✅ NOVOS VALORES
-                    row.get('Estabelecimento Solicitante'),
-                    row.get('Estabelecimento Destino'),
-                    row.get('Solicitação de Exames'),
-                    row.get('Encaminhamento para Atendimento Especialista'),
-                    row['chave_natural']
-                    ))
+                    """, valores)
                 
                 if cursor.rowcount > 0:
                     inseridos += 1
@@ -140,8 +991,16 @@ class FactLoader:
                     duplicados += 1
                 
             except Exception as e:
-                self.logger.error(f"Erro ao inserir linha {row['chave_natural']}: {e}")
-                erros += 1
+                falhas += 1
+                primeira_falha = primeira_falha or f"{valores[-1]}: {e}"
+
+            if self.batch_size and (index + 1) % self.batch_size == 0:
+                conn.commit()
 
         conn.commit()
-        print(f"✅ Carga concluída: {inseridos} inseridos, {duplicados} duplicados, {erros} erros.")
\ No newline at end of file
+        if falhas:
+            self.logger.error(f"{falhas} linhas com erro no INSERT (primeira: {primeira_falha})")
+            erros += falhas
+        print(f"✅ Carga concluída: {inseridos} inseridos, {duplicados} duplicados, {erros} erros.")
+
+        return {'inseridos': inseridos, 'duplicados': duplicados, 'erros': erros}
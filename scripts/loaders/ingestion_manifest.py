@@ -0,0 +1,130 @@
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from scripts.staging_cache import file_hash
+
+
+class IngestionManifest:
+    """
+    Manifesto de ingestão: registra no banco cada CSV já carregado.
+
+    Para cada arquivo guarda hash do conteúdo, tamanho, mtime, número de
+    linhas e o intervalo (mín/máx) de 'Data do Atendimento'. Nas execuções
+    seguintes os arquivos já ingeridos são ignorados, e o maior
+    'Data do Atendimento' registrado serve de marca d'água opcional para
+    carregar apenas linhas mais recentes.
+
+    O registro é gravado na mesma conexão da carga, depois da tabela fato,
+    de modo que um arquivo só entra no manifesto se a carga foi concluída.
+    """
+
+    TABELA = 'etl_arquivos_ingeridos'
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._por_hash: Dict[str, dict] = {}
+        self._arquivos: Dict[Path, dict] = {}  # Identificação dos arquivos desta execução
+
+    def load(self, conn) -> None:
+        """Cria a tabela se necessário e lê o manifesto inteiro (poucas linhas por mês)"""
+        cursor = conn.cursor()
+        self._ensure_table(cursor)
+
+        cursor.execute(f"""
+            SELECT nome_arquivo, hash_arquivo, tamanho_bytes, mtime_ns, linhas,
+                   data_atendimento_min, data_atendimento_max
+            FROM {self.TABELA}
+        """)
+        colunas = ['nome_arquivo', 'hash_arquivo', 'tamanho_bytes', 'mtime_ns', 'linhas',
+                   'data_atendimento_min', 'data_atendimento_max']
+        self._por_hash = {linha[1]: dict(zip(colunas, linha)) for linha in cursor.fetchall()}
+        conn.commit()
+
+        print(f"   📒 Manifesto de ingestão: {len(self._por_hash)} arquivo(s) já ingerido(s)")
+
+    def pending_files(self, csv_files: List[Path]) -> List[Path]:
+        """
+        Filtra os arquivos ainda não ingeridos.
+
+        Se nome, tamanho e mtime batem com um registro, o arquivo é
+        considerado ingerido sem ser relido; senão o hash do conteúdo decide.
+        """
+        return [f for f in csv_files if self._identify(f)['hash_arquivo'] not in self._por_hash]
+
+    def watermark(self) -> Optional[pd.Timestamp]:
+        """Maior 'Data do Atendimento' já ingerida, ou None se o manifesto estiver vazio"""
+        datas = [e['data_atendimento_max'] for e in self._por_hash.values() if e['data_atendimento_max'] is not None]
+        return pd.Timestamp(max(datas)) if datas else None
+
+    def register(self, conn, csv_file: Path, linhas: int,
+                 data_min: Optional[pd.Timestamp], data_max: Optional[pd.Timestamp]) -> None:
+        """Registra um arquivo como ingerido (sem commit: vai junto com a carga)"""
+        info = self._identify(csv_file)
+        entrada = dict(
+            nome_arquivo=csv_file.name,
+            hash_arquivo=info['hash_arquivo'],
+            tamanho_bytes=info['tamanho_bytes'],
+            mtime_ns=info['mtime_ns'],
+            linhas=int(linhas),
+            data_atendimento_min=None if pd.isna(data_min) else pd.Timestamp(data_min).to_pydatetime(),
+            data_atendimento_max=None if pd.isna(data_max) else pd.Timestamp(data_max).to_pydatetime(),
+        )
+
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            INSERT INTO {self.TABELA} (nome_arquivo, hash_arquivo, tamanho_bytes, mtime_ns, linhas,
+                                       data_atendimento_min, data_atendimento_max)
+            VALUES (%(nome_arquivo)s, %(hash_arquivo)s, %(tamanho_bytes)s, %(mtime_ns)s, %(linhas)s,
+                    %(data_atendimento_min)s, %(data_atendimento_max)s)
+            ON CONFLICT (hash_arquivo) DO UPDATE SET
+                nome_arquivo = EXCLUDED.nome_arquivo,
+                tamanho_bytes = EXCLUDED.tamanho_bytes,
+                mtime_ns = EXCLUDED.mtime_ns,
+                linhas = EXCLUDED.linhas,
+                data_atendimento_min = EXCLUDED.data_atendimento_min,
+                data_atendimento_max = EXCLUDED.data_atendimento_max,
+                data_ingestao = CURRENT_TIMESTAMP
+        """, entrada)
+
+        self._por_hash[entrada['hash_arquivo']] = entrada
+        print(f"   📒 {csv_file.name} registrado no manifesto ({linhas:,} linhas)")
+
+    def _identify(self, csv_file: Path) -> dict:
+        """Hash, tamanho e mtime do arquivo (o hash só é calculado se necessário)"""
+        if csv_file in self._arquivos:
+            return self._arquivos[csv_file]
+
+        stat = csv_file.stat()
+        hash_arquivo = None
+
+        # Atalho: mesmo nome, tamanho e mtime de um arquivo já registrado
+        for entrada in self._por_hash.values():
+            if (entrada['nome_arquivo'] == csv_file.name and entrada['tamanho_bytes'] == stat.st_size
+                    and entrada['mtime_ns'] == stat.st_mtime_ns):
+                hash_arquivo = entrada['hash_arquivo']
+                break
+
+        info = dict(
+            hash_arquivo=hash_arquivo or file_hash(csv_file),
+            tamanho_bytes=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+        self._arquivos[csv_file] = info
+        return info
+
+    def _ensure_table(self, cursor) -> None:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABELA} (
+                arquivo_id SERIAL PRIMARY KEY,
+                nome_arquivo VARCHAR(255) NOT NULL,
+                hash_arquivo CHAR(40) UNIQUE NOT NULL,
+                tamanho_bytes BIGINT NOT NULL,
+                mtime_ns BIGINT NOT NULL,
+                linhas INTEGER NOT NULL,
+                data_atendimento_min TIMESTAMP,
+                data_atendimento_max TIMESTAMP,
+                data_ingestao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
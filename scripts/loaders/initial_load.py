@@ -0,0 +1,217 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import logging
+
+from src.config.database import DatabaseConfig
+
+
+class InitialLoad:
+    """
+    Carga inicial: adia a manutenção de índices e FKs da fato.
+
+    Com a fato vazia, prepare() guarda a definição dos índices secundários
+    (não únicos) e das FKs em etl_ddl_adiada e os remove; a carga então
+    grava sem atualizar índices nem checar FKs linha a linha. restore()
+    recria os índices em paralelo (uma conexão do pool por índice), e
+    recoloca as FKs como NOT VALID seguidas de um único VALIDATE CONSTRAINT
+    (na fato particionada, em que o PostgreSQL anterior ao 18 não aceita
+    NOT VALID, a FK é criada já validada).
+
+    Os índices únicos ficam: são a chave de conflito do merge
+    (ON CONFLICT) e garantem a deduplicação. Como a DDL removida fica
+    gravada no banco, uma carga interrompida é recomposta no próximo
+    prepare() ou restore().
+    """
+
+    TABELA = 'fato_atendimento'
+    TABELA_DDL = 'etl_ddl_adiada'
+
+    def __init__(self, workers: int = 4, connect: Optional[Callable] = None):
+        """
+        Args:
+            workers: Índices recriados em paralelo
+            connect: Fábrica de conexões (context manager); padrão: pool do
+                     DatabaseConfig com o perfil de sessão 'bulk'
+        """
+        self.workers = max(1, workers)
+        self.connect = connect or (lambda: DatabaseConfig.get_connection(session='bulk'))
+        self.logger = logging.getLogger(__name__)
+
+    def prepare(self, conn) -> None:
+        """
+        Remove índices secundários e FKs da fato vazia.
+
+        Raises:
+            ValueError: se a fato já tiver linhas (use a carga incremental)
+        """
+        cursor = conn.cursor()
+        self._ensure_table(cursor)
+        conn.commit()
+
+        if self._pending(cursor):
+            print("   ⚠️  DDL adiada de uma carga inicial interrompida: recriando antes de continuar")
+            self.restore(reservadas=1)  # conn segue aberta durante o restore
+
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {self.TABELA})")
+        if cursor.fetchone()[0]:
+            raise ValueError(f"Carga inicial recusada: {self.TABELA} não está vazia (use a carga incremental)")
+
+        cursor.execute("""
+            SELECT c.relname, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass AND NOT i.indisunique AND NOT i.indisprimary
+            ORDER BY c.relname
+        """, (self.TABELA,))
+        indices = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+            ORDER BY conname
+        """, (self.TABELA,))
+        fks = cursor.fetchall()
+
+        # Definições gravadas na mesma transação da remoção
+        for tipo, itens in (('indice', indices), ('fk', fks)):
+            for nome, definicao in itens:
+                cursor.execute(f"INSERT INTO {self.TABELA_DDL} (nome, tipo, definicao) VALUES (%s, %s, %s)",
+                               (nome, tipo, definicao))
+
+        for nome, _ in fks:
+            cursor.execute(f"ALTER TABLE {self.TABELA} DROP CONSTRAINT {nome}")
+        for nome, _ in indices:
+            cursor.execute(f"DROP INDEX {nome}")
+        conn.commit()
+
+        print(f"   🚧 Carga inicial: {len(indices)} índices e {len(fks)} FKs adiados para o fim da carga")
+
+    def restore(self, reservadas: int = 0) -> None:
+        """
+        Recria os índices (em paralelo) e revalida as FKs gravados em etl_ddl_adiada.
+
+        Pode ser repetido após uma falha: uma FK que já existe (ex.: ADD feito
+        e VALIDATE interrompido) só é validada. Falhas de índices e FKs são
+        registradas e a primeira é relançada no fim, com as demais já
+        tentadas; o que falhou continua em etl_ddl_adiada.
+
+        Args:
+            reservadas: Conexões do pool que quem chama segura durante o
+                        restore (prepare() segura uma); os índices usam no
+                        máximo maxconn - reservadas conexões
+
+        Raises:
+            ValueError: se o pool não tiver conexão sobrando para o restore
+        """
+        workers = self._index_workers(reservadas)
+
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            pendentes = self._pending(cursor)
+            if not pendentes:
+                return
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (self.TABELA,))
+            particionada = cursor.fetchone()[0] == 'p'
+
+        indices = [(nome, definicao) for nome, tipo, definicao in pendentes if tipo == 'indice']
+        fks = [(nome, definicao) for nome, tipo, definicao in pendentes if tipo == 'fk']
+
+        print(f"   🔨 Recriando {len(indices)} índices ({workers} em paralelo)...")
+        falhas = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='indice') as executor:
+            for nome, erro in zip([n for n, _ in indices], executor.map(self._create_index, indices)):
+                if erro is not None:
+                    self.logger.error(f"Erro ao recriar o índice {nome}: {erro}")
+                    falhas.append(erro)
+
+        # VALIDATE bloqueia a tabela contra outro VALIDATE: uma FK por vez
+        for nome, definicao in fks:
+            print(f"   🔗 Validando {nome}...")
+            try:
+                self._restore_fk(nome, definicao, particionada)
+            except Exception as e:
+                self.logger.error(f"Erro ao recriar a FK {nome}: {e}")
+                falhas.append(e)
+
+        if falhas:
+            raise falhas[0]
+        print("   ✅ Índices e FKs restaurados")
+
+    def _index_workers(self, reservadas: int) -> int:
+        """
+        Conexões usadas na recriação dos índices: as do pool menos as que
+        quem chama já segura (sem pool, maxconn <= 0: workers).
+
+        Raises:
+            ValueError: se o pool não tiver conexão sobrando
+        """
+        maxconn = DatabaseConfig.POOL_CONFIG['maxconn']
+        if maxconn <= 0:
+            return self.workers
+        livres = maxconn - reservadas
+        if livres < 1:
+            raise ValueError(f"restore requer DB_POOL_MAX > {reservadas} (atual: {maxconn})")
+        if self.workers > livres:
+            print(f"   ⚠️  workers={self.workers} reduzido para {livres} (DB_POOL_MAX={maxconn}, "
+                  f"{reservadas} conexão(ões) já em uso)")
+        return min(self.workers, livres)
+
+    def _restore_fk(self, nome: str, definicao: str, particionada: bool) -> None:
+        """Recoloca (ou só valida, se já existir) uma FK, em uma conexão própria"""
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT convalidated FROM pg_constraint
+                WHERE conrelid = %s::regclass AND conname = %s
+            """, (self.TABELA, nome))
+            existente = cursor.fetchone()
+
+            if 'NOT VALID' in definicao:
+                # Já era NOT VALID antes da carga: volta como estava
+                if existente is None:
+                    cursor.execute(f"ALTER TABLE {self.TABELA} ADD CONSTRAINT {nome} {definicao}")
+            elif existente is None and particionada:
+                # Tabela particionada: NOT VALID só a partir do PostgreSQL 18
+                cursor.execute(f"ALTER TABLE {self.TABELA} ADD CONSTRAINT {nome} {definicao}")
+            else:
+                if existente is None:
+                    # NOT VALID: a FK vale para novas linhas sem varrer a tabela
+                    cursor.execute(f"ALTER TABLE {self.TABELA} ADD CONSTRAINT {nome} {definicao} NOT VALID")
+                    conn.commit()
+                if existente is None or not existente[0]:
+                    cursor.execute(f"ALTER TABLE {self.TABELA} VALIDATE CONSTRAINT {nome}")
+            self._forget(cursor, nome)
+
+    def _create_index(self, item: Tuple[str, str]):
+        """Recria um índice em uma conexão própria; devolve a exceção em vez de lançar"""
+        nome, definicao = item
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                # Já recriado (ex.: restore() repetido): só sai de etl_ddl_adiada
+                cursor.execute("SELECT to_regclass(%s)", (nome,))
+                if cursor.fetchone()[0] is None:
+                    # Índice da fato particionada: pg_get_indexdef traz ON ONLY, que criaria
+                    # só o índice do pai, inválido e sem os índices das partições
+                    cursor.execute(definicao.replace(' ON ONLY ', ' ON ', 1))
+                self._forget(cursor, nome)
+            return None
+        except Exception as e:
+            return e
+
+    def _forget(self, cursor, nome: str) -> None:
+        cursor.execute(f"DELETE FROM {self.TABELA_DDL} WHERE nome = %s", (nome,))
+
+    def _pending(self, cursor) -> List[Tuple[str, str, str]]:
+        cursor.execute(f"SELECT nome, tipo, definicao FROM {self.TABELA_DDL} ORDER BY tipo DESC, nome")
+        return cursor.fetchall()
+
+    def _ensure_table(self, cursor) -> None:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABELA_DDL} (
+                nome VARCHAR(255) PRIMARY KEY,
+                tipo VARCHAR(10) NOT NULL,
+                definicao TEXT NOT NULL,
+                data_remocao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
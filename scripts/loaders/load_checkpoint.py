@@ -0,0 +1,112 @@
+import uuid
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+
+class LoadCheckpoint:
+    """
+    Checkpoint da carga em streaming: até onde cada CSV já foi confirmado.
+
+    Para cada arquivo (identificado por nome, tamanho e mtime) guarda o
+    run_id da execução, o chunk e a última linha do CSV cuja carga foi
+    confirmada, e o intervalo de 'Data do Atendimento' carregado até ali.
+    O checkpoint é gravado sem commit, na mesma transação do lote da fato,
+    de modo que nunca aponta além do que está de fato no banco. Uma nova
+    execução retoma cada arquivo a partir da linha seguinte; ao fim do
+    arquivo o checkpoint é apagado junto com o registro no manifesto.
+    """
+
+    TABELA = 'etl_checkpoint_carga'
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.logger = logging.getLogger(__name__)
+        self._posicoes: Dict[Tuple, dict] = {}  # Checkpoints lidos no início da execução
+
+    def load(self, conn) -> None:
+        """Cria a tabela se necessário e lê os checkpoints pendentes"""
+        cursor = conn.cursor()
+        self._ensure_table(cursor)
+
+        cursor.execute(f"""
+            SELECT nome_arquivo, tamanho_bytes, mtime_ns, run_id, chunk, ultima_linha,
+                   data_atendimento_min, data_atendimento_max
+            FROM {self.TABELA}
+        """)
+        colunas = ['nome_arquivo', 'tamanho_bytes', 'mtime_ns', 'run_id', 'chunk', 'ultima_linha',
+                   'data_atendimento_min', 'data_atendimento_max']
+        self._posicoes = {linha[:3]: dict(zip(colunas, linha)) for linha in cursor.fetchall()}
+        conn.commit()
+
+        if self._posicoes:
+            print(f"   📍 {len(self._posicoes)} arquivo(s) com carga interrompida a retomar")
+
+    def position(self, csv_file: Path) -> Optional[dict]:
+        """Checkpoint do arquivo no início desta execução (None se não houver)"""
+        return self._posicoes.get(self._identify(csv_file))
+
+    def start_row(self, csv_file: Path) -> int:
+        """Primeira linha do CSV (0-based) ainda não confirmada"""
+        posicao = self.position(csv_file)
+        return posicao['ultima_linha'] + 1 if posicao else 0
+
+    def save(self, conn, csv_file: Path, chunk: int, ultima_linha: int,
+             data_min: Optional[pd.Timestamp], data_max: Optional[pd.Timestamp]) -> None:
+        """Grava o checkpoint do arquivo (sem commit: vai junto com o lote)"""
+        nome, tamanho, mtime = self._identify(csv_file)
+        entrada = dict(
+            nome_arquivo=nome,
+            tamanho_bytes=tamanho,
+            mtime_ns=mtime,
+            run_id=self.run_id,
+            chunk=int(chunk),
+            ultima_linha=int(ultima_linha),
+            data_atendimento_min=None if pd.isna(data_min) else pd.Timestamp(data_min).to_pydatetime(),
+            data_atendimento_max=None if pd.isna(data_max) else pd.Timestamp(data_max).to_pydatetime(),
+        )
+
+        conn.cursor().execute(f"""
+            INSERT INTO {self.TABELA} (nome_arquivo, tamanho_bytes, mtime_ns, run_id, chunk, ultima_linha,
+                                       data_atendimento_min, data_atendimento_max)
+            VALUES (%(nome_arquivo)s, %(tamanho_bytes)s, %(mtime_ns)s, %(run_id)s, %(chunk)s, %(ultima_linha)s,
+                    %(data_atendimento_min)s, %(data_atendimento_max)s)
+            ON CONFLICT (nome_arquivo, tamanho_bytes, mtime_ns) DO UPDATE SET
+                run_id = EXCLUDED.run_id,
+                chunk = EXCLUDED.chunk,
+                ultima_linha = EXCLUDED.ultima_linha,
+                data_atendimento_min = EXCLUDED.data_atendimento_min,
+                data_atendimento_max = EXCLUDED.data_atendimento_max,
+                atualizado_em = CURRENT_TIMESTAMP
+        """, entrada)
+
+    def clear(self, conn, csv_file: Path) -> None:
+        """Apaga o checkpoint de um arquivo concluído (sem commit)"""
+        nome, tamanho, mtime = self._identify(csv_file)
+        conn.cursor().execute(f"""
+            DELETE FROM {self.TABELA}
+            WHERE nome_arquivo = %(nome_arquivo)s AND tamanho_bytes = %(tamanho_bytes)s AND mtime_ns = %(mtime_ns)s
+        """, dict(nome_arquivo=nome, tamanho_bytes=tamanho, mtime_ns=mtime))
+
+    @staticmethod
+    def _identify(csv_file: Path) -> Tuple[str, int, int]:
+        """Nome, tamanho e mtime: um arquivo alterado invalida o checkpoint"""
+        stat = csv_file.stat()
+        return csv_file.name, stat.st_size, stat.st_mtime_ns
+
+    def _ensure_table(self, cursor) -> None:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABELA} (
+                nome_arquivo VARCHAR(255) NOT NULL,
+                tamanho_bytes BIGINT NOT NULL,
+                mtime_ns BIGINT NOT NULL,
+                run_id CHAR(32) NOT NULL,
+                chunk INTEGER NOT NULL,
+                ultima_linha BIGINT NOT NULL,
+                data_atendimento_min TIMESTAMP,
+                data_atendimento_max TIMESTAMP,
+                atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (nome_arquivo, tamanho_bytes, mtime_ns)
+            )
+        """)
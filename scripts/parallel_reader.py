@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow é opcional: sem ele os workers devolvem DataFrames
+    pa = None
+
+
+def _read_csv_worker(csv_file: Path, read_options: dict):
+    """
+    Lê um CSV em um processo worker.
+
+    Com pyarrow disponível, o DataFrame é devolvido serializado em Arrow IPC
+    (um único buffer contíguo por coluna), que volta ao processo pai bem mais
+    barato do que um DataFrame de objetos Python via pickle.
+    """
+    df = pd.read_csv(csv_file, **read_options)
+
+    if pa is None:
+        return df
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    # Dtypes originais: o Arrow não distingue, p.ex., string[pyarrow] de string[python]
+    return sink.getvalue(), df.dtypes.to_dict()
+
+
+def _from_worker_result(result) -> pd.DataFrame:
+    """Reconstrói o DataFrame a partir do resultado do worker"""
+    if isinstance(result, pd.DataFrame):
+        return result
+    buffer, dtypes = result
+    df = pa.ipc.open_stream(buffer).read_all().to_pandas()
+
+    for col, dtype in dtypes.items():
+        if df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+        elif dtype == object:
+            # Nulos de colunas object voltam do Arrow como None; o read_csv usa NaN
+            nulos = df[col].isna()
+            if nulos.any():
+                df.loc[nulos, col] = np.nan
+    return df
+
+
+def read_csv_files_parallel(csv_files: List[Path], read_options: dict, workers: int) -> List[pd.DataFrame]:
+    """
+    Lê vários CSVs em paralelo em um pool de processos.
+
+    Args:
+        csv_files: Arquivos a ler
+        read_options: Argumentos do pd.read_csv (mesmos da leitura sequencial)
+        workers: Tamanho do pool de processos
+
+    Returns:
+        DataFrames na mesma ordem de csv_files
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_read_csv_worker, csv_files, [read_options] * len(csv_files))
+        return [_from_worker_result(result) for result in results]
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+class SeenKeySet:
+    """
+    Conjunto de chaves naturais já vistas entre chunks.
+
+    Guarda apenas o hash de 64 bits de cada chave em arrays NumPy
+    ordenados (8 bytes por chave), em vez de um set de strings Python,
+    para que a deduplicação entre chunks não domine a memória do modo
+    streaming.
+
+    Cada chunk vira um bloco ordenado; blocos de tamanho parecido são
+    fundidos (como em um contador binário), então cada hash é copiado
+    O(log n) vezes e há no máximo O(log n) blocos a consultar, em vez de
+    reordenar todas as chaves acumuladas a cada chunk.
+    """
+
+    def __init__(self):
+        # Do maior (mais antigo) para o menor
+        self._blocos = []
+
+    def __len__(self):
+        return sum(len(bloco) for bloco in self._blocos)
+
+    def filter_new(self, keys: pd.Series) -> np.ndarray:
+        """
+        Marca as chaves ainda não vistas e as registra.
+
+        As chaves de entrada já devem estar deduplicadas dentro do chunk.
+
+        Returns:
+            Máscara booleana: True para as chaves novas
+        """
+        hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+        vistas = np.zeros(len(hashes), dtype=bool)
+        for bloco in self._blocos:
+            pos = np.searchsorted(bloco, hashes)
+            pos[pos == len(bloco)] = 0
+            vistas |= bloco[pos] == hashes
+
+        novas = ~vistas
+        self._add(np.unique(hashes[novas]))
+        return novas
+
+    def _add(self, bloco: np.ndarray) -> None:
+        """Empilha um bloco ordenado, fundindo-o aos anteriores que não forem maiores"""
+        if not len(bloco):
+            return
+        while self._blocos and len(self._blocos[-1]) <= len(bloco):
+            anterior = self._blocos.pop()
+            # Inserção por merge: O(len(anterior) + len(bloco)), sem reordenar
+            bloco = np.insert(anterior, np.searchsorted(anterior, bloco), bloco)
+        self._blocos.append(bloco)
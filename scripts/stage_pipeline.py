@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+_FIM = object()  # Sentinela de fim de fluxo entre estágios
+
+
+class PipelineCancelled(Exception):
+    """Um estágio foi interrompido porque outro falhou (ou houve cancelamento)"""
+
+
+class StageStats:
+    """Tempo ocupado e ocioso de um estágio"""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.itens = 0
+        self.ocupado = 0.0          # Executando o trabalho do estágio
+        self.espera_entrada = 0.0   # Ocioso: fila de entrada vazia (estágio anterior mais lento)
+        self.espera_saida = 0.0     # Ocioso: fila de saída cheia (contrapressão do estágio seguinte)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'itens': self.itens,
+            'ocupado_s': round(self.ocupado, 3),
+            'espera_entrada_s': round(self.espera_entrada, 3),
+            'espera_saida_s': round(self.espera_saida, 3),
+        }
+
+
+class StagePipeline:
+    """
+    Executa estágios encadeados em threads, ligados por filas limitadas.
+
+    O primeiro estágio consome um iterável (ex.: leitura de chunks) e cada
+    estágio seguinte recebe o resultado do anterior. Com filas de tamanho
+    maxsize, um estágio rápido bloqueia quando o seguinte não acompanha
+    (contrapressão), limitando os chunks em memória a ~maxsize por fila.
+
+    Se um estágio levanta exceção, os demais são cancelados e a exceção
+    original é relançada em run(). Threads são suficientes aqui: a carga
+    espera o PostgreSQL e o parsing do pandas libera o GIL em boa parte.
+    """
+
+    INTERVALO_CANCELAMENTO = 0.1  # Segundos entre verificações de cancelamento
+
+    def __init__(self, fonte: Iterable, estagios: List[Tuple[str, Callable[[Any], Any]]],
+                 nome_fonte: str = 'extract', maxsize: int = 2):
+        """
+        Args:
+            fonte: Iterável consumido pelo primeiro estágio
+            estagios: Lista (nome, função) dos estágios seguintes, em ordem
+            nome_fonte: Nome do estágio que consome a fonte
+            maxsize: Capacidade de cada fila entre estágios
+        """
+        self.fonte = fonte
+        self.estagios = estagios
+        self.maxsize = maxsize
+        self.stats = [StageStats(nome_fonte)] + [StageStats(nome) for nome, _ in estagios]
+        self._cancelado = threading.Event()
+        self._erro = None
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        self._cancelado.set()
+
+    def run(self) -> Dict[str, Dict[str, float]]:
+        """
+        Executa até o fim da fonte (ou até o primeiro erro).
+
+        Returns:
+            Dicionário estágio -> tempos ocupado/ocioso
+        """
+        filas = [queue.Queue(maxsize=self.maxsize) for _ in self.estagios]
+
+        threads = [threading.Thread(target=self._run_source, args=(filas[0] if filas else None,),
+                                    name=f'estagio-{self.stats[0].nome}', daemon=True)]
+        for i, (nome, funcao) in enumerate(self.estagios):
+            saida = filas[i + 1] if i + 1 < len(filas) else None
+            threads.append(threading.Thread(target=self._run_stage, args=(funcao, filas[i], saida, self.stats[i + 1]),
+                                            name=f'estagio-{nome}', daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=self.INTERVALO_CANCELAMENTO)
+        except BaseException:
+            # Ctrl+C (ou outro erro) na thread principal: cancela os estágios
+            self.cancel()
+            for thread in threads:
+                thread.join()
+            raise
+
+        if self._erro is not None:
+            raise self._erro
+
+        return {s.nome: s.as_dict() for s in self.stats}
+
+    def _run_source(self, saida) -> None:
+        stats = self.stats[0]
+        try:
+            iterador = iter(self.fonte)
+            while not self._cancelado.is_set():
+                inicio = time.perf_counter()
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    break
+                finally:
+                    stats.ocupado += time.perf_counter() - inicio
+                stats.itens += 1
+                if saida is not None:
+                    self._put(saida, item, stats)
+            if saida is not None:
+                self._put(saida, _FIM, stats)
+        except BaseException as e:
+            self._fail(e)
+
+    def _run_stage(self, funcao, entrada, saida, stats: StageStats) -> None:
+        try:
+            while True:
+                item = self._get(entrada, stats)
+                if item is _FIM:
+                    break
+
+                inicio = time.perf_counter()
+                resultado = funcao(item)
+                stats.ocupado += time.perf_counter() - inicio
+                stats.itens += 1
+
+                if saida is not None:
+                    self._put(saida, resultado, stats)
+            if saida is not None:
+                self._put(saida, _FIM, stats)
+        except BaseException as e:
+            self._fail(e)
+
+    def _put(self, fila, item, stats: StageStats) -> None:
+        inicio = time.perf_counter()
+        try:
+            while True:
+                if self._cancelado.is_set():
+                    raise PipelineCancelled()
+                try:
+                    fila.put(item, timeout=self.INTERVALO_CANCELAMENTO)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            stats.espera_saida += time.perf_counter() - inicio
+
+    def _get(self, fila, stats: StageStats):
+        inicio = time.perf_counter()
+        try:
+            while True:
+                if self._cancelado.is_set():
+                    raise PipelineCancelled()
+                try:
+                    return fila.get(timeout=self.INTERVALO_CANCELAMENTO)
+                except queue.Empty:
+                    continue
+        finally:
+            stats.espera_entrada += time.perf_counter() - inicio
+
+    def _fail(self, erro: BaseException) -> None:
+        """Guarda o primeiro erro real e cancela os demais estágios"""
+        with self._lock:
+            if self._erro is None and not isinstance(erro, PipelineCancelled):
+                self._erro = erro
+        self.cancel()
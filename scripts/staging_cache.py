@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import logging
+
+from scripts.parallel_reader import read_csv_files_parallel
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele o cache fica desabilitado
+    pa = None
+    pq = None
+
+
+def file_hash(path: Path) -> str:
+    """Hash BLAKE2b do conteúdo do arquivo, lido em blocos"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(8 * 1024 * 1024), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+class ParquetStagingCache:
+    """
+    Camada de staging que converte cada CSV bruto em Parquet tipado uma única vez.
+
+    Cada arquivo é identificado por tamanho, mtime e hash do conteúdo. Se
+    tamanho e mtime não mudaram, o Parquet é reutilizado sem reler o CSV;
+    se mudaram, o hash decide (um "touch" no arquivo não invalida o cache).
+    As opções de leitura também entram na chave, para que mudanças de
+    dtype/colunas gerem um novo Parquet.
+    """
+
+    def __init__(self, staging_dir: Path = Path('data/processed/staging/')):
+        self.staging_dir = Path(staging_dir)
+        self.manifest_path = self.staging_dir / 'manifest.json'
+        self.logger = logging.getLogger(__name__)
+        self._manifest = self._load_manifest()
+
+    @staticmethod
+    def is_available() -> bool:
+        return pq is not None
+
+    def read_many(self, csv_files: List[Path], read_options: dict, workers: int = 1,
+                  columns: Optional[List[str]] = None) -> List[pd.DataFrame]:
+        """
+        Lê vários CSVs pelo cache.
+
+        Os arquivos sem Parquet válido são convertidos (em paralelo se
+        workers > 1); os demais vêm direto do Parquet com projeção de colunas.
+
+        Returns:
+            DataFrames na mesma ordem de csv_files
+        """
+        opcoes = self._options_fingerprint(read_options)
+        faltando = [f for f in csv_files if self._cached_parquet(f, opcoes) is None]
+
+        if faltando:
+            print(f"   🗂️  Staging: convertendo {len(faltando)} CSV(s) para Parquet...")
+            if workers > 1 and len(faltando) > 1:
+                frames = read_csv_files_parallel(faltando, read_options, workers)
+            else:
+                frames = [pd.read_csv(f, **read_options) for f in faltando]
+
+            for csv_file, df in zip(faltando, frames):
+                self._write(csv_file, df, opcoes)
+
+            self._save_manifest()
+
+        print(f"   🗂️  Staging: {len(csv_files) - len(faltando)} arquivo(s) lidos do Parquet")
+
+        return [self._read_parquet(self._cached_parquet(f, opcoes), columns) for f in csv_files]
+
+    def iter_chunks(self, csv_file: Path, read_options: dict, chunksize: int,
+                    columns: Optional[List[str]] = None) -> Optional[Iterator[pd.DataFrame]]:
+        """
+        Itera sobre o Parquet de um CSV em blocos de chunksize linhas.
+
+        Returns:
+            Iterador de DataFrames, ou None se o arquivo não estiver no cache
+            (o modo streaming então lê o CSV em chunks normalmente)
+        """
+        parquet = self._cached_parquet(csv_file, self._options_fingerprint(read_options))
+        if parquet is None:
+            return None
+
+        arquivo = pq.ParquetFile(parquet)
+        return (batch.to_pandas() for batch in arquivo.iter_batches(batch_size=chunksize, columns=columns))
+
+    def _cached_parquet(self, csv_file: Path, opcoes: str) -> Optional[Path]:
+        """Devolve o Parquet válido para o CSV, ou None"""
+        entry = self._manifest.get(str(csv_file))
+        if entry is None or entry['opcoes'] != opcoes:
+            return None
+
+        parquet = self.staging_dir / entry['parquet']
+        if not parquet.exists():
+            return None
+
+        stat = csv_file.stat()
+        if entry['tamanho'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return parquet
+
+        # Tamanho/mtime mudaram: o hash do conteúdo decide
+        if entry['tamanho'] == stat.st_size and entry['hash'] == self._file_hash(csv_file):
+            entry['mtime_ns'] = stat.st_mtime_ns
+            self._save_manifest()
+            return parquet
+
+        return None
+
+    def _write(self, csv_file: Path, df: pd.DataFrame, opcoes: str) -> None:
+        """Grava o Parquet de um CSV e registra no manifesto"""
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+
+        stat = csv_file.stat()
+        file_hash = self._file_hash(csv_file)
+        parquet_name = f"{csv_file.stem}_{file_hash[:16]}_{opcoes[:8]}.parquet"
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = self.staging_dir / f"{parquet_name}.tmp"
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, self.staging_dir / parquet_name)
+
+        # Remove o Parquet anterior desse CSV, se houver
+        anterior = self._manifest.get(str(csv_file))
+        if anterior and anterior['parquet'] != parquet_name:
+            (self.staging_dir / anterior['parquet']).unlink(missing_ok=True)
+
+        self._manifest[str(csv_file)] = {
+            'tamanho': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': file_hash,
+            'opcoes': opcoes,
+            'parquet': parquet_name,
+            'linhas': len(df),
+        }
+
+    @staticmethod
+    def _read_parquet(parquet: Path, columns: Optional[List[str]]) -> pd.DataFrame:
+        if columns is not None:
+            # Projeção: só as colunas pedidas que existem no arquivo
+            existentes = set(pq.read_schema(parquet).names)
+            columns = [c for c in columns if c in existentes]
+        return pd.read_parquet(parquet, columns=columns)
+
+    @staticmethod
+    def _file_hash(csv_file: Path) -> str:
+        return file_hash(csv_file)
+
+    @staticmethod
+    def _options_fingerprint(read_options: dict) -> str:
+        """Hash das opções de leitura (dtype, separador, encoding...)"""
+        texto = json.dumps(read_options, sort_keys=True, default=str)
+        return hashlib.blake2b(texto.encode('utf-8'), digest_size=8).hexdigest()
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            return json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Manifesto de staging ilegível, será recriado: {e}")
+            return {}
+
+    def _save_manifest(self) -> None:
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        tmp_path.write_text(json.dumps(self._manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.manifest_path)
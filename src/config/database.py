@@ -1,6 +1,10 @@
 import psycopg2
 import os
+import atexit
+import threading
 from contextlib import contextmanager
+from typing import Optional
+from psycopg2 import pool
 from dotenv import load_dotenv
 
 # Carrega variáveis do arquivo .env automaticamente
@@ -10,8 +14,14 @@ class DatabaseConfig:
     """
     Configuração segura do banco usando variáveis de ambiente.
     As credenciais ficam no arquivo .env (não versionado).
+
+    As conexões vêm de um pool thread-safe (ThreadedConnectionPool), criado
+    na primeira chamada de get_connection() e dimensionado por DB_POOL_MIN
+    e DB_POOL_MAX (DB_POOL_MAX=0 desativa o pool: uma conexão nova por
+    chamada). Quando todas as conexões estão em uso, get_connection()
+    aguarda até DB_POOL_TIMEOUT segundos por uma livre.
     """
-    
+
     DB_CONFIG = {
         'host': os.getenv('DB_HOST', 'localhost'),
         'database': os.getenv('DB_NAME', 'eSaudeCuritiba'),
@@ -19,7 +29,33 @@ class DatabaseConfig:
         'password': os.getenv('DB_PASSWORD', ''),
         'port': os.getenv('DB_PORT', '5432')
     }
-    
+
+    POOL_CONFIG = {
+        'minconn': int(os.getenv('DB_POOL_MIN', '1')),
+        'maxconn': int(os.getenv('DB_POOL_MAX', '8')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    }
+
+    # Parâmetros de sessão aplicados a cada conexão entregue (valor vazio = padrão do servidor)
+    SESSION_PROFILES = {
+        'default': {
+            'statement_timeout': os.getenv('DB_STATEMENT_TIMEOUT', ''),
+        },
+        # Cargas em massa: sem esperar o flush do WAL a cada commit (uma queda
+        # perde só as últimas transações, sem corromper), mais memória para
+        # ordenações/hash joins e sem limite de tempo por comando
+        'bulk': {
+            'synchronous_commit': os.getenv('DB_BULK_SYNCHRONOUS_COMMIT', 'off'),
+            'work_mem': os.getenv('DB_BULK_WORK_MEM', '256MB'),
+            'maintenance_work_mem': os.getenv('DB_BULK_MAINTENANCE_WORK_MEM', ''),
+            'statement_timeout': os.getenv('DB_BULK_STATEMENT_TIMEOUT', '0'),
+        },
+    }
+
+    _pool = None
+    _pool_slots = None  # Semáforo: limita as conexões emprestadas ao tamanho do pool
+    _pool_lock = threading.Lock()
+
     @classmethod
     def test_connection(cls):
         """Testa se as variáveis de ambiente estão configuradas"""
@@ -27,27 +63,111 @@ class DatabaseConfig:
         for key, value in cls.DB_CONFIG.items():
             if not value and key != 'port':  # port tem default
                 missing.append(key)
-        
+
         if missing:
             print(f"❌ Variáveis de ambiente faltando: {missing}")
             return False
         return True
-    
+
     @classmethod
     @contextmanager
-    def get_connection(cls):
-        """Context manager para conexões seguras com o banco"""
+    def get_connection(cls, session: Optional[str] = None):
+        """
+        Context manager para conexões seguras com o banco.
+
+        Args:
+            session: Perfil de SESSION_PROFILES aplicado à conexão
+                     (padrão: 'default'; 'bulk' para cargas em massa)
+        """
         if not cls.test_connection():
             raise ValueError("Configuração do banco incompleta!")
-        
-        conn = psycopg2.connect(**cls.DB_CONFIG)
+
+        settings = cls.SESSION_PROFILES[session or 'default']
+
+        conn = cls._acquire()
         try:
+            cls._apply_session(conn, settings)
             yield conn
             conn.commit()
         except Exception as e:
-            conn.rollback()
+            if not conn.closed:
+                conn.rollback()
             raise e
         finally:
+            cls._release(conn)
+
+    @classmethod
+    def _get_pool(cls):
+        """Cria o pool na primeira chamada (None se desativado)"""
+        if cls.POOL_CONFIG['maxconn'] <= 0:
+            return None
+
+        with cls._pool_lock:
+            if cls._pool is None:
+                minconn = min(cls.POOL_CONFIG['minconn'], cls.POOL_CONFIG['maxconn'])
+                cls._pool = pool.ThreadedConnectionPool(minconn, cls.POOL_CONFIG['maxconn'], **cls.DB_CONFIG)
+                cls._pool_slots = threading.BoundedSemaphore(cls.POOL_CONFIG['maxconn'])
+            return cls._pool
+
+    @classmethod
+    def _acquire(cls):
+        conn_pool = cls._get_pool()
+        if conn_pool is None:
+            return psycopg2.connect(**cls.DB_CONFIG)
+
+        # ThreadedConnectionPool falha na hora se esgotado; aqui a chamada aguarda
+        if not cls._pool_slots.acquire(timeout=cls.POOL_CONFIG['timeout']):
+            raise pool.PoolError(f"Nenhuma conexão livre no pool após {cls.POOL_CONFIG['timeout']}s "
+                                 f"(DB_POOL_MAX={cls.POOL_CONFIG['maxconn']})")
+        try:
+            return conn_pool.getconn()
+        except Exception:
+            cls._pool_slots.release()
+            raise
+
+    @classmethod
+    def _release(cls, conn):
+        """Devolve a conexão ao pool com a sessão limpa (ou fecha, se quebrada)"""
+        conn_pool = cls._pool
+        if conn_pool is None:
             conn.close()
+            return
+
+        try:
+            descartar = bool(conn.closed)
+            if not descartar:
+                try:
+                    # DISCARD ALL: desfaz SET, tabelas temporárias e prepared statements
+                    conn.rollback()
+                    conn.autocommit = True
+                    conn.cursor().execute("DISCARD ALL")
+                    conn.autocommit = False
+                except psycopg2.Error:
+                    descartar = True
+            conn_pool.putconn(conn, close=descartar)
+        finally:
+            cls._pool_slots.release()
+
+    @staticmethod
+    def _apply_session(conn, settings):
+        """Aplica os parâmetros de sessão e confirma (um rollback posterior não os desfaz)"""
+        settings = {nome: valor for nome, valor in settings.items() if valor != ''}
+        if not settings:
+            return
+
+        with conn.cursor() as cursor:
+            for nome, valor in settings.items():
+                cursor.execute("SELECT set_config(%s, %s, false)", (nome, str(valor)))
+        conn.commit()
+
+    @classmethod
+    def close_pool(cls):
+        """Fecha todas as conexões do pool (recriado na próxima chamada)"""
+        with cls._pool_lock:
+            if cls._pool is not None:
+                cls._pool.closeall()
+                cls._pool = None
+                cls._pool_slots = None
+
 
-    
\ No newline at end of file
+atexit.register(DatabaseConfig.close_pool)
@@ -0,0 +1,413 @@
+"""
+Definições do dataset de saúde (e-Saúde Curitiba) compartilhadas entre as etapas do pipeline.
+"""
+import sys
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+class ColumnSelector:
+    """
+    Seletor de colunas para o usecols do pd.read_csv.
+
+    Aceita apenas as colunas informadas e ignora as que não existem no
+    arquivo (os CSVs variam, ex.: 'Municício'/'Município'). É uma classe de
+    módulo (e não um lambda) para poder ser enviada aos workers do pool de
+    processos, e seu repr é estável para entrar na chave do cache de staging.
+    """
+
+    def __init__(self, columns):
+        self.columns = frozenset(columns)
+
+    def __call__(self, column: str) -> bool:
+        return column in self.columns
+
+    def __repr__(self):
+        return f"ColumnSelector({sorted(self.columns)})"
+
+
+# ---------------------------------------------------------------------------
+# Schema de tipos do dataset de saúde
+# ---------------------------------------------------------------------------
+
+# Códigos: texto (podem conter zeros à esquerda)
+COLUNAS_CODIGO = [
+    'Código da Unidade',
+    'Código do Procedimento',
+    'Código do CBO',
+    'Código do CID',
+    'CID do Internamento',
+    'cod_usuario',
+    'cod_profissional',
+]
+
+# Textos de baixa cardinalidade repetidos milhões de vezes: category
+COLUNAS_CATEGORICAS = [
+    'Sexo', 'Município', 'Municício', 'Bairro', 'Nacionalidade',
+    'Descrição da Unidade', 'Código do Tipo de Unidade', 'Tipo de Unidade',
+    'Descrição do Procedimento', 'Descrição do CBO', 'Descrição do CID',
+    'Solicitação de Exames', 'Encaminhamento para Atendimento Especialista',
+    'Desencadeou Internamento', 'Estabelecimento Solicitante', 'Estabelecimento Destino',
+    'Tratamento no Domicílio', 'Abastecimento', 'Energia Elétrica', 'Tipo de Habitação',
+    'Destino Lixo', 'Fezes/Urina', 'Em Caso de Doença', 'Grupo Comunitário',
+    'Meio de Comunicacao', 'Meio de Transporte',
+]
+
+# Quantidades: inteiros pequenos anuláveis (convertidos no transform)
+COLUNAS_QUANTIDADE = {
+    'Qtde Prescrita Farmácia Curitibana': 'Int32',
+    'Qtde Dispensada Farmácia Curitibana': 'Int32',
+    'Qtde de Medicamento Não Padronizado': 'Int32',
+    'Cômodos': 'Int16',
+}
+
+# Colunas derivadas no transform: categorias fixas
+CATEGORIAS_DERIVADAS = {
+    'morador_curitiba_rm': ['Curitiba', 'Região Metropolitana'],
+    'periodo_dia': ['Madrugada', 'Manhã', 'Tarde', 'Noite'],
+    'faixa_etaria': ['Criança', 'Adolescente', 'Adulto', 'Idoso'],
+}
+
+
+# Códigos em texto anulável: string do Arrow (buffers contíguos, NA nativo)
+# quando o pyarrow está disponível; senão o StringDtype padrão do pandas
+try:
+    import pyarrow  # noqa: F401
+    TIPO_CODIGO = pd.StringDtype('pyarrow')
+except ImportError:
+    TIPO_CODIGO = pd.StringDtype()
+
+
+def read_dtype_spec():
+    """dtype para o pd.read_csv: códigos como texto anulável e colunas categóricas como category"""
+    spec = {col: TIPO_CODIGO for col in COLUNAS_CODIGO}
+    spec.update({col: 'category' for col in COLUNAS_CATEGORICAS})
+    return spec
+
+
+# Tipos inteiros anuláveis, do menor para o maior
+TIPOS_INTEIROS = ['Int16', 'Int32', 'Int64']
+
+
+def fit_int_dtype(numerico, dtype: str) -> str:
+    """Menor tipo inteiro, a partir de dtype, que comporta os valores (alarga em vez de perder valores)"""
+    validos = numerico.dropna()
+    for candidato in TIPOS_INTEIROS[TIPOS_INTEIROS.index(dtype):]:
+        info = np.iinfo(candidato.lower())
+        if validos.empty or (validos.min() >= info.min and validos.max() <= info.max):
+            return candidato
+    return TIPOS_INTEIROS[-1]
+
+
+def to_small_int(serie, dtype: str):
+    """
+    Converte para inteiro pequeno anulável, truncando a parte fracionária
+    (como o astype(int) original). Valores fora da faixa de dtype alargam
+    o tipo (Int32, Int64) em vez de virar NA; só o que não cabe nem em
+    Int64 (ou não é número) vira NA.
+    """
+    numerico = pd.to_numeric(serie, errors='coerce')
+    if pd.api.types.is_float_dtype(numerico.dtype):
+        cabe = np.isfinite(numerico) & (numerico >= -2.0**63) & (numerico < 2.0**63)
+        numerico = np.trunc(numerico).where(cabe)
+    return numerico.astype(fit_int_dtype(numerico, dtype))
+
+
+def to_user_code(serie):
+    """
+    Normaliza cod_usuario para a chave de dim_perfil_paciente.codigo_usuario
+    (INTEGER): texto só com dígitos (sinal e espaços nas pontas aceitos,
+    '007' -> 7) ou número inteiro. '12.0', '1e3', vazio e valores fora da
+    faixa do INTEGER viram NA. É a regra única do DimensionLoader e do
+    FactLoader (e a do reprocessamento de rejeitos em SQL).
+    """
+    if pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype):
+        numerico = serie.astype('float64')
+        numerico = numerico.where(numerico % 1 == 0)
+    else:
+        texto = serie.astype('string').str.strip()
+        numerico = pd.to_numeric(texto.where(texto.str.fullmatch(r'[+-]?[0-9]+')), errors='coerce').astype('float64')
+    cabe = (numerico >= -2.0**31) & (numerico < 2.0**31)
+    return numerico.where(cabe).astype('Int64')
+
+
+def fillna_categorical_safe(serie, valor):
+    """fillna que também funciona em colunas category (inclui o valor nas categorias)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype) and valor not in serie.cat.categories:
+        serie = serie.cat.add_categories([valor])
+    return serie.fillna(valor)
+
+
+def concat_preserving_categories(frames):
+    """
+    pd.concat que preserva colunas category.
+
+    O concat comum converte para object as colunas categóricas cujas
+    categorias diferem entre os frames (ex.: um CSV por mês); aqui as
+    categorias são unificadas antes.
+    """
+    frames = [f for f in frames if f is not None]
+    if len(frames) <= 1:
+        return pd.concat(frames, ignore_index=True)
+
+    categoricas = [
+        col for col, dtype in frames[0].dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+        and all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames)
+    ]
+
+    unificados = [f.copy(deep=False) for f in frames]
+    for col in categoricas:
+        categorias = union_categoricals([f[col] for f in frames]).categories
+        for f in unificados:
+            f[col] = f[col].cat.set_categories(categorias)
+
+    return pd.concat(unificados, ignore_index=True)
+
+
+def memory_report(df):
+    """
+    Memória do frame e estimativa de quanto ocuparia sem o schema compacto
+    (colunas category como object e inteiros pequenos como int64).
+
+    Returns:
+        Tupla (bytes_atuais, bytes_sem_schema)
+    """
+    atual = int(df.memory_usage(deep=True, index=False).sum())
+    sem_schema = atual
+
+    for col, dtype in df.dtypes.items():
+        serie = df[col]
+        if isinstance(dtype, pd.CategoricalDtype):
+            contagens = serie.value_counts(sort=False, dropna=True)
+            tamanhos = np.array([sys.getsizeof(c) for c in contagens.index], dtype=np.int64)
+            # object: 1 ponteiro por linha + 1 objeto Python por valor (NaN = float)
+            equivalente = 8 * len(serie) + int((contagens.to_numpy() * tamanhos).sum())
+            equivalente += int(serie.isna().sum()) * sys.getsizeof(np.nan)
+        elif dtype.kind in 'iu' and dtype.itemsize < 8:
+            equivalente = 8 * len(serie)
+        else:
+            continue
+        sem_schema += equivalente - int(serie.memory_usage(deep=True, index=False))
+
+    return atual, sem_schema
+
+
+# ---------------------------------------------------------------------------
+# Datas no formato do e-Saúde: 'dd/mm/aaaa HH:MM:SS'
+# ---------------------------------------------------------------------------
+
+FORMATO_DATA = '%d/%m/%Y %H:%M:%S'
+
+# Posições fixas de cada campo em 'dd/mm/aaaa HH:MM:SS' (19 caracteres)
+_POSICOES_DIGITOS = [0, 1, 3, 4, 6, 7, 8, 9, 11, 12, 14, 15, 17, 18]
+_SEPARADORES = {2: '/', 5: '/', 10: ' ', 13: ':', 16: ':'}
+
+
+def parse_esaude_datetime(serie):
+    """
+    Converte datas 'dd/mm/aaaa HH:MM:SS' para datetime64, com errors='coerce'.
+
+    Os valores são fatorados e só os únicos são convertidos, por fatiamento
+    em posições fixas sobre uma matriz de bytes (as datas de nascimento se
+    repetem muito e os atendimentos se concentram em poucos horários). Os
+    únicos fora do formato fixo (ex.: '1/2/2024 8:00:00') caem no
+    pd.to_datetime, então o resultado é o mesmo do
+    pd.to_datetime(format=FORMATO_DATA, errors='coerce').
+
+    Returns:
+        Tupla (Series datetime64[ns], número de valores não nulos inválidos)
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, 0
+
+    codigos, unicos = pd.factorize(serie)
+    unicos = np.asarray(unicos, dtype=object).astype(str)
+
+    convertidos = _parse_fixed_offsets(unicos)
+
+    # Fora do formato fixo: conversão padrão, só para esses únicos
+    falhas = np.isnat(convertidos)
+    if falhas.any():
+        convertidos[falhas] = pd.to_datetime(
+            pd.Series(unicos[falhas]), format=FORMATO_DATA, errors='coerce'
+        ).to_numpy(dtype='datetime64[ns]')
+
+    # Broadcast de volta: código -1 (nulo) aponta para o NaT final
+    convertidos = np.append(convertidos, np.datetime64('NaT', 'ns'))
+    resultado = pd.Series(convertidos[codigos], index=serie.index, name=serie.name)
+
+    # Inválidos: valores não nulos que viraram NaT (contados pelos únicos)
+    ocorrencias = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+    n_invalidos = int(ocorrencias[np.isnat(convertidos[:-1])].sum())
+    return resultado, n_invalidos
+
+
+def _parse_fixed_offsets(valores):
+    """Converte strings de 19 caracteres no formato fixo; o resto vira NaT"""
+    n = len(valores)
+    resultado = np.full(n, np.datetime64('NaT', 'ns'))
+    if n == 0:
+        return resultado
+
+    candidatos = np.char.str_len(valores) == 19
+    if not candidatos.any():
+        return resultado
+
+    # Matriz de code points (UTF-32 do NumPy): uma linha por valor, uma coluna por caractere
+    matriz = valores[candidatos].astype('U19').view(np.uint32).reshape(-1, 19)
+
+    digitos = matriz[:, _POSICOES_DIGITOS].astype(np.int64) - ord('0')
+    validos = ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+    for pos, sep in _SEPARADORES.items():
+        validos &= matriz[:, pos] == ord(sep)
+
+    d = digitos
+    dia = d[:, 0] * 10 + d[:, 1]
+    mes = d[:, 2] * 10 + d[:, 3]
+    ano = d[:, 4] * 1000 + d[:, 5] * 100 + d[:, 6] * 10 + d[:, 7]
+    hora = d[:, 8] * 10 + d[:, 9]
+    minuto = d[:, 10] * 10 + d[:, 11]
+    segundo = d[:, 12] * 10 + d[:, 13]
+
+    # Limites do datetime64[ns] (1677-09-21 a 2262-04-11): anos extremos ficam para o fallback
+    validos &= (mes >= 1) & (mes <= 12) & (dia >= 1) & (dia <= 31)
+    validos &= (hora <= 23) & (minuto <= 59) & (segundo <= 59)
+    validos &= (ano >= 1678) & (ano <= 2261)
+
+    meses = (ano - 1970) * 12 + (mes - 1)
+    meses = np.where(validos, meses, 0).astype('datetime64[M]')
+    dias = meses.astype('datetime64[D]') + np.where(validos, dia - 1, 0)
+
+    # Dia além do fim do mês (ex.: 31/02) muda o mês: inválido
+    validos &= dias.astype('datetime64[M]') == meses
+
+    segundos = hora * 3600 + minuto * 60 + segundo
+    datas = dias.astype('datetime64[ns]') + segundos.astype('timedelta64[s]')
+
+    parciais = np.full(len(matriz), np.datetime64('NaT', 'ns'))
+    parciais[validos] = datas[validos]
+    resultado[candidatos] = parciais
+    return resultado
+
+
+# ---------------------------------------------------------------------------
+# Chave natural do atendimento
+# ---------------------------------------------------------------------------
+
+# Componentes da chave natural (data + unidade + usuário + procedimento)
+COLUNAS_CHAVE_NATURAL = ['Data do Atendimento', 'Código da Unidade', 'cod_usuario', 'Código do Procedimento']
+
+_FNV_PRIMO = np.uint64(0x100000001B3)
+_FNV_BASE = np.uint64(0xCBF29CE484222325)
+
+
+def hash_columns(df, colunas):
+    """
+    Hash estável de 64 bits de um conjunto de colunas, linha a linha (vetorizado).
+
+    Cada coluna é hasheada com pd.util.hash_array (SipHash com chave fixa:
+    o mesmo valor gera o mesmo hash em qualquer execução) e os hashes são
+    combinados em sequência (FNV-1a sobre palavras de 64 bits). Datas entram
+    como inteiro em ns, números (inclusive Int64 com nulos) como float64 e o
+    resto como objeto, de modo que uma mesma linha tem o mesmo hash seja a
+    coluna category, texto ou object.
+
+    Returns:
+        Array int64 (cabe em BIGINT) alinhado com as linhas de df
+    """
+    combinado = np.full(len(df), _FNV_BASE, dtype=np.uint64)
+
+    for col in colunas:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            valores = serie.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            valores = np.asarray(serie.astype(object), dtype=object)
+
+        combinado ^= pd.util.hash_array(valores)
+        combinado *= _FNV_PRIMO  # overflow em uint64 = módulo 2**64
+
+    return combinado.view(np.int64)
+
+
+# Data na chave natural em texto (o mesmo formato do strftime do DuckDB)
+FORMATO_CHAVE_DATA = '%Y-%m-%d %H:%M:%S'
+
+
+def natural_key_text(df):
+    """
+    Chave natural em texto: data + unidade + usuário + procedimento,
+    separados por '_' (código nulo entra como 'None'). A data sai sempre
+    como 'aaaa-mm-dd HH:MM:SS' (data nula como 'NaT'), como no DuckDB: o
+    astype(str) omite a hora quando todo o chunk cai à meia-noite.
+    """
+    def codigo(col):
+        return df[col].astype(TIPO_CODIGO).fillna('None')
+
+    atendimento = df['Data do Atendimento']
+    if pd.api.types.is_datetime64_any_dtype(atendimento):
+        data = atendimento.dt.strftime(FORMATO_CHAVE_DATA).astype(TIPO_CODIGO).fillna('NaT')
+    else:
+        data = atendimento.astype(str).astype(TIPO_CODIGO)
+
+    return (
+        data +
+        '_' + codigo('Código da Unidade') +
+        '_' + codigo('cod_usuario') +
+        '_' + codigo('Código do Procedimento')
+    )
+
+
+def parse_natural_key(chaves):
+    """
+    Inverso de natural_key_text: componentes da chave natural com os mesmos
+    tipos do transform (data como datetime, códigos como texto anulável).
+    """
+    partes = pd.Series(chaves, dtype=object).str.split('_', n=3, expand=True).reindex(columns=range(4))
+    df = pd.DataFrame({'Data do Atendimento': pd.to_datetime(partes[0], format='ISO8601', errors='coerce')})
+    for i, col in enumerate(COLUNAS_CHAVE_NATURAL[1:], start=1):
+        df[col] = partes[i].where(partes[i] != 'None').astype(TIPO_CODIGO)
+    return df
+
+
+def hash_natural_key(df):
+    """
+    Hash de 64 bits dos componentes da chave natural (ver hash_columns).
+
+    Códigos entram como texto, então '0012' e '12' geram hashes
+    diferentes, como na chave em texto.
+    """
+    return hash_columns(df, COLUNAS_CHAVE_NATURAL)
+
+
+def apply_transform_schema(df):
+    """
+    Aplica o schema compacto a um frame transformado fora do pandas (ex.:
+    vindo do DuckDB como Arrow), com os mesmos tipos do transform() pandas.
+    """
+    for col in COLUNAS_CODIGO + ['chave_natural']:
+        if col in df.columns:
+            df[col] = df[col].astype(TIPO_CODIGO)
+
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    for col, dtype in COLUNAS_QUANTIDADE.items():
+        if col in df.columns:
+            df[col] = df[col].astype(fit_int_dtype(df[col], dtype))
+
+    if 'diff_prescrito_dispensado' in df.columns:
+        df['diff_prescrito_dispensado'] = df['diff_prescrito_dispensado'].astype('Int32')
+    if 'gerou_internamento' in df.columns:
+        df['gerou_internamento'] = df['gerou_internamento'].astype('int8')
+
+    for col, categorias in CATEGORIAS_DERIVADAS.items():
+        if col in df.columns:
+            df[col] = df[col].astype(pd.CategoricalDtype(categorias))
+
+    return df
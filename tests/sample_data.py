@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+
+def create_sample_raw_dataframe(n_rows: int = 200, seed: int = 42) -> pd.DataFrame:
+    """
+    Cria um DataFrame no layout bruto dos CSVs do e-Saúde (tudo como texto),
+    com nulos, datas inválidas e chaves naturais repetidas.
+    """
+    rng = np.random.default_rng(seed)
+
+    def escolher(valores):
+        return rng.choice(np.array(valores, dtype=object), n_rows)
+
+    atendimento = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60 * 24 * 3600, n_rows), unit='s')
+    nascimento = pd.Timestamp('1940-01-01') + pd.to_timedelta(rng.integers(0, 80 * 365, n_rows), unit='D')
+
+    df = pd.DataFrame({
+        'Data do Atendimento': atendimento.strftime('%d/%m/%Y %H:%M:%S'),
+        'Data de Nascimento': nascimento.strftime('%d/%m/%Y 00:00:00'),
+        'Sexo': escolher(['M', 'F', None]),
+        'Código da Unidade': escolher(['0001', '0002', '0103']),
+        'Descrição da Unidade': escolher(['UMS Centro']),
+        'Código do Tipo de Unidade': escolher(['4']),
+        'Tipo de Unidade': escolher(['UBS', 'UPA']),
+        'Código do Procedimento': escolher(['0301010072', '0301060037']),
+        'Descrição do Procedimento': escolher(['Consulta Medica']),
+        'Código do CBO': escolher(['225125', '223505']),
+        'Descrição do CBO': escolher(['Medico Clinico']),
+        'Código do CID': escolher(['J06', 'A09', None]),
+        'Descrição do CID': escolher(['Infeccao']),
+        'Solicitação de Exames': escolher(['Sim', 'Não', None]),
+        'Qtde Prescrita Farmácia Curitibana': escolher(['1', '2', None]),
+        'Qtde Dispensada Farmácia Curitibana': escolher(['0', '1', None]),
+        'Qtde de Medicamento Não Padronizado': escolher(['0', 'x']),
+        'Encaminhamento para Atendimento Especialista': escolher(['Sim', 'Não']),
+        'Área de Atuação': escolher(['Saude da Familia']),
+        'Desencadeou Internamento': escolher(['Sim', 'Não', None]),
+        'Data do Internamento': escolher([None]),
+        'Estabelecimento Solicitante': escolher([None, 'UMS Centro']),
+        'Estabelecimento Destino': escolher([None]),
+        'CID do Internamento': escolher([None, 'J18']),
+        'Tratamento no Domicílio': escolher(['Filtracao', None]),
+        'Abastecimento': escolher(['Rede Publica', None]),
+        'Energia Elétrica': escolher(['Sim', 'Não']),
+        'Tipo de Habitação': escolher(['Tijolo']),
+        'Destino Lixo': escolher(['Coletado']),
+        'Fezes/Urina': escolher(['Rede de Esgoto']),
+        'Cômodos': escolher(['3', '5', None]),
+        'Em Caso de Doença': escolher(['Unidade de Saude']),
+        'Grupo Comunitário': escolher([None]),
+        'Meio de Comunicacao': escolher(['Televisao']),
+        'Meio de Transporte': escolher(['Onibus']),
+        'Municício': escolher(['Curitiba', 'Colombo', None]),
+        'Bairro': escolher(['Centro', 'Boqueirao']),
+        'Nacionalidade': escolher(['Brasileira']),
+        'cod_usuario': escolher(['00123', '456', '789']),
+        'origem_usuario': escolher(['1', '2']),
+        'residente': escolher(['1']),
+        'cod_profissional': escolher(['0042']),
+    })
+
+    # Datas inválidas e linhas repetidas (mesma chave natural)
+    df.loc[3, 'Data do Atendimento'] = '31/02/2024 10:00:00'
+    df.loc[5, 'Data de Nascimento'] = None
+    df.loc[n_rows - 1] = df.loc[0]
+    df.loc[n_rows - 2] = df.loc[n_rows // 2]
+
+    return df
+
+
+def write_sample_csv(path: Path, n_rows: int = 200, seed: int = 42) -> Path:
+    """Grava o DataFrame de exemplo no formato dos CSVs do e-Saúde (';' e latin-1)"""
+    df = create_sample_raw_dataframe(n_rows, seed)
+    df.to_csv(path, sep=';', encoding='latin-1', index=False)
+    return path
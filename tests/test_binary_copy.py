@@ -0,0 +1,186 @@
+import pytest
+import struct
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.loaders.binary_copy import BinaryCopyStream, CABECALHO
+from scripts.loaders.copy_utils import copy_dataframe
+
+
+TIPOS = {
+    'unidade_id': 'integer',
+    'gerou_internamento': 'smallint',
+    'chave_hash': 'bigint',
+    'data_atendimento': 'timestamp without time zone',
+    'periodo_dia': 'character varying(10)',
+}
+
+
+def decode(dados: bytes, tipos):
+    """Leitor de referência do formato binário do COPY (linha a linha)"""
+    assert dados.startswith(CABECALHO)
+    pos = len(CABECALHO)
+    formatos = {'integer': '>i', 'smallint': '>h', 'bigint': '>q', 'timestamp without time zone': '>q'}
+    linhas = []
+
+    while True:
+        (n_campos,) = struct.unpack_from('>h', dados, pos)
+        pos += 2
+        if n_campos == -1:
+            break
+        linha = []
+        for tipo in tipos:
+            (tamanho,) = struct.unpack_from('>i', dados, pos)
+            pos += 4
+            if tamanho == -1:
+                linha.append(None)
+                continue
+            campo = dados[pos:pos + tamanho]
+            pos += tamanho
+            if tipo in formatos:
+                (valor,) = struct.unpack(formatos[tipo], campo)
+                if tipo.startswith('timestamp'):
+                    valor = pd.Timestamp('2000-01-01') + pd.Timedelta(microseconds=valor)
+                linha.append(valor)
+            else:
+                linha.append(campo.decode('utf-8'))
+        linhas.append(linha)
+
+    assert pos == len(dados)
+    return linhas
+
+
+def create_frame():
+    return pd.DataFrame({
+        'unidade_id': pd.array([1, 2, None, 4], dtype='Int64'),
+        'gerou_internamento': pd.array([0, 1, 1, None], dtype='Int64'),
+        'chave_hash': pd.array([2**62 + 1, -5, None, -(2**63) + 7], dtype='Int64'),
+        'data_atendimento': pd.to_datetime(['2024-03-01 08:30:00.000123', '1999-12-31 23:59:59.000000', None,
+                                            '2024-03-02 12:00:00.000000']),
+        'periodo_dia': ['Manhã', None, 'Manhã', 'Tarde'],
+    })
+
+
+def read_all(stream, size=7):
+    partes = []
+    while True:
+        parte = stream.read(size)
+        if not parte:
+            return b''.join(partes)
+        partes.append(parte)
+
+
+class TestBinaryCopy:
+    """Testes do codificador do COPY binário"""
+
+    def test_roundtrip(self):
+        """Valores, nulos e textos UTF-8 batem com o leitor de referência, em blocos pequenos"""
+        df = create_frame()
+        dados = read_all(BinaryCopyStream(df, TIPOS, block_size=3))
+
+        esperado = [
+            [1, 0, 2**62 + 1, pd.Timestamp('2024-03-01 08:30:00.000123'), 'Manhã'],
+            [2, 1, -5, pd.Timestamp('1999-12-31 23:59:59'), None],
+            [None, 1, None, None, 'Manhã'],
+            [4, None, -(2**63) + 7, pd.Timestamp('2024-03-02 12:00:00'), 'Tarde'],
+        ]
+        assert decode(dados, TIPOS.values()) == esperado
+
+    def test_reuses_buffer(self):
+        """O buffer do bloco é reaproveitado (cresce só quando necessário)"""
+        df = pd.DataFrame({'unidade_id': np.arange(1000, dtype='int64')})
+        stream = BinaryCopyStream(df, {'unidade_id': 'integer'}, block_size=100)
+
+        stream.read(len(CABECALHO))
+        stream.read()
+        buffer = stream._buffer
+        read_all(stream, size=1 << 20)
+
+        assert stream._buffer is buffer
+        assert len(buffer) == 100 * (2 + 4 + 4)
+
+    def test_unsupported_type_falls_back_to_csv(self):
+        """Com uma coluna NUMERIC, copy_dataframe volta ao COPY em CSV"""
+        class FakeCursor:
+            def __init__(self):
+                self.copias = []
+
+            def copy_expert(self, sql, arquivo, size=8192):
+                self.copias.append((sql, arquivo.read()))
+
+        cursor = FakeCursor()
+        df = pd.DataFrame({'codigo': ['A'], 'valor': [1.5]})
+        copy_dataframe(cursor, df, 'tmp', ['codigo', 'valor'], binary=True,
+                       types={'codigo': 'text', 'valor': 'numeric'})
+
+        (sql, conteudo), = cursor.copias
+        assert 'FORMAT csv' in sql
+        assert conteudo.strip() == 'A,1.5'
+
+    def test_copy_dataframe_binary(self):
+        """copy_dataframe(binary=True) envia um único COPY binário com os tipos do catálogo"""
+        class FakeCursor:
+            def __init__(self):
+                self.copias = []
+
+            def execute(self, sql, params=None):
+                self._result = list(TIPOS.items())
+
+            def fetchall(self):
+                return self._result
+
+            def copy_expert(self, sql, arquivo, size=8192):
+                self.copias.append((sql, read_all(arquivo, size)))
+
+        cursor = FakeCursor()
+        df = create_frame()
+        copy_dataframe(cursor, df, 'staging', list(TIPOS), binary=True, block_size=2)
+
+        (sql, dados), = cursor.copias
+        assert 'FORMAT binary' in sql
+        assert len(decode(dados, TIPOS.values())) == len(df)
+
+    def test_integer_out_of_range_is_refused(self):
+        """Valor fora da faixa do INTEGER: erro antes do COPY, em vez de dar a volta"""
+        for serie in (pd.Series([1, 3_000_000_000], dtype='Int64'), pd.Series([1.0, 3e9]),
+                      pd.Series([1, 3_000_000_000], dtype=object)):
+            with pytest.raises(ValueError, match='integer'):
+                BinaryCopyStream(pd.DataFrame({'unidade_id': serie}), {'unidade_id': 'integer'})
+
+        df = pd.DataFrame({'gerou_internamento': pd.array([40_000], dtype='Int64')})
+        with pytest.raises(ValueError, match='smallint'):
+            BinaryCopyStream(df, {'gerou_internamento': 'smallint'})
+
+        df = pd.DataFrame({'chave_hash': np.array([2**63], dtype='uint64')})
+        with pytest.raises(ValueError, match='bigint'):
+            BinaryCopyStream(df, {'chave_hash': 'bigint'})
+
+    def test_fractional_float_is_refused(self):
+        """Float com parte fracionária não é truncado; float inteiro (com NaN) é aceito"""
+        df = pd.DataFrame({'unidade_id': [1.0, 2.7]})
+        with pytest.raises(ValueError, match='2.7'):
+            BinaryCopyStream(df, {'unidade_id': 'integer'})
+
+        df = pd.DataFrame({'unidade_id': [1.0, np.nan, 2**31 - 1]})
+        dados = read_all(BinaryCopyStream(df, {'unidade_id': 'integer'}))
+        assert decode(dados, ['integer']) == [[1], [None], [2**31 - 1]]
+
+    def test_invalid_values_abort_before_copy(self):
+        """copy_dataframe(binary=True) não abre o COPY com valores inválidos"""
+        class FakeCursor:
+            def __init__(self):
+                self.copias = []
+
+            def copy_expert(self, sql, arquivo, size=8192):
+                self.copias.append(sql)
+
+        cursor = FakeCursor()
+        df = pd.DataFrame({'unidade_id': [3_000_000_000]})
+        with pytest.raises(ValueError):
+            copy_dataframe(cursor, df, 'tmp', ['unidade_id'], binary=True, types={'unidade_id': 'integer'})
+        assert cursor.copias == []
@@ -0,0 +1,125 @@
+import threading
+import pytest
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from psycopg2 import pool
+from src.config.database import DatabaseConfig
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.executados.append((sql, params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.executados = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class FakePool:
+    """Pool sem banco: entrega FakeConnection e registra as devoluções"""
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.livres = []
+        self.devolvidas = []
+
+    def getconn(self):
+        return self.livres.pop() if self.livres else FakeConnection()
+
+    def putconn(self, conn, close=False):
+        self.devolvidas.append((conn, close))
+        if not close:
+            self.livres.append(conn)
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    DatabaseConfig.close_pool()
+    monkeypatch.setattr(pool, 'ThreadedConnectionPool', FakePool)
+    monkeypatch.setitem(DatabaseConfig.DB_CONFIG, 'password', 'teste')
+    monkeypatch.setattr(DatabaseConfig, 'POOL_CONFIG', {'minconn': 1, 'maxconn': 2, 'timeout': 0.2})
+    yield
+    DatabaseConfig.close_pool()
+
+
+class TestConnectionPool:
+    """Testes do pool de conexões do DatabaseConfig"""
+
+    def test_connection_is_reused_and_reset(self, fake_pool):
+        """A conexão volta ao pool com DISCARD ALL e é reaproveitada"""
+        with DatabaseConfig.get_connection() as primeira:
+            pass
+        with DatabaseConfig.get_connection() as segunda:
+            pass
+
+        assert primeira is segunda
+        assert ('DISCARD ALL', None) in primeira.executados
+        assert not primeira.autocommit
+
+    def test_bulk_session_settings(self, fake_pool):
+        """O perfil 'bulk' aplica os parâmetros de sessão com set_config"""
+        with DatabaseConfig.get_connection(session='bulk') as conn:
+            parametros = [params for sql, params in conn.executados if 'set_config' in sql]
+
+        assert ('synchronous_commit', 'off') in parametros
+        assert any(nome == 'work_mem' for nome, _ in parametros)
+
+    def test_waits_for_free_connection(self, fake_pool):
+        """Com o pool esgotado, get_connection aguarda e falha após o timeout"""
+        with DatabaseConfig.get_connection(), DatabaseConfig.get_connection():
+            with pytest.raises(pool.PoolError):
+                with DatabaseConfig.get_connection():
+                    pass
+
+        # Liberadas, voltam a ser entregues
+        with DatabaseConfig.get_connection():
+            pass
+
+    def test_thread_safe_checkout(self, fake_pool):
+        """Várias threads compartilham o pool sem exceder o tamanho máximo"""
+        em_uso, maximo, lock = [0], [0], threading.Lock()
+
+        def trabalho():
+            with DatabaseConfig.get_connection():
+                with lock:
+                    em_uso[0] += 1
+                    maximo[0] = max(maximo[0], em_uso[0])
+                with lock:
+                    em_uso[0] -= 1
+
+        DatabaseConfig.POOL_CONFIG['timeout'] = 5
+        threads = [threading.Thread(target=trabalho) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert maximo[0] <= 2
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.data_profiler import DataProfiler
+from scripts.etl_pipeline import HealthETLPipeline
+from tests.sample_data import create_sample_raw_dataframe, write_sample_csv
+
+
+class TestDataProfiler:
+    """Testes do perfil de dados em passada única"""
+
+    def test_profile_matches_full_scans(self):
+        """Nulos e zeros à esquerda iguais aos das varreduras completas"""
+        df = create_sample_raw_dataframe(500)
+
+        perfil = DataProfiler().profile(df)
+
+        assert not perfil['amostrado']
+        assert DataProfiler.total_nulls(perfil) == int(df.isnull().sum().sum())
+        for col in df.columns:
+            assert perfil['colunas'][col]['nulos'] == int(df[col].isna().sum())
+        assert perfil['colunas']['Código da Unidade']['zeros_esquerda']
+        assert not perfil['colunas']['Código do CBO']['zeros_esquerda']
+        assert perfil['colunas']['cod_usuario']['distintos'] == df['cod_usuario'].nunique()
+
+    def test_sampled_profile_estimates_counts(self):
+        """No modo amostrado as contagens são extrapoladas para o frame inteiro"""
+        df = pd.DataFrame({'Sexo': np.where(np.arange(10_000) % 4 == 0, None, 'F')})
+
+        perfil = DataProfiler(sample_size=2_000).profile(df)
+
+        assert perfil['amostrado']
+        assert perfil['linhas_perfiladas'] == 2_000
+        assert abs(perfil['colunas']['Sexo']['nulos'] - 2_500) < 250
+
+    def test_transform_stores_profile_in_stats(self, tmp_path):
+        """O transform guarda o perfil em stats e preenche os nulos críticos"""
+        write_sample_csv(tmp_path / 'amostra.csv')
+
+        pipeline = HealthETLPipeline(profile_sample_size=50)
+        pipeline.raw_data_path = tmp_path
+        pipeline.extract()
+        pipeline.transform()
+
+        assert pipeline.stats['perfil_extract']['colunas']['Código da Unidade']['zeros_esquerda']
+        assert pipeline.stats['perfil_transform']['amostrado']
+        assert pipeline.df['Sexo'].notna().all()
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.saude import FORMATO_DATA, parse_esaude_datetime
+
+
+class TestDateParser:
+    """O parser de formato fixo deve reproduzir pd.to_datetime(errors='coerce')"""
+
+    def test_matches_to_datetime(self):
+        valores = pd.Series([
+            '01/01/2024 00:00:00', '29/02/2024 10:00:00', '29/02/2023 10:00:00',
+            '31/02/2024 10:00:00', '1/2/2024 8:00:00', '01/13/2024 00:00:00',
+            '01/01/2024 24:00:00', '31/12/1600 00:00:00', '01/01/1900 00:00:00',
+            ' 01/01/2024 00:00:00', '01-01-2024 00:00:00', 'abc', '', None, np.nan,
+            '01/01/2024 00:00:00', '15/03/2024 23:59:59',
+        ], dtype=object, index=range(100, 117))
+
+        obtido, n_invalidos = parse_esaude_datetime(valores)
+        esperado = pd.to_datetime(valores, format=FORMATO_DATA, errors='coerce')
+
+        pd.testing.assert_series_equal(obtido, esperado)
+        assert n_invalidos == int((esperado.isna() & valores.notna()).sum())
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from benchmarks.bench_derived_columns import create_frame, faixa_etaria_apply, periodo_dia_apply
+
+
+class TestDerivedColumns:
+    """As versões vetorizadas devem reproduzir exatamente as versões com .apply"""
+
+    def test_periodo_dia_matches_apply(self):
+        datas = pd.Series(pd.to_datetime([
+            '2024-01-01 00:00', '2024-01-01 05:59', '2024-01-01 06:00', '2024-01-01 11:59',
+            '2024-01-01 12:00', '2024-01-01 17:59', '2024-01-01 18:00', '2024-01-01 23:59', None,
+        ]))
+        datas = pd.concat([datas, create_frame(1000)['data']], ignore_index=True)
+
+        obtido = HealthETLPipeline.periodo_dia(datas)
+
+        assert obtido.iloc[8] == 'Madrugada'  # NaT
+        assert obtido.astype(object).equals(periodo_dia_apply(datas))
+
+    def test_faixa_etaria_matches_apply(self):
+        idades = pd.Series([-1, 0, 12, 13, 19, 20, 59, 60, 120, np.nan], dtype='float64')
+        idades = pd.concat([idades, create_frame(1000)['idade']], ignore_index=True)
+
+        obtido = HealthETLPipeline.faixa_etaria(idades)
+
+        assert obtido.iloc[9] == 'Idoso'  # NaN
+        assert obtido.astype(object).equals(faixa_etaria_apply(idades))
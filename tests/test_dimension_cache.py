@@ -0,0 +1,81 @@
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.loaders.dimension_cache import DimensionKeyCache
+
+
+class FakeCursor:
+    """Cursor mínimo: responde à assinatura e ao SELECT completo de cada dimensão"""
+
+    def __init__(self, tabelas):
+        self.tabelas = tabelas
+        self.selects = []
+        self._result = []
+
+    def execute(self, sql, params=None):
+        tabela = next(t for t in self.tabelas if f"FROM {t}" in sql)
+        mapping = self.tabelas[tabela]
+        if 'count(*)' in sql:
+            self._result = [(len(mapping), max(mapping.values(), default=0), 1234)]
+        else:
+            self.selects.append(tabela)
+            self._result = list(mapping.items())
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+class FakeConn:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def create_tables():
+    return {
+        'dim_unidade': {'001': 1, '002': 2},
+        'dim_procedimento': {'0301010072': 1},
+        'dim_cid': {'NI': 1, 'J06': 2},
+        'dim_cbo': {'225125': 1},
+        'dim_perfil_paciente': {1001: 1, 7: 2},
+    }
+
+
+class TestDimensionKeyCache:
+    """Testes para o cache persistente de chaves das dimensões"""
+
+    def test_cold_then_warm_load(self, tmp_path):
+        """A segunda carga vem do disco sem o SELECT de lookup"""
+        tabelas = create_tables()
+        cache = DimensionKeyCache(tmp_path)
+
+        cursor = FakeCursor(tabelas)
+        maps = cache.load(FakeConn(cursor))
+        assert len(cursor.selects) == 5
+        assert maps['perfil'] == {1001: 1, 7: 2}
+
+        cursor = FakeCursor(tabelas)
+        maps_cache = cache.load(FakeConn(cursor))
+        assert cursor.selects == []
+        assert maps_cache == maps
+
+    def test_invalidated_when_table_changes(self, tmp_path):
+        """Nova linha na tabela muda a assinatura e força releitura"""
+        tabelas = create_tables()
+        cache = DimensionKeyCache(tmp_path)
+        cache.load(FakeConn(FakeCursor(tabelas)))
+
+        tabelas['dim_cid']['A09'] = 3
+        cursor = FakeCursor(tabelas)
+        maps = cache.load(FakeConn(cursor))
+
+        assert cursor.selects == ['dim_cid']
+        assert maps['cid']['A09'] == 3
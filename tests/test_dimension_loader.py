@@ -131,6 +131,241 @@ class TestDimensionLoader:
             print(f"❌ Erro no teste: {e}")
             raise
 
+class FakePerfilCursor:
+    """Cursor mínimo: resolve as consultas do hash-diff contra os perfis já gravados"""
+
+    def __init__(self, gravados, com_hash=True):
+        self.gravados = {codigo: (perfil_id, h) for codigo, perfil_id, h in gravados}
+        self.com_hash = com_hash  # False: banco sem scripts/05_hash_perfil.sql
+        self.candidatos = pd.DataFrame(columns=['codigo_usuario', 'hash_perfil'])
+        self.comandos = []
+        self._resultado = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.comandos.append(sql)
+        if sql.startswith('ALTER TABLE dim_perfil_paciente ADD COLUMN IF NOT EXISTS hash_perfil'):
+            self.com_hash = True
+        elif 'd.hash_perfil' in sql and not self.com_hash:
+            raise RuntimeError('column d.hash_perfil does not exist')
+        pares = zip(self.candidatos['codigo_usuario'].tolist(), self.candidatos['hash_perfil'].tolist())
+        if 'IS DISTINCT FROM' in sql:
+            # LEFT JOIN: perfil novo (sem ID) ou com hash diferente do gravado
+            self._resultado = [(c, self.gravados.get(c, (None,))[0]) for c, h in pares
+                               if self.gravados.get(c, (None, None))[1] != h]
+        elif sql.startswith('SELECT d.codigo_usuario'):
+            self._resultado = [(c, self.gravados[c][0]) for c, h in pares
+                               if c in self.gravados and self.gravados[c][1] == h]
+
+    def fetchall(self):
+        return self._resultado
+
+
+class FakePerfilConn:
+    def __init__(self, gravados, com_hash=True):
+        self._cursor = FakePerfilCursor(gravados, com_hash)
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+
+def create_perfil_dataframe():
+    """Três pacientes com os atributos de perfil (os ausentes viram NULL)"""
+    return pd.DataFrame({
+        'cod_usuario': ['1', '2', '3'],
+        'Sexo': pd.Categorical(['F', 'M', 'F']),
+        'Data de Nascimento': pd.to_datetime(['1980-01-01', '1990-05-10', '2001-12-31']),
+        'Bairro': ['Centro', 'Batel', 'Boqueirão'],
+        'Cômodos': pd.array([3, None, 5], dtype='Int16'),
+    })
+
+
+class TestPerfilHashDiff:
+    """Testes da detecção de mudanças por hash em dim_perfil_paciente"""
+
+    @pytest.fixture(autouse=True)
+    def copia(self, monkeypatch):
+        def copy_falso(cursor, df, tabela, colunas, **kwargs):
+            cursor.candidatos = df[colunas].copy()
+            return len(df)
+
+        monkeypatch.setattr('scripts.loaders.dimension_loader.copy_dataframe', copy_falso)
+
+    def load(self, loader, df, gravados, com_hash=True):
+        enviados = []
+
+        def upsert(cursor, frame, *args, **kwargs):
+            enviados.append(frame)
+            return {int(c): 100 + int(c) for c in frame['codigo_usuario']}, 0
+
+        loader._bulk_upsert = upsert
+        conn = FakePerfilConn(gravados, com_hash)
+        loader.load_perfis(df, conn)
+        self.comandos = conn.cursor().comandos
+        return pd.concat(enviados) if enviados else pd.DataFrame()
+
+    def test_only_new_and_changed_profiles_are_sent(self):
+        """Perfis com o mesmo hash não são enviados; contagens de novos/alterados/inalterados"""
+        df = create_perfil_dataframe()
+
+        primeira = DimensionLoader()
+        enviados = self.load(primeira, df, gravados=[])
+        assert primeira.stats_perfil == {'novos': 3, 'alterados': 0, 'inalterados': 0}
+        hashes = dict(zip(enviados['codigo_usuario'], enviados['hash_perfil']))
+
+        # Nova execução: paciente 2 mudou de bairro, paciente 4 é novo
+        df2 = pd.concat([df, pd.DataFrame({'cod_usuario': ['4'], 'Sexo': ['M']})], ignore_index=True)
+        df2.loc[1, 'Bairro'] = 'Portão'
+        gravados = [(c, 100 + c, h) for c, h in hashes.items()]
+
+        segunda = DimensionLoader()
+        enviados = self.load(segunda, df2, gravados)
+
+        assert sorted(enviados['codigo_usuario']) == [2, 4]
+        assert segunda.stats_perfil == {'novos': 1, 'alterados': 1, 'inalterados': 2}
+        assert segunda.dimension_maps['perfil'][1] == 101  # inalterado, ID vindo do banco
+
+        # Só os pares (código, hash) do frame vão ao banco, sem ler a dimensão inteira
+        assert not any('FROM dim_perfil_paciente' in sql.split(' JOIN ')[0] for sql in self.comandos)
+
+    def test_known_ids_skip_lookup(self):
+        """Inalterados já no mapeamento (cache): o ID não é buscado de novo"""
+        df = create_perfil_dataframe()
+        hashes = dict(zip(*[self.load(DimensionLoader(), df, gravados=[])[c] for c in ('codigo_usuario', 'hash_perfil')]))
+
+        loader = DimensionLoader()
+        loader.dimension_maps['perfil'].update({1: 101, 2: 102, 3: 103})
+        enviados = self.load(loader, df, [(c, 100 + c, h) for c, h in hashes.items()])
+
+        assert enviados.empty
+        assert loader.stats_perfil == {'novos': 0, 'alterados': 0, 'inalterados': 3}
+        assert not any(sql.startswith('SELECT d.codigo_usuario') for sql in self.comandos)
+
+    def test_missing_hash_column_is_created(self):
+        """Banco sem scripts/05_hash_perfil.sql: a coluna é criada antes do diff, uma vez por instância"""
+        loader = DimensionLoader()
+        enviados = self.load(loader, create_perfil_dataframe(), gravados=[(1, 101, None)], com_hash=False)
+
+        assert len(enviados) == 3
+        alter = [i for i, sql in enumerate(self.comandos) if sql.startswith('ALTER TABLE')]
+        diff = next(i for i, sql in enumerate(self.comandos) if 'IS DISTINCT FROM' in sql)
+        assert len(alter) == 1 and alter[0] < diff
+
+        self.load(loader, create_perfil_dataframe(), gravados=[])
+        assert not any(sql.startswith('ALTER TABLE') for sql in self.comandos)
+
+    def test_hash_ignores_column_dtype(self):
+        """Categoria ou texto, o mesmo perfil tem o mesmo hash"""
+        df = create_perfil_dataframe()
+        texto = self.load(DimensionLoader(), df, gravados=[])
+        categoria = self.load(DimensionLoader(), df.astype({'Bairro': 'category'}), gravados=[])
+
+        assert texto['hash_perfil'].tolist() == categoria['hash_perfil'].tolist()
+
+    def test_profiles_without_hash_are_resent(self):
+        """Perfis gravados antes da coluna hash_perfil (hash nulo) contam como alterados"""
+        loader = DimensionLoader()
+        enviados = self.load(loader, create_perfil_dataframe(), gravados=[(1, 101, None)])
+
+        assert len(enviados) == 3
+        assert loader.stats_perfil == {'novos': 2, 'alterados': 1, 'inalterados': 0}
+
+
+class RecordingUpsertCursor:
+    """Cursor falso do upsert: registra os comandos; count e SELECT final vêm de 'gravados'"""
+
+    def __init__(self, gravados):
+        self.gravados = gravados  # codigo -> id já na dimensão antes do upsert
+        self.comandos = []
+        self._resultado = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.comandos.append(sql)
+        if sql.startswith('SELECT count(*)'):
+            self._resultado = [(sum(c in self.gravados for c in self.lote),)]
+        elif sql.startswith('SELECT'):
+            # Após o INSERT: existentes + novos (IDs novos a partir de 100)
+            novos = [c for c in self.lote if c not in self.gravados]
+            self._resultado = list(self.gravados.items()) + [(c, 100 + i) for i, c in enumerate(novos)]
+
+    def fetchone(self):
+        return self._resultado[0]
+
+    def fetchall(self):
+        return self._resultado
+
+
+class TestBulkUpsert:
+    """Testes do upsert em massa das dimensões (temp + COPY + ON CONFLICT + SELECT)"""
+
+    @pytest.fixture
+    def copias(self, monkeypatch):
+        copias = []
+
+        def copy_falso(cursor, df, tabela, colunas, **kwargs):
+            cursor.lote = df[colunas[0]].tolist()
+            copias.append((tabela, colunas, df.copy()))
+            return len(df)
+
+        monkeypatch.setattr('scripts.loaders.dimension_loader.copy_dataframe', copy_falso)
+        return copias
+
+    def test_sql_sequence(self, copias):
+        """Temp ON COMMIT DROP, COPY, contagem, INSERT ... ON CONFLICT e um único SELECT do mapeamento"""
+        cursor = RecordingUpsertCursor(gravados={})
+        frame = pd.DataFrame({'codigo_cbo': ['A', 'B'], 'descricao_cbo': ['a', 'b']})
+
+        DimensionLoader()._bulk_upsert(cursor, frame, 'dim_cbo', 'codigo_cbo', 'cbo_id')
+
+        assert cursor.comandos == [
+            'CREATE TEMP TABLE tmp_dim_cbo ON COMMIT DROP AS SELECT codigo_cbo, descricao_cbo FROM dim_cbo WITH NO DATA',
+            'SELECT count(*) FROM dim_cbo WHERE codigo_cbo IN (SELECT codigo_cbo FROM tmp_dim_cbo)',
+            'INSERT INTO dim_cbo (codigo_cbo, descricao_cbo) SELECT codigo_cbo, descricao_cbo FROM tmp_dim_cbo '
+            'ON CONFLICT (codigo_cbo) DO NOTHING',
+            'SELECT codigo_cbo, cbo_id FROM dim_cbo WHERE codigo_cbo IN (SELECT codigo_cbo FROM tmp_dim_cbo)',
+        ]
+        (tabela, colunas, enviado), = copias
+        assert tabela == 'tmp_dim_cbo' and colunas == ['codigo_cbo', 'descricao_cbo']
+        assert enviado['codigo_cbo'].tolist() == ['A', 'B']
+
+    def test_mapping_and_existing_count(self, copias):
+        """O mapeamento traz novos e já existentes; existentes conta os códigos já gravados"""
+        cursor = RecordingUpsertCursor(gravados={'A': 7})
+        frame = pd.DataFrame({'codigo_cbo': ['A', 'B', 'C'], 'descricao_cbo': ['a', 'b', 'c']})
+
+        mapping, existentes = DimensionLoader()._bulk_upsert(cursor, frame, 'dim_cbo', 'codigo_cbo', 'cbo_id')
+
+        assert mapping == {'A': 7, 'B': 100, 'C': 101}
+        assert existentes == 1
+
+    def test_empty_frame_skips_database(self, copias):
+        cursor = RecordingUpsertCursor(gravados={})
+        frame = pd.DataFrame({'codigo_cbo': [], 'descricao_cbo': []})
+
+        assert DimensionLoader()._bulk_upsert(cursor, frame, 'dim_cbo', 'codigo_cbo', 'cbo_id') == ({}, 0)
+        assert cursor.comandos == [] and copias == []
+
+    def test_load_merges_mapping_and_skips_known_codes(self, copias):
+        """Códigos já no mapeamento (cache) não são reenviados; o resultado entra em dimension_maps"""
+        loader = DimensionLoader()
+        loader.dimension_maps['cbo'] = {'A': 7}
+        cursor = RecordingUpsertCursor(gravados={'A': 7})
+        df = pd.DataFrame({'Código do CBO': ['A', 'B', 'B'], 'Descrição do CBO': ['a', 'b', 'b']})
+
+        conn = FakePerfilConn([])
+        conn._cursor = cursor
+
+        loader.load_cbos(df, conn)
+
+        (_, _, enviado), = copias
+        assert enviado['codigo_cbo'].tolist() == ['B']
+        assert loader.dimension_maps['cbo'] == {'A': 7, 'B': 100}
+
+
 def run_dimension_loader_test():
     """Função para executar o teste manualmente"""
     tester = TestDimensionLoader()
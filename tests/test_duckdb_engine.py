@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from tests.sample_data import write_sample_csv
+
+pytest.importorskip('duckdb')
+
+
+def run_both(tmp_path, **kwargs):
+    """Executa extract + transform pelos dois motores sobre os mesmos CSVs"""
+    for seed in range(2):
+        write_sample_csv(tmp_path / f'amostra_{seed}.csv', n_rows=300, seed=seed)
+
+    pandas_ = HealthETLPipeline(**kwargs)
+    pandas_.raw_data_path = tmp_path
+    pandas_.processed_data_path = tmp_path / 'processed'
+    pandas_.extract()
+    pandas_.transform()
+
+    duck = HealthETLPipeline(engine='duckdb', **kwargs)
+    duck.raw_data_path = tmp_path
+    duck.processed_data_path = tmp_path / 'processed'
+    duck.extract_transform_duckdb()
+
+    return pandas_, duck
+
+
+class TestDuckDBEngine:
+    """O motor DuckDB deve produzir o mesmo frame que o caminho pandas"""
+
+    def test_same_frame_as_pandas(self, tmp_path):
+        pandas_, duck = run_both(tmp_path)
+
+        # Categorias podem vir em outra ordem; valores, tipos e índice são iguais
+        pd.testing.assert_frame_equal(duck.df, pandas_.df, check_categorical=False)
+        assert duck.stats['registros_extraidos'] == pandas_.stats['registros_extraidos']
+        assert duck.stats['datas_invalidas_data_do_atendimento'] == 2
+        assert duck._file_ranges[1][1:] == (300, 600)
+
+    def test_same_frame_with_hashed_key(self, tmp_path):
+        pandas_, duck = run_both(tmp_path, hashed_key=True)
+
+        pd.testing.assert_frame_equal(duck.df, pandas_.df, check_categorical=False)
+
+    def test_first_file_wins_on_duplicates(self, tmp_path):
+        """Com o mesmo conteúdo em dois arquivos, sobrevivem as linhas do primeiro, como no pandas"""
+        for nome in ('a', 'b'):
+            write_sample_csv(tmp_path / f'{nome}.csv', n_rows=2000, seed=5)
+
+        pandas_ = HealthETLPipeline()
+        duck = HealthETLPipeline(engine='duckdb')
+        for pipeline in (pandas_, duck):
+            pipeline.raw_data_path = tmp_path
+            pipeline.processed_data_path = tmp_path / 'processed'
+        pandas_.extract()
+        pandas_.transform()
+        duck.extract_transform_duckdb()
+
+        pd.testing.assert_frame_equal(duck.df, pandas_.df, check_categorical=False)
+        assert duck.df.index.max() < 2000
+
+    def test_same_quantities_as_pandas(self, tmp_path):
+        """Fração truncada e tipo alargado também no SQL, como no to_small_int"""
+        caminho = write_sample_csv(tmp_path / 'amostra.csv', n_rows=300, seed=0)
+        bruto = pd.read_csv(caminho, sep=';', encoding='latin-1', dtype=str)
+        bruto.loc[0, 'Cômodos'] = '40000'
+        bruto.loc[1, 'Qtde Prescrita Farmácia Curitibana'] = '2.7'
+        bruto.loc[2, 'Qtde Dispensada Farmácia Curitibana'] = '-1.5'
+        bruto.to_csv(caminho, sep=';', encoding='latin-1', index=False)
+
+        pandas_ = HealthETLPipeline()
+        duck = HealthETLPipeline(engine='duckdb')
+        for pipeline in (pandas_, duck):
+            pipeline.raw_data_path = tmp_path
+            pipeline.processed_data_path = tmp_path / 'processed'
+        pandas_.extract()
+        pandas_.transform()
+        duck.extract_transform_duckdb()
+
+        pd.testing.assert_frame_equal(duck.df, pandas_.df, check_categorical=False)
+        assert duck.df['Cômodos'].dtype == 'Int32'
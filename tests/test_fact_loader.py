@@ -0,0 +1,564 @@
+import re
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.loaders.fact_loader import FactLoader
+from src.models import saude
+
+
+def create_dimension_maps():
+    """Mapeamentos no mesmo formato gerado pelo DimensionLoader"""
+    return {
+        'unidade': {'001': 1, '002': 2},
+        'procedimento': {'PROC001': 10},
+        'cid': {'NI': 20, 'A01': 21},
+        'cbo': {'CBO001': 30},
+        'perfil': {1001: 40, 7: 41},
+    }
+
+
+def create_fact_dataframe():
+    """DataFrame com os códigos naturais usados na resolução das FKs"""
+    return pd.DataFrame({
+        'Código da Unidade': ['001', '002', '999', '001'],
+        'Código do Procedimento': ['PROC001', 'PROC001', 'PROC001', None],
+        'Código do CID': [' A01 ', np.nan, 'None', 'A01'],
+        'Código do CBO': ['CBO001', 'CBO001', 'CBO001', 'CBO001'],
+        'cod_usuario': ['1001', '007', 'abc', '1001'],
+    })
+
+
+class TestFactLoader:
+    """Testes para a resolução vetorizada de FKs do FactLoader"""
+
+    def test_resolve_foreign_keys(self):
+        """Códigos são resolvidos coluna a coluna com as mesmas regras do modo linha a linha"""
+        loader = FactLoader(create_dimension_maps())
+
+        fks, missing_mask, miss_counts = loader.resolve_foreign_keys(create_fact_dataframe())
+
+        assert list(fks.columns) == ['unidade_id', 'procedimento_id', 'cid_id', 'cbo_id', 'perfil_id']
+        assert str(fks['unidade_id'].dtype) == 'Int64'
+
+        # CID com espaços é normalizado; nulo/'None' viram "Não Informado"
+        assert fks['cid_id'].tolist() == [21, 20, 20, 21]
+        # cod_usuario é convertido para int ('007' -> 7)
+        assert fks['perfil_id'].tolist()[:2] == [40, 41]
+
+        assert missing_mask.tolist() == [False, False, True, True]
+        assert miss_counts == {'unidade': 1, 'procedimento': 1, 'cid': 0, 'cbo': 0, 'perfil': 1}
+
+    def test_resolve_foreign_keys_categorical(self):
+        """Colunas categóricas produzem o mesmo resultado que colunas de texto"""
+        loader = FactLoader(create_dimension_maps())
+        df = create_fact_dataframe()
+
+        esperado, _, _ = loader.resolve_foreign_keys(df)
+        obtido, _, _ = loader.resolve_foreign_keys(df.astype('category'))
+
+        pd.testing.assert_frame_equal(esperado, obtido)
+
+    def test_user_code_rule_shared_with_dimension_loader(self):
+        """cod_usuario resolve exatamente os códigos que o DimensionLoader grava"""
+        brutos = pd.Series([' 1001 ', '007', '1001.0', '1e3', '', 'abc', '99999999999', None], dtype=object)
+        mapa = {7: 41, 1000: 42, 1001: 40}
+        loader = FactLoader({**create_dimension_maps(), 'perfil': mapa})
+
+        gravados = saude.to_user_code(brutos)
+        esperado = [mapa.get(int(c)) if pd.notna(c) else None for c in gravados]
+        obtido = loader._map_codes(brutos, 'perfil').tolist()
+        assert [None if pd.isna(v) else v for v in obtido] == esperado == [40, 41, None, None, None, None, None, None]
+        assert [loader._normalize_code('perfil', v) for v in brutos[:3]] == [1001, 7, None]
+
+
+def create_resolved_fact_frame(n_linhas=1000):
+    """Frame já no layout da fato (FKs resolvidas), para a carga particionada"""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'data_atendimento': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90 * 86400, n_linhas), unit='s'),
+        'unidade_id': rng.integers(1, 20, n_linhas),
+        'perfil_id': rng.integers(1, 200, n_linhas),
+        'procedimento_id': rng.integers(1, 50, n_linhas),
+    })
+
+
+class TestPartitionedLoad:
+    """Testes da carga da fato em partições paralelas"""
+
+    def test_partitions_are_disjoint_by_key(self):
+        """Cada chave cai em uma única partição e todas as linhas são cobertas"""
+        fato = create_resolved_fact_frame()
+        fato = pd.concat([fato, fato.head(100)])  # chaves repetidas
+
+        for partition_by in ('hash', 'month'):
+            particoes = FactLoader({}, workers=4, partition_by=partition_by).partition(fato, 4)
+
+            assert sum(len(p) for p in particoes) == len(fato)
+            chaves = [set(map(tuple, p[FactLoader.COMPONENTES_CHAVE].to_numpy().tolist())) for p in particoes]
+            assert sum(len(c) for c in chaves) == len(set().union(*chaves))
+
+        # Por mês: três meses -> três partições
+        assert len(FactLoader({}, partition_by='month').partition(fato, 4)) == 3
+
+    def test_partition_counts_are_merged(self, monkeypatch):
+        """As contagens das partições são somadas; uma falha é relançada ao final"""
+        loader = FactLoader({}, workers=4)
+        fato = create_resolved_fact_frame()
+
+        def carga_falsa(i, parte):
+            if i == 2 and falhar:
+                raise RuntimeError("conexão perdida")
+            return {'particao': i, 'linhas': len(parte), 'inseridos': len(parte) - 1,
+                    'duplicados': 1, 'erros': 0, 'segundos': 0.0}
+
+        monkeypatch.setattr(loader, '_load_partition', carga_falsa)
+
+        falhar = False
+        assert loader._load_partitions(fato) == (len(fato) - 4, 4, 0)
+
+        falhar = True
+        with pytest.raises(RuntimeError):
+            loader._load_partitions(fato)
+        falha = loader.resultados_particoes[2]
+        assert falha['erros'] == falha['linhas'] and falha['inseridos'] == 0
+
+    def test_workers_limited_by_pool(self, monkeypatch):
+        """Partições limitadas a maxconn - 1: a carga já segura uma conexão do pool"""
+        from src.config.database import DatabaseConfig
+        loader = FactLoader({}, workers=8)
+        usados = []
+        monkeypatch.setattr(loader, '_load_partition', lambda i, parte: usados.append(i) or {
+            'particao': i, 'linhas': len(parte), 'inseridos': len(parte), 'duplicados': 0,
+            'erros': 0, 'segundos': 0.0})
+
+        monkeypatch.setitem(DatabaseConfig.POOL_CONFIG, 'maxconn', 4)
+        loader._load_partitions(create_resolved_fact_frame())
+        assert sorted(usados) == [0, 1, 2]
+
+        monkeypatch.setitem(DatabaseConfig.POOL_CONFIG, 'maxconn', 1)
+        with pytest.raises(ValueError):
+            loader._load_partitions(create_resolved_fact_frame())
+
+    def test_invalid_partition_by(self):
+        with pytest.raises(ValueError):
+            FactLoader({}, partition_by='dia')
+
+    def test_workers_refuse_batches_and_checkpoint(self):
+        """Partições paralelas não fazem commit em lotes nem checkpoint: recusa explícita"""
+        with pytest.raises(ValueError):
+            FactLoader({}, workers=4, batch_size=1000)
+
+        class ConexaoProibida:
+            def cursor(self):
+                raise AssertionError("nenhum comando deveria ser enviado")
+
+        loader = FactLoader({}, workers=4)
+        with pytest.raises(ValueError):
+            loader.load_fato_atendimento(ConexaoProibida(), create_resolved_fact_frame(),
+                                         on_batch=lambda conn, lote: None)
+
+
+class RecordingCursor:
+    """
+    Cursor falso: registra os comandos; to_regclass acha só as partições em
+    'existentes'; 'colisoes' são os hashes que já existem na fato com outros
+    componentes; 'sem_chave_natural' simula linhas gravadas no modo hashed_key
+    """
+
+    def __init__(self, existentes=(), inseridos_por_merge=1, colisoes=(), sem_chave_natural=None):
+        self.comandos = []
+        self.existentes = set(existentes)
+        self.inseridos_por_merge = inseridos_por_merge
+        self.colisoes = list(colisoes)
+        self.sem_chave_natural = sem_chave_natural  # None: chave_natural NOT NULL (sem o script 03)
+        self.rowcount = 0
+        self._resultado = None
+        self._linhas = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.comandos.append((sql, params))
+        if 'to_regclass' in sql:
+            self._resultado = (params[0] if params[0] in self.existentes else None,)
+        elif 'count(*)' in sql:
+            self._resultado = (0,)
+        elif 'attnotnull' in sql:
+            self._resultado = (self.sem_chave_natural is None,)
+        elif 'chave_natural IS NULL)' in sql:
+            self._resultado = (bool(self.sem_chave_natural),)
+        elif sql.startswith('SELECT s.chave_hash'):
+            self._linhas = [(h,) for h in self.colisoes]
+        self.rowcount = self.inseridos_por_merge if sql.startswith('INSERT') or ' AS SELECT ' in sql else 0
+
+    def fetchone(self):
+        return self._resultado
+
+    def fetchall(self):
+        return self._linhas
+
+
+class CatalogCursor(RecordingCursor):
+    """
+    RecordingCursor com um catálogo mínimo de restrições e índices por
+    tabela: o LIKE ... INCLUDING ALL gera os nomes com o prefixo da tabela
+    nova e um nome repetido falha, como uma colisão no PostgreSQL
+    """
+
+    def __init__(self, tabela, objetos):
+        super().__init__(existentes={tabela})
+        self.objetos = {nome: (tabela, tipo) for nome, tipo in objetos.items()}
+
+    def _criar(self, nome, tabela, tipo):
+        if nome in self.objetos:
+            raise RuntimeError(f'relation "{nome}" already exists')
+        self.objetos[nome] = (tabela, tipo)
+
+    def _renomear(self, antigo, novo):
+        self._criar(novo, *self.objetos.pop(antigo))
+
+    def execute(self, sql, params=None):
+        super().execute(sql, params)
+        sql = ' '.join(sql.split())
+        if m := re.match(r'CREATE TABLE (\w+) \(LIKE (\w+) INCLUDING ALL\)', sql):
+            nova, origem = m.groups()
+            for nome, (tabela, tipo) in list(self.objetos.items()):
+                if tabela == origem and tipo != 'check':
+                    self._criar(nova + nome[len(origem):], nova, tipo)
+        elif m := re.match(r'ALTER TABLE (\w+) ADD CONSTRAINT (\w+) CHECK', sql):
+            self._criar(m.group(2), m.group(1), 'check')
+        elif m := re.match(r'ALTER TABLE \w+ DROP CONSTRAINT (\w+)', sql):
+            del self.objetos[m.group(1)]
+        elif m := re.match(r'DROP TABLE (?:IF EXISTS )?(\w+)', sql):
+            self.objetos = {nome: dono for nome, dono in self.objetos.items() if dono[0] != m.group(1)}
+        elif m := re.match(r'ALTER TABLE (\w+) RENAME TO (\w+)', sql):
+            self.objetos = {nome: ((m.group(2), tipo) if tabela == m.group(1) else (tabela, tipo))
+                            for nome, (tabela, tipo) in self.objetos.items()}
+        elif m := re.match(r'ALTER (?:TABLE \w+ RENAME CONSTRAINT|INDEX) (\w+) (?:RENAME )?TO (\w+)', sql):
+            self._renomear(*m.groups())
+        elif 'FROM pg_constraint' in sql or 'FROM pg_index' in sql:
+            tabela, _, prefixo = params
+            tipos = {'pkey', 'check'} if 'pg_constraint' in sql else {'indice'}
+            self._linhas = [(nome,) for nome, (dono, tipo) in self.objetos.items()
+                            if dono == tabela and tipo in tipos and nome.startswith(prefixo)]
+
+
+class RecordingConn:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+
+def create_partitioned_fact_frame():
+    fato = create_resolved_fact_frame(30)
+    fato['chave_natural'] = [f'k{i}' for i in range(len(fato))]
+    return fato
+
+
+class TestMonthlyPartitions:
+    """Testes da carga na fato particionada por mês"""
+
+    def test_batches_are_routed_to_month_partitions(self, monkeypatch):
+        """Cada mês do lote é gravado direto na sua partição, com a data na chave de conflito"""
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe', lambda cursor, df, *a, **k: len(df))
+        loader = FactLoader({}, partitioned=True)
+        loader.colunas_fato = list(create_partitioned_fact_frame().columns)
+        cursor = RecordingCursor()
+
+        loader._copy_and_merge(create_partitioned_fact_frame(), cursor)
+
+        inserts = [(sql, params) for sql, params in cursor.comandos if sql.startswith('INSERT')]
+        destinos = sorted(sql.split()[2] for sql, _ in inserts)
+        assert destinos == ['fato_atendimento_2024_01', 'fato_atendimento_2024_02', 'fato_atendimento_2024_03']
+        assert all('ON CONFLICT (chave_natural, data_atendimento)' in sql for sql, _ in inserts)
+        assert all(params[1] - params[0] >= pd.Timedelta(days=28) for _, params in inserts)
+
+    def test_missing_partitions_are_created(self):
+        loader = FactLoader({}, partitioned=True)
+        cursor = RecordingCursor(existentes={'fato_atendimento_2024_01'})
+
+        loader.ensure_partitions(RecordingConn(cursor), create_resolved_fact_frame()['data_atendimento'])
+
+        criadas = [params for sql, params in cursor.comandos if sql.startswith('CREATE TABLE')]
+        assert [str(inicio.date()) for inicio, _ in criadas] == ['2024-02-01', '2024-03-01']
+
+    def test_reload_month_swaps_partition(self, monkeypatch):
+        """No modo swap a partição nova é carregada ao lado e trocada com DETACH/ATTACH"""
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe', lambda cursor, df, *a, **k: len(df))
+        loader = FactLoader({}, partitioned=True)
+        fato = create_partitioned_fact_frame()
+        loader.colunas_fato = list(fato.columns)
+        monkeypatch.setattr(loader, '_prepare_fact_frame', lambda df, cursor=None: (df, 0))
+        cursor = RecordingCursor(existentes={'fato_atendimento_2024_02'})
+
+        resultado = loader.reload_month(fato, RecordingConn(cursor), '2024-02', modo='swap')
+
+        comandos = [sql for sql, _ in cursor.comandos]
+        etapas = [next(i for i, sql in enumerate(comandos) if sql.startswith(prefixo)) for prefixo in (
+            'INSERT INTO fato_atendimento_2024_02_nova',
+            'ALTER TABLE fato_atendimento DETACH PARTITION fato_atendimento_2024_02',
+            'ALTER TABLE fato_atendimento ATTACH PARTITION fato_atendimento_2024_02_nova',
+            'DROP TABLE fato_atendimento_2024_02',
+            'ALTER TABLE fato_atendimento_2024_02_nova RENAME TO fato_atendimento_2024_02',
+        )]
+        assert etapas == sorted(etapas)
+        assert resultado['inseridos'] == 1
+
+    def test_reload_month_swaps_same_month_twice(self, monkeypatch):
+        """Índices e restrições voltam ao nome da partição: a segunda troca não colide"""
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe', lambda cursor, df, *a, **k: len(df))
+        loader = FactLoader({}, partitioned=True)
+        fato = create_partitioned_fact_frame()
+        loader.colunas_fato = list(fato.columns)
+        monkeypatch.setattr(loader, '_prepare_fact_frame', lambda df, cursor=None: (df, 0))
+        particao = 'fato_atendimento_2024_02'
+        originais = {f'{particao}_pkey': 'pkey', f'{particao}_data_atendimento_idx': 'indice'}
+        cursor = CatalogCursor(particao, originais)
+
+        for _ in range(2):
+            loader.reload_month(fato, RecordingConn(cursor), '2024-02', modo='swap')
+            assert cursor.objetos == {nome: (particao, tipo) for nome, tipo in originais.items()}
+
+    def test_reload_requires_partitioned(self):
+        with pytest.raises(ValueError):
+            FactLoader({}).reload_month(pd.DataFrame(), None, '2024-01')
+
+
+class TestRejects:
+    """Testes da quarentena de linhas sem FK (fato_atendimento_rejeitos)"""
+
+    def test_rejects_written_in_bulk(self, monkeypatch):
+        """Linhas sem FK vão em um único COPY com códigos brutos e máscara das FKs faltando"""
+        copias = []
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe',
+                            lambda cursor, df, tabela, colunas, **k: copias.append((tabela, df[colunas])))
+        loader = FactLoader(create_dimension_maps())
+        cursor = RecordingCursor()
+
+        fato, erros = loader._prepare_fact_frame(create_fact_dataframe(), cursor)
+
+        assert erros == 2 and len(fato) == 2
+        (tabela, rejeitos), = copias
+        assert tabela == 'tmp_fato_atendimento_rejeitos'
+        # Linha 2: unidade (bit 0) e perfil (bit 4); linha 3: procedimento (bit 1)
+        assert rejeitos['mascara_fk'].tolist() == [0b10001, 0b00010]
+        assert rejeitos['codigo_unidade'].tolist() == ['999', '001']
+        assert rejeitos['cod_usuario'].tolist() == ['abc', '1001']
+        assert 'chave_natural' in rejeitos.columns and 'unidade_id' not in rejeitos.columns
+
+        inserts = [sql for sql, _ in cursor.comandos if sql.startswith('INSERT INTO fato_atendimento_rejeitos')]
+        assert len(inserts) == 1 and inserts[0].endswith('ON CONFLICT DO NOTHING')
+        assert loader.rejeitos_por_dimensao == {'unidade': 1, 'procedimento': 1, 'cid': 0, 'cbo': 0, 'perfil': 1}
+
+    def test_reprocess_rejects_is_set_based(self):
+        """O reprocessamento resolve as FKs por JOIN e faz o merge sem laço em Python"""
+        loader = FactLoader({})
+        cursor = RecordingCursor()
+
+        resultado = loader.reprocess_rejects(RecordingConn(cursor))
+
+        comandos = [sql for sql, _ in cursor.comandos]
+        etapas = [next(i for i, sql in enumerate(comandos) if sql.startswith(prefixo)) for prefixo in (
+            'CREATE TEMP TABLE fato_atendimento_staging_rejeitos ON COMMIT DROP AS SELECT',
+            'INSERT INTO fato_atendimento (',
+            'DELETE FROM fato_atendimento_rejeitos r USING fato_atendimento_staging_rejeitos',
+        )]
+        assert etapas == sorted(etapas)
+        assert 'JOIN dim_perfil_paciente' in comandos[etapas[0]]
+        assert 'ON CONFLICT (chave_natural) DO NOTHING' in comandos[etapas[1]]
+        assert resultado == {'resolvidos': 1, 'inseridos': 1, 'duplicados': 0, 'pendentes': 0}
+
+
+def create_transformed_frame():
+    """Frame transformado: 4 linhas, 2 com FK faltando (ver create_fact_dataframe)"""
+    df = create_fact_dataframe()
+    df['Data do Atendimento'] = pd.to_datetime(['2024-01-01 08:00', '2024-01-01 09:00',
+                                                '2024-01-02 10:00', '2024-01-03 11:00'])
+    df['Qtde Prescrita Farmácia Curitibana'] = [1, 2, 3, 4]
+    df['gerou_internamento'] = [0, 1, 0, 0]
+    df['chave_natural'] = [f'k{i}' for i in range(len(df))]
+    return df
+
+
+class TestBulkLoad:
+    """Testes da carga em massa: staging + COPY + merge com ON CONFLICT"""
+
+    @pytest.fixture
+    def copias(self, monkeypatch):
+        copias = []
+
+        def copy_falso(cursor, df, tabela, colunas, **kwargs):
+            copias.append((tabela, df[colunas].copy()))
+            return len(df)
+
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe', copy_falso)
+        return copias
+
+    def test_staging_copy_and_merge(self, copias):
+        """Staging recriada, um COPY com as linhas resolvidas e um INSERT ... ON CONFLICT"""
+        loader = FactLoader(create_dimension_maps())
+        cursor = RecordingCursor(inseridos_por_merge=1)
+        conn = RecordingConn(cursor)
+
+        resultado = loader.load_fato_atendimento(create_transformed_frame(), conn)
+
+        comandos = [sql for sql, _ in cursor.comandos]
+        ddl = [sql for sql in comandos if 'fato_atendimento_staging' in sql and not sql.startswith('INSERT')]
+        # Temporária da sessão, descartada logo após o merge (e no commit, se o merge falhar)
+        assert ddl[0].startswith('CREATE TEMP TABLE fato_atendimento_staging (')
+        assert ddl[0].endswith('ON COMMIT DROP')
+        assert ddl[-1] == 'DROP TABLE fato_atendimento_staging'
+
+        # Rejeitos e staging: o COPY da fato leva só as 2 linhas com todas as FKs
+        tabela, enviado = copias[-1]
+        assert tabela == 'fato_atendimento_staging'
+        assert list(enviado.columns) == loader.colunas_fato
+        assert enviado['unidade_id'].tolist() == [1, 2]
+        assert str(enviado['qtde_prescrita'].dtype) == 'Int64'
+
+        (merge,) = [sql for sql in comandos if sql.startswith('INSERT INTO fato_atendimento (')]
+        assert 'SELECT' in merge and 'FROM fato_atendimento_staging' in merge
+        assert merge.endswith('ON CONFLICT (chave_natural) DO NOTHING')
+
+        # 2 enviadas, 1 inserida pelo merge -> 1 duplicada; 2 sem FK -> erros
+        assert resultado == {'inseridos': 1, 'duplicados': 1, 'erros': 2}
+        assert conn.commits == 1
+
+    def test_batches_sum_counts(self, copias):
+        """Com batch_size, cada lote tem staging e commit próprios e as contagens são somadas"""
+        loader = FactLoader(create_dimension_maps(), batch_size=1)
+        conn = RecordingConn(RecordingCursor(inseridos_por_merge=1))
+
+        resultado = loader.load_fato_atendimento(create_transformed_frame(), conn)
+
+        assert [tabela for tabela, _ in copias].count('fato_atendimento_staging') == 2
+        assert resultado == {'inseridos': 2, 'duplicados': 0, 'erros': 2}
+        assert conn.commits == 2
+
+    def test_empty_frame(self, copias):
+        """Frame vazio: nenhuma staging, nenhum COPY, contagens zeradas"""
+        loader = FactLoader(create_dimension_maps())
+        cursor = RecordingCursor()
+
+        resultado = loader.load_fato_atendimento(create_transformed_frame().iloc[:0], RecordingConn(cursor))
+
+        assert copias == []
+        assert not any('staging' in sql for sql, _ in cursor.comandos)
+        assert resultado == {'inseridos': 0, 'duplicados': 0, 'erros': 0}
+
+
+class BackfillCursor(RecordingCursor):
+    """RecordingCursor que devolve as linhas sem chave_hash em um único lote"""
+
+    def __init__(self, linhas):
+        super().__init__()
+        self.lotes = [linhas, []]
+
+    def fetchall(self):
+        return self.lotes.pop(0)
+
+
+class TestHashedKey:
+    """Testes do modo hashed_key: fallback em texto e backfill de chave_hash"""
+
+    def test_text_key_only_for_collisions(self, monkeypatch):
+        """Sem colisões, a chave em texto nem vai para a staging; só as linhas em colisão a recebem"""
+        copias = []
+
+        def copy_falso(cursor, df, tabela, colunas, **kwargs):
+            copias.append((tabela, df[colunas].copy()))
+            return len(df)
+
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe', copy_falso)
+        df = create_transformed_frame().drop(columns='chave_natural')
+        df['chave_hash'] = pd.array(saude.hash_natural_key(df), dtype='Int64')
+        loader = FactLoader(create_dimension_maps(), hashed_key=True)
+
+        loader.load_fato_atendimento(df, RecordingConn(RecordingCursor()))
+        (tabela, enviado), = copias[1:]
+        assert tabela == 'fato_atendimento_staging' and 'chave_natural' not in enviado.columns
+
+        # Linha 1 colide com um hash já gravado: só ela recebe a chave em texto
+        copias.clear()
+        colisao = int(df.loc[1, 'chave_hash'])
+        cursor = RecordingCursor(colisoes=[colisao])
+        loader.load_fato_atendimento(df, RecordingConn(cursor))
+
+        tabela, colisoes = copias[-1]
+        assert tabela == 'tmp_fato_atendimento_staging_colisoes'
+        assert colisoes['chave_hash'].tolist() == [colisao]
+        assert colisoes['chave_natural'].tolist() == saude.natural_key_text(df.loc[[1]]).tolist()
+
+        comandos = [sql for sql, _ in cursor.comandos]
+        assert any(sql.startswith('UPDATE fato_atendimento_staging s SET chave_hash = NULL, chave_natural')
+                   for sql in comandos)
+        merges = [sql for sql in comandos if sql.startswith('INSERT INTO fato_atendimento (')]
+        assert not any('concat_ws' in sql for sql in merges)
+        (fallback,) = [sql for sql in merges if 'chave_hash IS NULL' in sql]
+        assert 'chave_natural' in fallback and fallback.endswith('ON CONFLICT (chave_natural) DO NOTHING')
+
+    def test_text_mode_refused_after_hashed_loads(self, monkeypatch):
+        """Linhas gravadas só com hash: a carga em modo texto é recusada antes de gravar"""
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe', lambda cursor, df, *a, **k: len(df))
+        cursor = RecordingCursor(sem_chave_natural=True)
+
+        with pytest.raises(ValueError, match='hashed_key=True'):
+            FactLoader(create_dimension_maps()).load_fato_atendimento(create_transformed_frame(),
+                                                                       RecordingConn(cursor))
+        assert not any(sql.startswith('INSERT') for sql, _ in cursor.comandos)
+
+        # Coluna nullable (script 03) sem linhas só com hash: segue normalmente
+        cursor = RecordingCursor(sem_chave_natural=False)
+        FactLoader(create_dimension_maps()).load_fato_atendimento(create_transformed_frame(), RecordingConn(cursor))
+
+    def test_text_key_keeps_time_at_midnight(self):
+        """Chunk só com meia-noite mantém a hora na chave (como o strftime do DuckDB); NaT vira 'NaT'"""
+        df = pd.DataFrame({
+            'Data do Atendimento': pd.to_datetime(['2024-01-01', None]),
+            'Código da Unidade': ['001', None],
+            'cod_usuario': ['1001', '7'],
+            'Código do Procedimento': ['PROC001', 'PROC001'],
+        })
+        chaves = saude.natural_key_text(df)
+        assert chaves.tolist() == ['2024-01-01 00:00:00_001_1001_PROC001', 'NaT_None_7_PROC001']
+
+        componentes = saude.parse_natural_key(chaves)
+        assert list(saude.hash_natural_key(componentes)) == list(saude.hash_natural_key(df))
+
+    def test_backfill_matches_pipeline_hash(self, monkeypatch):
+        """O hash preenchido a partir da chave em texto é o mesmo calculado no transform"""
+        copias = []
+
+        def copy_falso(cursor, df, tabela, colunas, **kwargs):
+            copias.append((tabela, df[colunas].copy()))
+            return len(df)
+
+        monkeypatch.setattr('scripts.loaders.fact_loader.copy_dataframe', copy_falso)
+        df = create_transformed_frame()
+        df.loc[3, 'Código do Procedimento'] = None
+        chaves = saude.natural_key_text(df).tolist()
+        linhas = [(i + 1, data, chave) for i, (data, chave) in enumerate(zip(df['Data do Atendimento'], chaves))]
+        linhas.append((9, None, 'NaT_001_1001_PROC001'))  # Data ilegível: fica sem hash
+        cursor = BackfillCursor(linhas)
+        conn = RecordingConn(cursor)
+
+        FactLoader(create_dimension_maps(), hashed_key=True).backfill_hash_keys(conn)
+
+        (tabela, enviado), = copias
+        assert tabela.startswith('tmp_')
+        assert enviado['atendimento_id'].tolist() == [1, 2, 3, 4]
+        assert enviado['chave_hash'].tolist() == list(saude.hash_natural_key(df))
+        (update,) = [sql for sql, _ in cursor.comandos if sql.startswith('UPDATE fato_atendimento')]
+        assert 'HAVING count(*) = 1' in update and 'NOT EXISTS' in update
+        assert conn.commits == 1
@@ -0,0 +1,97 @@
+import pandas as pd
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from scripts.loaders.ingestion_manifest import IngestionManifest
+from tests.sample_data import write_sample_csv
+
+
+class FakeCursor:
+    """Cursor mínimo: guarda as linhas do manifesto em memória"""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self._result = []
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().startswith('SELECT'):
+            self._result = [
+                (l['nome_arquivo'], l['hash_arquivo'], l['tamanho_bytes'], l['mtime_ns'], l['linhas'],
+                 l['data_atendimento_min'], l['data_atendimento_max'])
+                for l in self.linhas.values()
+            ]
+        elif sql.lstrip().startswith('INSERT'):
+            self.linhas[params['hash_arquivo']] = dict(params)
+
+    def fetchall(self):
+        return self._result
+
+
+class FakeConn:
+    def __init__(self, linhas):
+        self._cursor = FakeCursor(linhas)
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+
+class TestIngestionManifest:
+    """Testes do manifesto de ingestão incremental"""
+
+    def test_ingested_files_are_skipped(self, tmp_path):
+        """Arquivo registrado é ignorado; arquivo alterado volta a ser pendente"""
+        janeiro = write_sample_csv(tmp_path / 'janeiro.csv', seed=1)
+        fevereiro = write_sample_csv(tmp_path / 'fevereiro.csv', seed=2)
+        linhas = {}
+
+        manifesto = IngestionManifest()
+        manifesto.load(FakeConn(linhas))
+        assert manifesto.pending_files([janeiro, fevereiro]) == [janeiro, fevereiro]
+
+        manifesto.register(FakeConn(linhas), janeiro, 200,
+                           pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-31 23:00'))
+
+        # Nova execução: lê o manifesto do "banco"
+        seguinte = IngestionManifest()
+        seguinte.load(FakeConn(linhas))
+        assert seguinte.pending_files([janeiro, fevereiro]) == [fevereiro]
+        assert seguinte.watermark() == pd.Timestamp('2024-01-31 23:00')
+
+        # Arquivo reescrito (tamanho/mtime diferentes): pendente mesmo com o manifesto carregado
+        write_sample_csv(janeiro, n_rows=150, seed=3)
+        reescrito = IngestionManifest()
+        reescrito.load(FakeConn(linhas))
+        assert reescrito.pending_files([janeiro, fevereiro]) == [janeiro, fevereiro]
+
+    def test_rows_by_file_ignores_index_order(self, tmp_path):
+        """As linhas de cada arquivo saem do rótulo da linha, não da ordem do índice"""
+        pipeline = HealthETLPipeline()
+        pipeline._file_ranges = [(tmp_path / 'a.csv', 0, 3), (tmp_path / 'b.csv', 3, 6)]
+        # Transform descartou a linha 1 e reordenou as demais
+        pipeline.df = pd.DataFrame({'Data do Atendimento': list('fcedb')}, index=[5, 2, 4, 3, 0])
+
+        a, b = pipeline._rows_by_file()
+
+        assert sorted(pipeline.df['Data do Atendimento'].iloc[a]) == ['b', 'c']
+        assert sorted(pipeline.df['Data do Atendimento'].iloc[b]) == ['d', 'e', 'f']
+
+    def test_watermark_filters_older_rows(self, tmp_path):
+        """Com marca d'água, só atendimentos posteriores seguem no transform"""
+        write_sample_csv(tmp_path / 'amostra.csv')
+
+        pipeline = HealthETLPipeline(use_watermark=True)
+        pipeline.raw_data_path = tmp_path
+        pipeline.extract()
+        pipeline._watermark = pd.Timestamp('2024-02-01')
+        pipeline.transform()
+
+        assert len(pipeline.df) > 0
+        assert (pipeline.df['Data do Atendimento'] > pd.Timestamp('2024-02-01')).all()
+        assert pipeline.stats['descartados_marca_dagua'] > 0
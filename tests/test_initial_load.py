@@ -0,0 +1,235 @@
+import pytest
+import sys
+import os
+import threading
+from contextlib import contextmanager
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.loaders.initial_load import InitialLoad
+
+
+INDICES = [
+    ('idx_fato_data_atendimento', 'CREATE INDEX idx_fato_data_atendimento ON public.fato_atendimento USING btree (data_atendimento)'),
+    ('idx_fato_unidade', 'CREATE INDEX idx_fato_unidade ON public.fato_atendimento USING btree (unidade_id)'),
+]
+FKS = [
+    ('fato_atendimento_unidade_id_fkey', 'FOREIGN KEY (unidade_id) REFERENCES dim_unidade(unidade_id)'),
+]
+
+
+class FakeCursor:
+    """Cursor que simula o catálogo da fato e a tabela etl_ddl_adiada"""
+
+    def __init__(self, banco):
+        self.banco = banco
+        self._result = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        with self.banco.lock:
+            self.banco.comandos.append(sql)
+            if sql.startswith('SELECT EXISTS'):
+                self._result = [(self.banco.linhas_fato > 0,)]
+            elif sql.startswith('SELECT relkind'):
+                self._result = [(self.banco.relkind,)]
+            elif sql.startswith('SELECT to_regclass'):
+                self._result = [(params[0] if params[0] in self.banco.indices else None,)]
+            elif sql.startswith('SELECT convalidated'):
+                nome = params[1]
+                self._result = [(nome in self.banco.fks_validas,)] if nome in self.banco.fks else []
+            elif 'pg_get_indexdef' in sql:
+                self._result = list(self.banco.indices.items())
+            elif 'pg_get_constraintdef' in sql:
+                self._result = list(self.banco.fks.items())
+            elif sql.startswith('SELECT nome, tipo, definicao'):
+                # ORDER BY tipo DESC, nome: índices antes das FKs
+                self._result = sorted(self.banco.ddl, key=lambda r: (r[1] == 'fk', r[0]))
+            elif sql.startswith('INSERT INTO etl_ddl_adiada'):
+                self.banco.ddl.append(params)
+            elif sql.startswith('DELETE FROM etl_ddl_adiada'):
+                self.banco.ddl = [r for r in self.banco.ddl if r[0] != params[0]]
+            elif sql.startswith('DROP INDEX'):
+                self.banco.indices.pop(sql.split()[-1])
+            elif 'DROP CONSTRAINT' in sql:
+                self.banco.fks.pop(sql.split()[-1])
+                self.banco.fks_validas.discard(sql.split()[-1])
+            elif sql.startswith('CREATE INDEX'):
+                self.banco.indices[sql.split()[2]] = sql
+            elif 'ADD CONSTRAINT' in sql:
+                nome = sql.split()[5]
+                if nome == self.banco.fk_invalida:
+                    raise RuntimeError(f"violação de FK em {nome}")
+                if nome in self.banco.fks:
+                    raise RuntimeError(f"constraint {nome} já existe")
+                self.banco.fks[nome] = sql
+                if not sql.endswith('NOT VALID'):
+                    self.banco.fks_validas.add(nome)
+            elif 'VALIDATE CONSTRAINT' in sql:
+                self.banco.fks_validas.add(sql.split()[-1])
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+
+class FakeConn:
+    def __init__(self, banco):
+        self.banco = banco
+
+    def cursor(self):
+        return FakeCursor(self.banco)
+
+    def commit(self):
+        pass
+
+
+class FakeBanco:
+    """Estado compartilhado entre as conexões"""
+
+    def __init__(self, linhas_fato=0, relkind='r'):
+        self.lock = threading.Lock()
+        self.linhas_fato = linhas_fato
+        self.relkind = relkind
+        self.indices = dict(INDICES)
+        self.fks = dict(FKS)
+        self.fks_validas = set(self.fks)
+        self.fk_invalida = None  # FK cujo ADD falha (linhas órfãs)
+        self.ddl = []
+        self.comandos = []
+        self.conexoes = 0
+
+    @contextmanager
+    def connect(self):
+        with self.lock:
+            self.conexoes += 1
+        yield FakeConn(self)
+
+
+class TestInitialLoad:
+    """Testes do modo carga inicial (índices e FKs adiados)"""
+
+    def test_refuses_non_empty_fact(self):
+        """Com linhas na fato a carga inicial é recusada sem remover nada"""
+        banco = FakeBanco(linhas_fato=10)
+
+        with pytest.raises(ValueError, match="não está vazia"):
+            InitialLoad(connect=banco.connect).prepare(FakeConn(banco))
+
+        assert banco.indices == dict(INDICES)
+        assert banco.fks == dict(FKS)
+        assert not any(c.startswith('DROP') for c in banco.comandos)
+
+    def test_prepare_and_restore(self):
+        """prepare() remove e registra a DDL; restore() recria índices e valida as FKs"""
+        banco = FakeBanco()
+        carga_inicial = InitialLoad(workers=2, connect=banco.connect)
+
+        carga_inicial.prepare(FakeConn(banco))
+        assert banco.indices == {} and banco.fks == {}
+        assert {nome for nome, _, _ in banco.ddl} == {n for n, _ in INDICES + FKS}
+
+        carga_inicial.restore()
+        assert banco.indices.keys() == dict(INDICES).keys()
+        assert banco.ddl == []
+
+        # FK recolocada como NOT VALID e validada uma única vez, depois dos índices
+        fk = FKS[0][0]
+        adicionar = banco.comandos.index(f"ALTER TABLE fato_atendimento ADD CONSTRAINT {fk} {FKS[0][1]} NOT VALID")
+        validar = banco.comandos.index(f"ALTER TABLE fato_atendimento VALIDATE CONSTRAINT {fk}")
+        ultimo_indice = max(i for i, c in enumerate(banco.comandos) if c.startswith('CREATE INDEX'))
+        assert ultimo_indice < adicionar < validar
+
+        # Uma conexão para a leitura, uma por índice e uma por FK
+        assert banco.conexoes == 1 + len(INDICES) + len(FKS)
+
+    def test_prepare_restores_interrupted_load(self):
+        """DDL pendente de uma carga interrompida é recriada antes da recusa"""
+        banco = FakeBanco(linhas_fato=10)
+        nome, definicao = INDICES[0]
+        del banco.indices[nome]
+        banco.ddl.append((nome, 'indice', definicao))
+
+        with pytest.raises(ValueError):
+            InitialLoad(connect=banco.connect).prepare(FakeConn(banco))
+
+        assert nome in banco.indices
+        assert banco.ddl == []
+
+    def test_restore_from_prepare_leaves_caller_connection(self, monkeypatch):
+        """prepare() segura uma conexão: os índices usam no máximo maxconn - 1"""
+        from src.config.database import DatabaseConfig
+        import scripts.loaders.initial_load as initial_load
+        usados = []
+
+        class Executor(initial_load.ThreadPoolExecutor):
+            def __init__(self, max_workers, **kwargs):
+                usados.append(max_workers)
+                super().__init__(max_workers, **kwargs)
+
+        monkeypatch.setattr(initial_load, 'ThreadPoolExecutor', Executor)
+        monkeypatch.setitem(DatabaseConfig.POOL_CONFIG, 'maxconn', 3)
+        banco = FakeBanco()
+        banco.ddl = [(nome, 'indice', definicao) for nome, definicao in INDICES]
+        carga_inicial = InitialLoad(workers=8, connect=banco.connect)
+
+        carga_inicial.prepare(FakeConn(banco))
+        carga_inicial.restore()
+        assert usados == [2, 3]
+
+        monkeypatch.setitem(DatabaseConfig.POOL_CONFIG, 'maxconn', 1)
+        banco.ddl = [(nome, 'indice', definicao) for nome, definicao in INDICES]
+        with pytest.raises(ValueError, match="DB_POOL_MAX"):
+            InitialLoad(connect=banco.connect).prepare(FakeConn(banco))
+
+    def test_restore_is_idempotent(self):
+        """FK já adicionada como NOT VALID (restore interrompido): só é validada, sem novo ADD"""
+        banco = FakeBanco()
+        carga_inicial = InitialLoad(connect=banco.connect)
+        carga_inicial.prepare(FakeConn(banco))
+
+        fk, definicao = FKS[0]
+        banco.fks[fk] = definicao  # ADD ... NOT VALID feito, VALIDATE não
+        nome, _ = INDICES[0]
+        banco.indices[nome] = 'recriado antes da interrupção'
+
+        carga_inicial.restore()
+
+        assert not any('ADD CONSTRAINT' in c for c in banco.comandos)
+        assert f"ALTER TABLE fato_atendimento VALIDATE CONSTRAINT {fk}" in banco.comandos
+        assert banco.indices[nome] == 'recriado antes da interrupção'
+        assert fk in banco.fks_validas and banco.ddl == []
+
+        carga_inicial.restore()  # Nada pendente: não faz nada
+        assert banco.ddl == []
+
+    def test_restore_collects_fk_failures(self):
+        """Uma FK que falha não impede o restante; a falha é relançada no fim e fica pendente"""
+        banco = FakeBanco()
+        carga_inicial = InitialLoad(connect=banco.connect)
+        carga_inicial.prepare(FakeConn(banco))
+        banco.fk_invalida = FKS[0][0]
+
+        with pytest.raises(RuntimeError, match="violação de FK"):
+            carga_inicial.restore()
+
+        assert banco.indices.keys() == dict(INDICES).keys()
+        assert [nome for nome, _, _ in banco.ddl] == [FKS[0][0]]
+
+    def test_restore_partitioned_fact(self):
+        """Fato particionada: FK criada já validada (sem NOT VALID) e índices sem ON ONLY"""
+        banco = FakeBanco(relkind='p')
+        nome, definicao = INDICES[0]
+        banco.indices[nome] = definicao.replace(' ON ', ' ON ONLY ')
+        carga_inicial = InitialLoad(connect=banco.connect)
+        carga_inicial.prepare(FakeConn(banco))
+
+        carga_inicial.restore()
+
+        fk, definicao_fk = FKS[0]
+        assert f"ALTER TABLE fato_atendimento ADD CONSTRAINT {fk} {definicao_fk}" in banco.comandos
+        assert not any('NOT VALID' in c or 'VALIDATE' in c for c in banco.comandos)
+        assert banco.indices[nome] == definicao
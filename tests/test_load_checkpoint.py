@@ -0,0 +1,135 @@
+import pytest
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from scripts.loaders.load_checkpoint import LoadCheckpoint
+from scripts.seen_keys import SeenKeySet
+from tests.sample_data import write_sample_csv
+
+
+class FakeCursor:
+    """Cursor mínimo: grava os checkpoints na transação pendente da conexão"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._result = []
+
+    def execute(self, sql, params=None):
+        sql = sql.lstrip()
+        if sql.startswith('SELECT'):
+            self._result = [
+                (c['nome_arquivo'], c['tamanho_bytes'], c['mtime_ns'], c['run_id'], c['chunk'],
+                 c['ultima_linha'], c['data_atendimento_min'], c['data_atendimento_max'])
+                for c in self.conn.checkpoints.values()
+            ]
+        elif sql.startswith('INSERT'):
+            chave = (params['nome_arquivo'], params['tamanho_bytes'], params['mtime_ns'])
+            self.conn.pendente.append(('salvar', chave, dict(params)))
+        elif sql.startswith('DELETE'):
+            chave = (params['nome_arquivo'], params['tamanho_bytes'], params['mtime_ns'])
+            self.conn.pendente.append(('apagar', chave, None))
+
+    def fetchall(self):
+        return self._result
+
+
+class FakeConn:
+    """Conexão com transação simulada: checkpoints e linhas só valem após o commit"""
+
+    def __init__(self):
+        self.checkpoints = {}
+        self.linhas_fato = []
+        self.pendente = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        for operacao, chave, valor in self.pendente:
+            if operacao == 'salvar':
+                self.checkpoints[chave] = valor
+            elif operacao == 'apagar':
+                self.checkpoints.pop(chave, None)
+            else:
+                self.linhas_fato.extend(valor)
+        self.pendente = []
+
+    def rollback(self):
+        self.pendente = []
+
+
+def run_stream(pipeline, conn, csv_files, falhar_no_lote=None):
+    """Executa o modo streaming com uma carga falsa em lotes de 25 linhas"""
+    lotes = [0]
+
+    def load_frame(conn, dimension_loader, persist_cache=True, df=None, on_batch=None):
+        lote_fato = df.rename(columns={'Data do Atendimento': 'data_atendimento'})
+        for inicio in range(0, len(lote_fato), 25):
+            lote = lote_fato.iloc[inicio:inicio + 25]
+            conn.pendente.append(('fato', None, lote.index.tolist()))
+            if lotes[0] == falhar_no_lote:
+                raise RuntimeError("queda no meio da carga")
+            on_batch(conn, lote)
+            conn.commit()
+            lotes[0] += 1
+
+    pipeline._load_frame = load_frame
+    pipeline._seen_keys = SeenKeySet()
+    pipeline.stats['registros_extraidos'] = 0
+    pipeline._checkpoint = LoadCheckpoint()
+    pipeline._checkpoint.load(conn)
+
+    load_chunk = pipeline._chunk_loader(conn, dimension_loader=None)
+    try:
+        for item in pipeline._iter_stream(csv_files):
+            load_chunk(pipeline._transform_chunk(item))
+    except RuntimeError:
+        conn.rollback()
+        raise
+
+
+class TestLoadCheckpoint:
+    """Testes do checkpoint e retomada da carga em streaming"""
+
+    def test_resume_after_failure(self, tmp_path):
+        """Após uma falha, a nova execução retoma da última linha confirmada"""
+        csv_file = write_sample_csv(tmp_path / 'amostra.csv', n_rows=300)
+        conn = FakeConn()
+
+        pipeline = HealthETLPipeline(chunksize=70, incremental=False)
+        with pytest.raises(RuntimeError):
+            run_stream(pipeline, conn, [csv_file], falhar_no_lote=4)
+
+        (checkpoint,) = conn.checkpoints.values()
+        confirmadas = len(conn.linhas_fato)
+        assert checkpoint['ultima_linha'] == max(conn.linhas_fato)
+        assert checkpoint['chunk'] == checkpoint['ultima_linha'] // 70
+
+        # Retomada: nenhuma linha confirmada é reenviada e o checkpoint some ao fim do arquivo
+        retomada = HealthETLPipeline(chunksize=70, incremental=False)
+        run_stream(retomada, conn, [csv_file])
+
+        assert len(conn.linhas_fato) == len(set(conn.linhas_fato))
+        assert min(conn.linhas_fato[confirmadas:]) == checkpoint['ultima_linha'] + 1
+        assert retomada.stats['registros_extraidos'] == 300 - checkpoint['ultima_linha'] - 1
+        assert conn.checkpoints == {}
+
+    def test_changed_file_invalidates_checkpoint(self, tmp_path):
+        """Um arquivo alterado (tamanho/mtime) não usa o checkpoint antigo"""
+        csv_file = write_sample_csv(tmp_path / 'amostra.csv', n_rows=100)
+        conn = FakeConn()
+
+        checkpoint = LoadCheckpoint()
+        checkpoint.load(conn)
+        checkpoint.save(conn, csv_file, 0, 49, None, None)
+        conn.commit()
+
+        checkpoint.load(conn)
+        assert checkpoint.start_row(csv_file) == 50
+
+        write_sample_csv(csv_file, n_rows=120)
+        assert checkpoint.start_row(csv_file) == 0
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from src.models import saude
+from tests.sample_data import write_sample_csv
+
+
+class TestCompactSchema:
+    """Testes do schema compacto de tipos (category / inteiros pequenos)"""
+
+    def test_extract_and_transform_use_compact_dtypes(self, tmp_path):
+        """Colunas categóricas, quantidades e derivadas saem com tipos compactos"""
+        for seed in range(2):
+            write_sample_csv(tmp_path / f'amostra_{seed}.csv', n_rows=120, seed=seed)
+
+        pipeline = HealthETLPipeline()
+        pipeline.raw_data_path = tmp_path
+        pipeline.extract()
+
+        # Categorias unificadas entre os arquivos, sem voltar para object
+        assert isinstance(pipeline.df['Sexo'].dtype, pd.CategoricalDtype)
+        assert isinstance(pipeline.df['Município'].dtype, pd.CategoricalDtype)
+        assert pipeline.df['Código da Unidade'].dtype == saude.TIPO_CODIGO
+
+        pipeline.transform()
+        df = pipeline.df
+
+        assert df['Qtde Prescrita Farmácia Curitibana'].dtype == 'Int32'
+        assert df['Cômodos'].dtype == 'Int16'
+        assert df['gerou_internamento'].dtype == 'int8'
+        for col in ['periodo_dia', 'faixa_etaria', 'morador_curitiba_rm']:
+            assert isinstance(df[col].dtype, pd.CategoricalDtype)
+            assert df[col].notna().all()
+
+        # Internamento nulo conta como "não gerou" (como no .apply original)
+        assert set(df['gerou_internamento'].unique()) <= {0, 1}
+        assert pipeline.stats['memoria_economizada_transform_mb'] >= 0
+
+    def test_quantities_truncate_and_widen(self):
+        """Fração truncada como no astype(int) original; fora da faixa alarga o tipo em vez de zerar"""
+        serie = pd.Series(['1', '2.5', '-3.7', None, 'x'], dtype=object)
+        convertido = saude.to_small_int(serie, 'Int16')
+        assert convertido.tolist() == [1, 2, -3, pd.NA, pd.NA]
+        assert convertido.dtype == 'Int16'
+
+        assert saude.to_small_int(pd.Series(['40000', '1']), 'Int16').dtype == 'Int32'
+        convertido = saude.to_small_int(pd.Series(['99999999999', '1']), 'Int32')
+        assert convertido.tolist() == [99999999999, 1] and convertido.dtype == 'Int64'
+
+    def test_user_code_accepts_only_integers(self):
+        """Só dígitos (ou números inteiros) na faixa do INTEGER viram cod_usuario"""
+        convertido = saude.to_user_code(pd.Series([' 007 ', '-5', '12.0', '1e3', '', None, '2147483648']))
+        assert convertido.tolist() == [7, -5, pd.NA, pd.NA, pd.NA, pd.NA, pd.NA]
+        assert convertido.dtype == 'Int64'
+        assert saude.to_user_code(pd.Series([1001.0, 2.5, np.nan])).tolist() == [1001, pd.NA, pd.NA]
+
+    def test_out_of_range_quantities_are_counted(self, tmp_path):
+        """O transform mantém o valor fora da faixa e o registra nas estatísticas"""
+        caminho = write_sample_csv(tmp_path / 'amostra.csv', n_rows=50, seed=0)
+        bruto = pd.read_csv(caminho, sep=';', encoding='latin-1', dtype=str)
+        bruto.loc[0, 'Cômodos'] = '40000'
+        bruto.loc[1, 'Qtde Prescrita Farmácia Curitibana'] = '2.5'
+        bruto.to_csv(caminho, sep=';', encoding='latin-1', index=False)
+
+        pipeline = HealthETLPipeline()
+        pipeline.raw_data_path = tmp_path
+        pipeline.extract()
+        pipeline.transform()
+        df = pipeline.df
+
+        assert df['Cômodos'].dtype == 'Int32' and 40000 in df['Cômodos'].tolist()
+        assert pipeline.stats['fora_da_faixa_cômodos'] == 1
+        assert df['Qtde Prescrita Farmácia Curitibana'].dtype == 'Int32'
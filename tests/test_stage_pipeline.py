@@ -0,0 +1,116 @@
+import threading
+import time
+import pytest
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from scripts.seen_keys import SeenKeySet
+from scripts.stage_pipeline import StagePipeline
+from tests.sample_data import write_sample_csv
+
+
+class TestStagePipeline:
+    """Testes das etapas encadeadas por filas limitadas"""
+
+    def test_items_flow_in_order(self):
+        """Cada item passa por todas as etapas, na ordem da fonte"""
+        saida = []
+        pipeline = StagePipeline(range(20), [('dobro', lambda x: x * 2), ('coleta', saida.append)])
+
+        tempos = pipeline.run()
+
+        assert saida == [x * 2 for x in range(20)]
+        assert list(tempos) == ['extract', 'dobro', 'coleta']
+        assert all(t['itens'] == 20 for t in tempos.values())
+
+    def test_backpressure_bounds_items_in_flight(self):
+        """Com a carga lenta, a fonte não passa muito à frente (filas limitadas)"""
+        lidos, carregados = [], []
+
+        def fonte():
+            for i in range(10):
+                lidos.append(i)
+                yield i
+
+        def carga_lenta(item):
+            # fila extract->transform + fila transform->load + um item em cada etapa
+            assert len(lidos) - len(carregados) <= 2 * 1 + 3
+            time.sleep(0.01)
+            carregados.append(item)
+
+        tempos = StagePipeline(fonte(), [('transform', lambda x: x), ('load', carga_lenta)], maxsize=1).run()
+
+        assert carregados == list(range(10))
+        assert tempos['extract']['espera_saida_s'] > 0
+
+    def test_error_propagates_and_stops_other_stages(self):
+        """Uma exceção em uma etapa é relançada em run() e interrompe a fonte"""
+        lidos = []
+
+        def fonte():
+            for i in range(10_000):
+                lidos.append(i)
+                yield i
+
+        def carga(item):
+            if item == 3:
+                raise ValueError("falha na carga")
+
+        with pytest.raises(ValueError, match="falha na carga"):
+            StagePipeline(fonte(), [('transform', lambda x: x), ('load', carga)], maxsize=2).run()
+
+        assert len(lidos) < 100
+
+    def test_cancel_from_another_thread(self):
+        """cancel() encerra as etapas sem erro"""
+        def fonte():
+            while True:
+                yield 1
+
+        pipeline = StagePipeline(fonte(), [('load', lambda x: time.sleep(0.001))], maxsize=2)
+        threading.Timer(0.05, pipeline.cancel).start()
+
+        tempos = pipeline.run()
+
+        assert tempos['load']['itens'] > 0
+
+
+class TestPipelinedStreaming:
+    """Modo streaming com etapas sobrepostas"""
+
+    def test_pipelined_stages_match_sequential(self, tmp_path):
+        """Etapas em threads geram os mesmos chunks que a execução sequencial"""
+        write_sample_csv(tmp_path / 'amostra.csv', n_rows=300)
+        csv_files = [tmp_path / 'amostra.csv']
+
+        resultados = {}
+        for pipelined in (False, True):
+            pipeline = HealthETLPipeline(chunksize=70, pipelined=pipelined)
+            pipeline.raw_data_path = tmp_path
+            pipeline._seen_keys = SeenKeySet()
+            pipeline.stats['registros_extraidos'] = 0
+
+            carregados = []
+            carga = lambda item: carregados.append(item)
+            if pipelined:
+                StagePipeline(pipeline._iter_stream(csv_files),
+                              [('transform', pipeline._transform_chunk), ('load', carga)], maxsize=1).run()
+            else:
+                for item in pipeline._iter_stream(csv_files):
+                    carga(pipeline._transform_chunk(item))
+
+            resultados[pipelined] = carregados
+
+        chaves = {p: [c for _, df, _ in r if df is not None for c in df['chave_natural']]
+                  for p, r in resultados.items()}
+        assert chaves[True] == chaves[False]
+        assert resultados[True][-1][1] is None  # marcador de fim de arquivo chega à carga
+        assert sum(linhas for _, _, linhas in resultados[True]) == 300
+
+    def test_pipelined_requires_chunksize(self):
+        with pytest.raises(ValueError):
+            HealthETLPipeline(pipelined=True)
@@ -0,0 +1,54 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from tests.sample_data import write_sample_csv
+
+
+def create_pipeline(tmp_path, **kwargs):
+    pipeline = HealthETLPipeline(use_staging_cache=True, **kwargs)
+    pipeline.raw_data_path = tmp_path / 'raw'
+    pipeline.processed_data_path = tmp_path / 'processed'
+    return pipeline
+
+
+class TestParquetStagingCache:
+    """Testes da camada de staging Parquet"""
+
+    def test_second_run_reads_parquet(self, tmp_path, monkeypatch):
+        """Na segunda execução o CSV não é relido"""
+        (tmp_path / 'raw').mkdir()
+        write_sample_csv(tmp_path / 'raw' / 'amostra.csv')
+
+        primeira = create_pipeline(tmp_path)
+        primeira.extract()
+        assert len(list((tmp_path / 'processed' / 'staging').glob('*.parquet'))) == 1
+
+        def read_csv_proibido(*args, **kwargs):
+            raise AssertionError("CSV relido apesar do cache")
+
+        monkeypatch.setattr(pd, 'read_csv', read_csv_proibido)
+
+        segunda = create_pipeline(tmp_path)
+        segunda.extract()
+
+        pd.testing.assert_frame_equal(segunda.df, primeira.df)
+
+    def test_changed_file_is_reconverted(self, tmp_path):
+        """Conteúdo novo gera um novo Parquet"""
+        (tmp_path / 'raw').mkdir()
+        csv_file = write_sample_csv(tmp_path / 'raw' / 'amostra.csv', n_rows=100)
+
+        create_pipeline(tmp_path).extract()
+
+        write_sample_csv(csv_file, n_rows=120, seed=7)
+        pipeline = create_pipeline(tmp_path)
+        pipeline.extract()
+
+        assert pipeline.stats['registros_extraidos'] == 120
+        assert len(list((tmp_path / 'processed' / 'staging').glob('*.parquet'))) == 1
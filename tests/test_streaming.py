@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Adiciona o diretório raiz ao path para importar os módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.etl_pipeline import HealthETLPipeline
+from scripts.seen_keys import SeenKeySet
+from tests.sample_data import write_sample_csv
+
+
+def transform_in_chunks(pipeline, csv_file):
+    """Executa transform() chunk a chunk, como run_streaming(), sem a carga"""
+    pipeline._seen_keys = SeenKeySet()
+    chunks = []
+    for chunk in pipeline._iter_csv_chunks(csv_file):
+        pipeline.df = chunk
+        pipeline.transform()
+        chunks.append(pipeline.df)
+    return chunks
+
+
+class TestStreaming:
+    """Testes do modo streaming (chunks) do HealthETLPipeline"""
+
+    def test_chunks_match_full_transform(self, tmp_path):
+        """Transformar em chunks gera as mesmas chaves que o frame completo"""
+        write_sample_csv(tmp_path / 'amostra.csv', n_rows=300)
+
+        completo = HealthETLPipeline()
+        completo.raw_data_path = tmp_path
+        completo.extract()
+        completo.transform()
+
+        streaming = HealthETLPipeline(chunksize=70)
+        streaming.raw_data_path = tmp_path
+        chunks = transform_in_chunks(streaming, tmp_path / 'amostra.csv')
+
+        chaves = [chave for chunk in chunks for chave in chunk['chave_natural']]
+
+        assert len(chunks) == 5
+        assert len(chaves) == len(set(chaves))
+        assert chaves == completo.df['chave_natural'].tolist()
+        assert streaming.stats['duplicatas_entre_chunks'] > 0
+
+    def test_seen_keys_across_many_chunks(self):
+        """Os blocos fundidos respondem como um único conjunto, com O(log n) blocos"""
+        vistas = SeenKeySet()
+        rng = np.random.default_rng(0)
+        todas = set()
+        for _ in range(40):
+            chaves = pd.Series(np.unique(rng.integers(0, 3000, 100)).astype(str))
+            esperado = ~chaves.isin(todas).to_numpy()
+            np.testing.assert_array_equal(vistas.filter_new(chaves), esperado)
+            todas.update(chaves)
+
+        assert len(vistas) == len(todas)
+        assert len(vistas._blocos) <= 6
+        assert all((bloco[1:] > bloco[:-1]).all() for bloco in vistas._blocos)
+
+
+class TestParallelExtract:
+    """Testes da extração paralela de múltiplos CSVs"""
+
+    def test_parallel_extract_matches_sequential(self, tmp_path):
+        """Leitura em pool de processos gera o mesmo frame que a sequencial"""
+        for seed in range(3):
+            write_sample_csv(tmp_path / f'amostra_{seed}.csv', n_rows=50, seed=seed)
+
+        sequencial = HealthETLPipeline()
+        sequencial.raw_data_path = tmp_path
+        sequencial.extract()
+
+        paralelo = HealthETLPipeline(workers=2)
+        paralelo.raw_data_path = tmp_path
+        paralelo.extract()
+
+        assert 'Município' in paralelo.df.columns
+        assert paralelo.stats['registros_extraidos'] == 150
+        assert paralelo.stats['colunas_extraídas'] == sequencial.stats['colunas_extraídas']
+        pd.testing.assert_frame_equal(paralelo.df, sequencial.df)
+
+
+class TestColumnProjection:
+    """Testes da projeção de colunas no extract()"""
+
+    def test_reads_only_required_columns(self, tmp_path):
+        """Colunas não consumidas ficam fora; o modo debug lê todas"""
+        write_sample_csv(tmp_path / 'amostra.csv')
+
+        projetado = HealthETLPipeline()
+        projetado.raw_data_path = tmp_path
+        projetado.extract()
+        # Lida só para a validação de qualidade do extract
+        assert 'cod_profissional' in projetado.df.columns
+        projetado.transform()
+
+        assert set(projetado.df.columns) >= set(HealthETLPipeline.required_columns())
+        assert 'Área de Atuação' not in projetado.df.columns
+
+        debug = HealthETLPipeline(all_columns=True)
+        debug.raw_data_path = tmp_path
+        debug.extract()
+
+        assert 'Área de Atuação' in debug.df.columns
+        assert 'Município' in debug.df.columns
+
+
+class TestHashedKey:
+    """Testes da chave natural compacta (hash de 64 bits)"""
+
+    def test_hashed_key_dedup_matches_text_key(self, tmp_path):
+        """A deduplicação pelo hash mantém as mesmas linhas que a chave em texto"""
+        write_sample_csv(tmp_path / 'amostra.csv', n_rows=300)
+
+        texto = HealthETLPipeline()
+        texto.raw_data_path = tmp_path
+        texto.extract()
+        texto.transform()
+
+        compacta = HealthETLPipeline(hashed_key=True)
+        compacta.raw_data_path = tmp_path
+        compacta.extract()
+        compacta.transform()
+
+        assert 'chave_natural' not in compacta.df.columns
+        assert compacta.df['chave_hash'].dtype == 'Int64'
+        assert compacta.df['chave_hash'].is_unique
+        assert compacta.df.index.equals(texto.df.index)
+
+    def test_hash_collision_falls_back_to_components(self, tmp_path, monkeypatch):
+        """Componentes diferentes com o mesmo hash não são descartados como duplicata"""
+        write_sample_csv(tmp_path / 'amostra.csv', n_rows=50)
+
+        pipeline = HealthETLPipeline(hashed_key=True)
+        pipeline.raw_data_path = tmp_path
+        pipeline.extract()
+
+        # Hash degenerado: todas as linhas colidem
+        monkeypatch.setattr('src.models.saude.hash_natural_key', lambda df: np.zeros(len(df), dtype=np.int64))
+        pipeline.transform()
+
+        assert len(pipeline.df) == 48  # só as 2 duplicatas reais saem
+        assert pipeline.df['chave_hash'].notna().sum() == 1
+        assert pipeline.stats['colisoes_chave_hash'] == 47